@@ -0,0 +1,314 @@
+"""
+Memory-mapped access to the members of ZIP-based documents
+
+OOXML (.docx, .xlsx, .pptx) and OpenDocument files are ZIP archives with
+many small members. zipfile reads every member through a buffered Python
+file object, and each of the prefilter, the extractor and the embedded
+image OCR opens the archive and parses its central directory again.
+
+ZipArchive maps the file into memory instead. Deflated members are
+decompressed straight from the map block by block, stored members are
+available as memoryviews of the map, and the parsed central directory is
+kept per process (keyed by path, size and modification time), so opening
+the same archive again costs a mmap call. Only the subset of the zipfile
+API used by the extractors is provided. CRC-32 checksums are not verified;
+damaged deflate data still raises an error, and so does a member that
+decompresses to more than the size recorded in the central directory, so
+that size can be trusted by resource_limits.
+"""
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+END_OF_CENTRAL_DIRECTORY = b'PK\x05\x06'
+ZIP64_END_LOCATOR = b'PK\x06\x07'
+ZIP64_END_OF_CENTRAL_DIRECTORY = b'PK\x06\x06'
+CENTRAL_DIRECTORY_HEADER = b'PK\x01\x02'
+LOCAL_FILE_HEADER = b'PK\x03\x04'
+
+STORED = 0
+DEFLATED = 8
+
+FLAG_ENCRYPTED = 0x0001
+FLAG_UTF8 = 0x0800
+
+ZIP64_EXTRA = 0x0001
+
+# The end of central directory record and the longest comment that may follow it
+MAX_END_RECORD_SEARCH = 22 + 0xFFFF
+
+# Compressed bytes handed to zlib at a time
+INPUT_BLOCK_SIZE = 32 * 1024
+
+# Parsed central directories kept per process
+DIRECTORY_CACHE_SIZE = 64
+
+
+class ArchiveError(Exception):
+    """A file is not a readable ZIP archive"""
+
+
+class ArchiveMember:
+    """Central directory entry of a member, with the ZipInfo attributes the extractors use"""
+
+    __slots__ = ('filename', 'CRC', 'file_size', 'compress_size', 'compress_type', 'flag_bits',
+                 'header_offset')
+
+    def __init__(self, filename, crc, file_size, compress_size, compress_type, flag_bits, header_offset):
+        self.filename = filename
+        self.CRC = crc
+        self.file_size = file_size
+        self.compress_size = compress_size
+        self.compress_type = compress_type
+        self.flag_bits = flag_bits
+        self.header_offset = header_offset
+
+    def is_dir(self):
+        return self.filename.endswith('/')
+
+
+class MemberReader:
+    """Read-only file object over a member, decompressing deflated data from the map as it is read"""
+
+    def __init__(self, data, member):
+        self._data = data
+        self._position = 0
+        self._filename = member.filename
+        self._remaining = member.file_size
+        self._decompressor = zlib.decompressobj(-15) if member.compress_type == DEFLATED else None
+        self._eof = False
+        self._buffer = b''  # Decompressed data not returned yet, from _buffer_offset
+        self._buffer_offset = 0
+
+    def read(self, size=-1):
+        """Return up to size bytes (everything left if size is negative); b'' at the end"""
+        if size is None or size < 0:
+            return b''.join(iter(lambda: self.read(INPUT_BLOCK_SIZE * 8), b''))
+        if size == 0 or self._data is None:
+            return b''
+
+        if self._decompressor is None:
+            chunk = self._data[self._position:self._position + min(size, self._remaining)]
+            if not chunk and self._remaining > 0:
+                raise ArchiveError(f"{self._filename} is smaller than its declared size")
+            self._position += len(chunk)
+            self._remaining -= len(chunk)
+            return bytes(chunk)
+
+        while self._buffer_offset >= len(self._buffer):
+            if self._eof:
+                if not self._decompressor.eof or self._remaining > 0:
+                    raise ArchiveError(f"{self._filename} is truncated or smaller than its declared size")
+                return b''
+            data = self._data[self._position:self._position + INPUT_BLOCK_SIZE]
+            self._position += len(data)
+            if data:
+                self._buffer = self._decompressor.decompress(data)
+            else:
+                self._buffer = self._decompressor.flush()
+                self._eof = True
+            self._buffer_offset = 0
+
+        # Hand out the whole block without slicing it when it fits
+        if self._buffer_offset == 0 and len(self._buffer) <= size:
+            chunk = self._buffer
+        else:
+            chunk = self._buffer[self._buffer_offset:self._buffer_offset + size]
+        self._buffer_offset += len(chunk)
+        self._remaining -= len(chunk)
+        if self._remaining < 0:
+            raise ArchiveError(f"{self._filename} is larger than its declared size")
+        return chunk
+
+    def close(self):
+        self._data = None
+        self._buffer = b''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_directory_cache = OrderedDict()  # (path, size, mtime) -> (members in archive order, members by name)
+_directory_cache_lock = threading.Lock()
+
+
+class ZipArchive:
+    """A memory-mapped ZIP archive; use as a context manager or call close()"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            stat = os.fstat(self._file.fileno())
+            if not stat.st_size:
+                raise ArchiveError("File is not a zip file")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+        key = (os.fspath(path), stat.st_size, stat.st_mtime_ns)
+        with _directory_cache_lock:
+            directory = _directory_cache.get(key)
+            if directory is not None:
+                _directory_cache.move_to_end(key)
+        if directory is None:
+            try:
+                directory = self._read_central_directory()
+            except struct.error as e:
+                self.close()
+                raise ArchiveError(f"Damaged central directory: {e}")
+            except Exception:
+                self.close()
+                raise
+            with _directory_cache_lock:
+                _directory_cache[key] = directory
+                while len(_directory_cache) > DIRECTORY_CACHE_SIZE:
+                    _directory_cache.popitem(last=False)
+        self._members, self._members_by_name = directory
+
+    def close(self):
+        if self._map is None:
+            return
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # A member view is still in use; the map is closed when it is freed
+        self._file.close()
+        self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read_central_directory(self):
+        data = self._map
+        search_start = max(0, len(data) - MAX_END_RECORD_SEARCH)
+        end_offset = data.rfind(END_OF_CENTRAL_DIRECTORY, search_start)
+        if end_offset < 0 or end_offset + 22 > len(data):
+            raise ArchiveError("File is not a zip file")
+        entries, directory_size, directory_offset = struct.unpack_from('<10xHII', data, end_offset)
+
+        # Archives with data prepended (self-extracting stubs) are shifted by the prepended size
+        shift = max(0, end_offset - directory_offset - directory_size)
+        if entries == 0xFFFF or directory_offset == 0xFFFFFFFF:
+            # ZIP64: the real values are in the ZIP64 end record found through its locator;
+            # with data prepended it is not where the locator says but right before it
+            locator = end_offset - 20
+            if locator < 0 or data[locator:locator + 4] != ZIP64_END_LOCATOR:
+                raise ArchiveError("Missing ZIP64 end of central directory locator")
+            record = struct.unpack_from('<8xQ', data, locator)[0]
+            if data[record:record + 4] != ZIP64_END_OF_CENTRAL_DIRECTORY:
+                record = locator - 56
+                if record < 0 or data[record:record + 4] != ZIP64_END_OF_CENTRAL_DIRECTORY:
+                    raise ArchiveError("Damaged ZIP64 end of central directory")
+            entries, directory_size, directory_offset = struct.unpack_from('<32xQQQ', data, record)
+            shift = max(0, record - directory_offset - directory_size)
+        offset = directory_offset + shift
+
+        members = []
+        members_by_name = {}
+        for _ in range(entries):
+            if data[offset:offset + 4] != CENTRAL_DIRECTORY_HEADER:
+                raise ArchiveError("Damaged central directory")
+            (flag_bits, compress_type, crc, compress_size, file_size, name_length, extra_length,
+             comment_length, header_offset) = struct.unpack_from('<8xHH4xIIIHHH8xI', data, offset)
+            name_start = offset + 46
+            raw_name = data[name_start:name_start + name_length]
+            filename = raw_name.decode('utf-8' if flag_bits & FLAG_UTF8 else 'cp437', 'replace')
+            if 0xFFFFFFFF in (file_size, compress_size, header_offset):
+                extra = data[name_start + name_length:name_start + name_length + extra_length]
+                file_size, compress_size, header_offset = _zip64_sizes(
+                    extra, file_size, compress_size, header_offset)
+            member = ArchiveMember(filename, crc, file_size, compress_size, compress_type, flag_bits,
+                                   header_offset + shift)
+            members.append(member)
+            members_by_name[filename] = member
+            offset = name_start + name_length + extra_length + comment_length
+        return members, members_by_name
+
+    def namelist(self):
+        return [member.filename for member in self._members]
+
+    def infolist(self):
+        return list(self._members)
+
+    def getinfo(self, name):
+        member = self._members_by_name.get(name)
+        if member is None:
+            raise KeyError(f"There is no item named {name!r} in the archive")
+        return member
+
+    def _member_data(self, member):
+        """Return a memoryview of the (compressed) data of a member, and its ArchiveMember"""
+        if not isinstance(member, ArchiveMember):
+            member = self.getinfo(member)
+        if member.flag_bits & FLAG_ENCRYPTED:
+            raise ArchiveError(f"{member.filename} is encrypted")
+        if member.compress_type not in (STORED, DEFLATED):
+            raise ArchiveError(f"{member.filename} uses unsupported compression method {member.compress_type}")
+
+        header = member.header_offset
+        if self._map[header:header + 4] != LOCAL_FILE_HEADER:
+            raise ArchiveError(f"Damaged local header for {member.filename}")
+        if header + 30 > len(self._map):
+            raise ArchiveError(f"Damaged local header for {member.filename}")
+        name_length, extra_length = struct.unpack_from('<26xHH', self._map, header)
+        start = header + 30 + name_length + extra_length
+        if start + member.compress_size > len(self._map):
+            raise ArchiveError(f"{member.filename} is past the end of the file")
+        return memoryview(self._map)[start:start + member.compress_size], member
+
+    def open(self, member):
+        """Open a member (name or ArchiveMember) for reading"""
+        data, member = self._member_data(member)
+        return MemberReader(data, member)
+
+    def read(self, member):
+        """Return the decompressed content of a member (name or ArchiveMember)"""
+        with self.open(member) as f:
+            return f.read()
+
+    def view(self, member):
+        """
+        Return the content of a stored member as a view of the map, without
+        copying; deflated members must be read through open() or read(), which
+        stop at the size recorded in the central directory
+        """
+        data, member = self._member_data(member)
+        if member.compress_type != STORED:
+            raise ArchiveError(f"{member.filename} is compressed, only stored members can be viewed")
+        if len(data) != member.file_size:
+            raise ArchiveError(f"{member.filename} does not match its declared size")
+        return data
+
+
+def _zip64_sizes(extra, file_size, compress_size, header_offset):
+    """Read the 64-bit values that replace 0xFFFFFFFF fields from a ZIP64 extra field"""
+    offset = 0
+    while offset + 4 <= len(extra):
+        field_id, field_length = struct.unpack_from('<HH', extra, offset)
+        if field_id == ZIP64_EXTRA:
+            values = list(struct.unpack_from(f'<{field_length // 8}Q', extra, offset + 4))
+            # Only the fields set to 0xFFFFFFFF are present, in this order
+            sizes = [file_size, compress_size, header_offset]
+            for i, size in enumerate(sizes):
+                if size == 0xFFFFFFFF:
+                    if not values:
+                        raise ArchiveError("Damaged ZIP64 extra field")
+                    sizes[i] = values.pop(0)
+            return tuple(sizes)
+        offset += 4 + field_length
+    raise ArchiveError("Missing ZIP64 extra field")
+
+
+def open_archive(path):
+    """Open a ZIP-based document, reusing its central directory if it was read before"""
+    return ZipArchive(path)
@@ -0,0 +1,137 @@
+"""
+Compare the streaming .docx extractor with python-docx paragraphs
+
+Usage:
+    python benchmarks/bench_docx.py                  # synthetic document
+    python benchmarks/bench_docx.py report.docx contract.docx
+
+Both extractors are timed over the same file, each in a fresh process,
+and the growth of its peak RSS is reported (tracemalloc would miss the
+memory lxml allocates for python-docx). The synthetic document has
+matches planted in body paragraphs, table cells, the header and the
+footer; its recall is reported for both. Needs python-docx.
+"""
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document  # noqa: E402
+
+from office_analyzer_template import iter_text_from_docx  # noqa: E402
+
+try:
+    import resource
+except ImportError:
+    # Windows; memory is not reported
+    resource = None
+
+PLANTED_PATTERN = r'\bLEAK-\d{6}\b'
+
+REPEAT = 3
+
+
+def make_docx(path, paragraphs=20000, rows=2000):
+    """Write a synthetic document and return the tokens planted in it"""
+    planted = []
+
+    def token():
+        planted.append(f"LEAK-{len(planted):06d}")
+        return planted[-1]
+
+    doc = Document()
+    section = doc.sections[0]
+    section.header.paragraphs[0].text = f"Confidential {token()}"
+    section.footer.paragraphs[0].text = f"Page footer {token()}"
+    for i in range(paragraphs):
+        suffix = f" ref {token()}" if i % 50 == 0 else ''
+        doc.add_paragraph(f"Paragraph {i} with quarterly figures and notes{suffix}")
+    table = doc.add_table(rows=rows, cols=3)
+    for i, row in enumerate(table.rows):
+        row.cells[0].text = f"Row {i}"
+        row.cells[1].text = token() if i % 20 == 0 else 'balance'
+        row.cells[2].text = str(i * 17)
+    doc.save(path)
+    return planted
+
+
+def python_docx_text(path):
+    return ''.join(paragraph.text + "\n" for paragraph in Document(path).paragraphs)
+
+
+def streaming_text(path):
+    return ''.join(iter_text_from_docx(Path(path)))
+
+
+EXTRACTORS = {'python-docx': python_docx_text, 'streaming': streaming_text}
+
+
+def peak_rss():
+    """Return the peak RSS of this process in bytes, or None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_extractor(queue, label, path):
+    """Time one extractor in a child process and put (best time, peak RSS growth, output) or an error on queue"""
+    extractor = EXTRACTORS[label]
+    baseline = peak_rss()
+    best = None
+    try:
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            output = extractor(path)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    except Exception as e:
+        queue.put(f"{type(e).__name__}: {e}")
+        return
+    growth = peak_rss() - baseline if baseline is not None else None
+    queue.put((best, growth, output))
+
+
+def measure(label, path):
+    """Return (best time in seconds, peak RSS growth in bytes or None, output), or an error message"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=run_extractor, args=(queue, label, path))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if len(sys.argv) > 1:
+            documents = [(path, None) for path in sys.argv[1:]]
+        else:
+            path = os.path.join(temp_dir, 'synthetic.docx')
+            documents = [(path, make_docx(path))]
+
+        for path, planted in documents:
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            print(f"{os.path.basename(path)} ({size_mb:.1f} MB)")
+            for label in EXTRACTORS:
+                result = measure(label, path)
+                if isinstance(result, str):
+                    print(f"  {label + ':':<13}error: {result}")
+                    continue
+                seconds, growth, output = result
+                found = set(re.findall(PLANTED_PATTERN, output))
+                memory = f"peak RSS +{growth / 1e6:.1f} MB" if growth is not None else "peak RSS -"
+                recall = f", recall {len(found & set(planted)) / len(planted):.1%}" if planted else ''
+                print(f"  {label + ':':<13}{seconds:.3f}s ({size_mb / seconds:.1f} MB/s), "
+                      f"{memory}, {len(output)} characters{recall}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Compare the expat fast path with the ElementTree path for document XML
+
+Usage:
+    python benchmarks/bench_xml_parsing.py                  # synthetic slide and content.xml
+    python benchmarks/bench_xml_parsing.py deck.pptx doc.odt
+
+For every XML member both parsers are timed over the same bytes, their
+output is checked to be identical and the peak memory of one run is
+reported.
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xml_text import iter_element_text, iter_element_text_etree  # noqa: E402
+
+ODF_TEXT_NS = 'urn:oasis:names:tc:opendocument:xmlns:text:1.0'
+
+# (label, local names, namespace) per kind of member
+TARGETS = {
+    'slide': ('a:t', ('t',), None),
+    'odf': ('text:p/h', ('p', 'h'), ODF_TEXT_NS),
+}
+
+REPEAT = 3
+
+
+def make_slide_xml(shapes=20000):
+    """Return a large synthetic pptx slide"""
+    parts = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+             '<p:sld xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+             ' xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"><p:cSld><p:spTree>']
+    for i in range(shapes):
+        parts.append(f'<p:sp><p:txBody><a:p><a:r><a:rPr lang="en-US" dirty="0"/>'
+                     f'<a:t>Shape {i} quarterly figures &amp; notes</a:t></a:r>'
+                     f'<a:r><a:t> continued text for row {i}</a:t></a:r></a:p></p:txBody></p:sp>')
+    parts.append('</p:spTree></p:cSld></p:sld>')
+    return ''.join(parts).encode('utf-8')
+
+
+def make_odf_content_xml(paragraphs=50000):
+    """Return a large synthetic OpenDocument content.xml"""
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>'
+             '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+             f' xmlns:text="{ODF_TEXT_NS}"><office:body><office:text>']
+    for i in range(paragraphs):
+        parts.append(f'<text:p text:style-name="P1">Paragraph {i} with '
+                     f'<text:span text:style-name="T1">styled words</text:span> and more text</text:p>')
+        if i % 100 == 0:
+            parts.append(f'<text:h text:outline-level="1">Heading {i}</text:h>')
+    parts.append('</office:text></office:body></office:document-content>')
+    return ''.join(parts).encode('utf-8')
+
+
+def iter_members(paths):
+    """Yield (name, kind, xml bytes) for the slides and content.xml of each file"""
+    for path in paths:
+        with zipfile.ZipFile(path) as zip_file:
+            for name in zip_file.namelist():
+                if name.startswith('ppt/slides/slide') and name.endswith('.xml'):
+                    yield f"{os.path.basename(path)}:{name}", 'slide', zip_file.read(name)
+                elif name == 'content.xml':
+                    yield f"{os.path.basename(path)}:{name}", 'odf', zip_file.read(name)
+
+
+def run(parser, data, local_names, namespace):
+    """Parse data with one of the parsers and return the extracted text"""
+    return list(parser(io.BytesIO(data), local_names, namespace))
+
+
+def measure(parser, data, local_names, namespace):
+    """Return (best time in seconds, peak traced memory in bytes, output)"""
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        output = run(parser, data, local_names, namespace)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    run(parser, data, local_names, namespace)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, output
+
+
+def main():
+    if len(sys.argv) > 1:
+        members = list(iter_members(sys.argv[1:]))
+    else:
+        members = [('synthetic slide', 'slide', make_slide_xml()),
+                   ('synthetic content.xml', 'odf', make_odf_content_xml())]
+
+    for name, kind, data in members:
+        label, local_names, namespace = TARGETS[kind]
+        size_mb = len(data) / (1024 * 1024)
+        etree_time, etree_peak, etree_output = measure(iter_element_text_etree, data, local_names, namespace)
+        expat_time, expat_peak, expat_output = measure(iter_element_text, data, local_names, namespace)
+
+        print(f"{name} ({size_mb:.1f} MB, {len(expat_output)} {label} elements)")
+        print(f"  ElementTree: {etree_time:.3f}s ({size_mb / etree_time:.1f} MB/s), peak {etree_peak / 1e6:.1f} MB")
+        print(f"  expat:       {expat_time:.3f}s ({size_mb / expat_time:.1f} MB/s), peak {expat_peak / 1e6:.1f} MB")
+        print(f"  speedup: {etree_time / expat_time:.2f}x, same output: {etree_output == expat_output}")
+
+
+if __name__ == '__main__':
+    main()
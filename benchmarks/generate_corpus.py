@@ -0,0 +1,504 @@
+"""
+Generate a deterministic synthetic corpus for run_benchmarks.py
+
+Usage:
+    python benchmarks/generate_corpus.py bench_corpus
+    python benchmarks/generate_corpus.py bench_corpus --scale 4 --seed 7
+
+Writes Office documents of every supported type (.docx, .xlsx, .pptx,
+.doc, .xls, .ppt, .odt, .ods, .odp, .odg) and rendered-text images (.png, .jpg and
+multi-page .tif) in small, medium and large sizes. Every file contains
+planted tokens matching PLANTED_PATTERN; manifest.json lists each file
+with the tokens planted in it, so the benchmark can measure recall.
+
+Documents are written as plain ZIP/XML with fixed timestamps, and .doc and
+.ppt files as minimal OLE2 compound files, so the same seed and scale always
+give byte-identical files. .xls files need xlwt and
+are left out without it.
+"""
+import argparse
+import json
+import os
+import random
+import struct
+import zipfile
+from xml.sax.saxutils import escape
+
+from PIL import Image, ImageDraw, ImageFont
+
+try:
+    import xlwt
+    XLWT_AVAILABLE = True
+except ImportError:
+    print("xlwt not installed, .xls files will not be generated. Install with: pip install xlwt")
+    XLWT_AVAILABLE = False
+
+# Tokens planted in the corpus; run_benchmarks.py searches for this pattern
+PLANTED_PATTERN = r'\bLEAK-\d{6}\b'
+
+# Paragraphs (or rows, or slides x shapes) per document size, before --scale
+OFFICE_SIZES = {'small': 50, 'medium': 2000, 'large': 20000}
+
+# Page size in pixels and text height per image size
+IMAGE_SIZES = {'small': ((800, 600), 20), 'medium': ((1700, 2200), 28), 'large': ((3400, 4400), 48)}
+
+# Pages of the multi-page TIFF files
+TIFF_PAGES = 3
+
+# One planted token per this many paragraphs, rows or shapes
+PLANT_EVERY = 25
+
+ZIP_DATE = (2020, 1, 1, 0, 0, 0)
+
+WORDS = ('account', 'invoice', 'meeting', 'quarterly', 'report', 'customer', 'balance', 'project',
+         'review', 'budget', 'contract', 'schedule', 'delivery', 'payment', 'summary', 'figures')
+
+ODF_NAMESPACES = (
+    'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+    'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" '
+    'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+    'xmlns:draw="urn:oasis:names:tc:opendocument:xmlns:drawing:1.0" '
+    'xmlns:svg="urn:oasis:names:tc:opendocument:xmlns:svg-compatible:1.0" '
+    'office:version="1.2"'
+)
+
+ODF_MIMETYPES = {
+    '.odt': 'application/vnd.oasis.opendocument.text',
+    '.ods': 'application/vnd.oasis.opendocument.spreadsheet',
+    '.odp': 'application/vnd.oasis.opendocument.presentation',
+    '.odg': 'application/vnd.oasis.opendocument.graphics',
+}
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+
+# OLE2 compound files (.doc, .ppt): version 3 with 512-byte sectors; streams
+# shorter than the cutoff go to the mini stream in 64-byte sectors
+OLE2_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+OLE2_SECTOR_SIZE = 512
+OLE2_MINI_SECTOR_SIZE = 64
+OLE2_MINI_STREAM_CUTOFF = 4096
+OLE2_HEADER_DIFAT = 109  # FAT sector numbers held by the header
+FREE_SECTOR, END_OF_CHAIN, FAT_SECTOR, DIFAT_SECTOR = 0xFFFFFFFF, 0xFFFFFFFE, 0xFFFFFFFD, 0xFFFFFFFC
+NO_STREAM = 0xFFFFFFFF
+
+# Word 97 FIB: its size up to the end of FibRgFcLcb97 and where the text starts
+WORD_FIB_SIZE = 898
+WORD_TEXT_OFFSET = 0x400
+
+
+class TextSource:
+    """Deterministic filler sentences with planted tokens"""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.next_token = self.rng.randrange(100000, 400000)
+
+    def token(self):
+        self.next_token += self.rng.randrange(1, 97)
+        return f"LEAK-{self.next_token:06d}"
+
+    def sentence(self, words=12):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words))
+
+    def lines(self, count, planted):
+        """Return count lines of filler, every PLANT_EVERY-th with a token appended to planted"""
+        lines = []
+        for i in range(count):
+            line = self.sentence()
+            if i % PLANT_EVERY == PLANT_EVERY // 2:
+                token = self.token()
+                planted.append(token)
+                line = f"{line} ref {token} {self.sentence(4)}"
+            lines.append(line)
+        return lines
+
+
+def write_zip(path, members):
+    """Write (name, text) members with fixed timestamps; the first member is stored uncompressed"""
+    with zipfile.ZipFile(path, 'w') as zip_file:
+        for i, (name, text) in enumerate(members):
+            info = zipfile.ZipInfo(name, date_time=ZIP_DATE)
+            info.compress_type = zipfile.ZIP_STORED if name == 'mimetype' else zipfile.ZIP_DEFLATED
+            zip_file.writestr(info, text.encode('utf-8'))
+
+
+def content_types(overrides):
+    parts = [XML_HEADER, '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">',
+             '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>',
+             '<Default Extension="xml" ContentType="application/xml"/>']
+    parts += [f'<Override PartName="/{name}" ContentType="{content_type}"/>' for name, content_type in overrides]
+    parts.append('</Types>')
+    return ''.join(parts)
+
+
+def relationships(targets):
+    parts = [XML_HEADER, '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">']
+    parts += [f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/{kind}" Target="{target}"/>'
+              for i, (kind, target) in enumerate(targets, 1)]
+    parts.append('</Relationships>')
+    return ''.join(parts)
+
+
+def write_docx(path, lines):
+    paragraphs = []
+    for i, line in enumerate(lines):
+        if i % 2:
+            # Word often splits a paragraph into several runs
+            middle = len(line) // 2
+            runs = [line[:middle], line[middle:]]
+        else:
+            runs = [line]
+        paragraphs.append('<w:p>' + ''.join(f'<w:r><w:t xml:space="preserve">{escape(run)}</w:t></w:r>'
+                                             for run in runs) + '</w:p>')
+    document = (XML_HEADER + '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                '<w:body>' + ''.join(paragraphs) + '</w:body></w:document>')
+    write_zip(path, [
+        ('[Content_Types].xml', content_types([
+            ('word/document.xml', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml')])),
+        ('_rels/.rels', relationships([('officeDocument/2006/relationships/officeDocument', 'word/document.xml')])),
+        ('word/document.xml', document),
+    ])
+
+
+def column_name(index):
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord('A') + remainder) + name
+    return name
+
+
+def write_xlsx(path, lines):
+    # Words go to shared strings, numbers to plain cells, every tenth row is an inline string
+    shared = []
+    rows = []
+    for row_number, line in enumerate(lines, 1):
+        words = line.split(' ')
+        cells = []
+        for column, word in enumerate(words[:8]):
+            ref = f"{column_name(column)}{row_number}"
+            cells.append(f'<c r="{ref}" t="s"><v>{len(shared)}</v></c>')
+            shared.append(word)
+        tail = ' '.join(words[8:])
+        ref = f"{column_name(8)}{row_number}"
+        if row_number % 10:
+            cells.append(f'<c r="{ref}" t="s"><v>{len(shared)}</v></c>')
+            shared.append(tail)
+        else:
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t>{escape(tail)}</t></is></c>')
+        cells.append(f'<c r="{column_name(9)}{row_number}"><v>{row_number * 17}</v></c>')
+        rows.append(f'<row r="{row_number}">' + ''.join(cells) + '</row>')
+
+    main_ns = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+    sheet = XML_HEADER + f'<worksheet xmlns="{main_ns}"><sheetData>' + ''.join(rows) + '</sheetData></worksheet>'
+    strings = (XML_HEADER + f'<sst xmlns="{main_ns}" count="{len(shared)}" uniqueCount="{len(shared)}">'
+               + ''.join(f'<si><t>{escape(text)}</t></si>' for text in shared) + '</sst>')
+    workbook = (XML_HEADER + f'<workbook xmlns="{main_ns}" '
+                'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>')
+    write_zip(path, [
+        ('[Content_Types].xml', content_types([
+            ('xl/workbook.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml'),
+            ('xl/worksheets/sheet1.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'),
+            ('xl/sharedStrings.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml')])),
+        ('_rels/.rels', relationships([('officeDocument/2006/relationships/officeDocument', 'xl/workbook.xml')])),
+        ('xl/_rels/workbook.xml.rels', relationships([
+            ('officeDocument/2006/relationships/worksheet', 'worksheets/sheet1.xml'),
+            ('officeDocument/2006/relationships/sharedStrings', 'sharedStrings.xml')])),
+        ('xl/workbook.xml', workbook),
+        ('xl/sharedStrings.xml', strings),
+        ('xl/worksheets/sheet1.xml', sheet),
+    ])
+
+
+def write_pptx(path, lines, shapes_per_slide=10):
+    slides = []
+    for start in range(0, len(lines), shapes_per_slide):
+        shapes = ''.join(f'<p:sp><p:txBody><a:p><a:r><a:t>{escape(line)}</a:t></a:r></a:p></p:txBody></p:sp>'
+                         for line in lines[start:start + shapes_per_slide])
+        slides.append(XML_HEADER + '<p:sld xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+                      'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main">'
+                      f'<p:cSld><p:spTree>{shapes}</p:spTree></p:cSld></p:sld>')
+    slide_names = [f'ppt/slides/slide{i}.xml' for i in range(1, len(slides) + 1)]
+    presentation = (XML_HEADER + '<p:presentation xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"/>')
+    write_zip(path, [
+        ('[Content_Types].xml', content_types(
+            [('ppt/presentation.xml', 'application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml')]
+            + [(name, 'application/vnd.openxmlformats-officedocument.presentationml.slide+xml') for name in slide_names])),
+        ('_rels/.rels', relationships([('officeDocument/2006/relationships/officeDocument', 'ppt/presentation.xml')])),
+        ('ppt/presentation.xml', presentation),
+    ] + list(zip(slide_names, slides)))
+
+
+def odf_paragraphs(lines):
+    return ''.join(f'<text:p>{escape(line)}</text:p>' for line in lines)
+
+
+def write_odf(path, lines):
+    file_ext = os.path.splitext(path)[1]
+    if file_ext == '.odt':
+        body = '<office:text>' + odf_paragraphs(lines) + '</office:text>'
+    elif file_ext == '.ods':
+        rows = ''.join('<table:table-row>' + ''.join(
+            f'<table:table-cell><text:p>{escape(cell)}</text:p></table:table-cell>'
+            for cell in (line[:len(line) // 2], line[len(line) // 2:])) + '</table:table-row>' for line in lines)
+        body = f'<office:spreadsheet><table:table table:name="Sheet1">{rows}</table:table></office:spreadsheet>'
+    else:
+        pages = ''.join(f'<draw:page draw:name="page{i // 10 + 1}"><draw:frame><draw:text-box>'
+                        + odf_paragraphs(lines[i:i + 10]) + '</draw:text-box></draw:frame></draw:page>'
+                        for i in range(0, len(lines), 10))
+        body = ('<office:presentation>' if file_ext == '.odp' else '<office:drawing>') + pages + \
+               ('</office:presentation>' if file_ext == '.odp' else '</office:drawing>')
+    content = (XML_HEADER + f'<office:document-content {ODF_NAMESPACES}>'
+               f'<office:body>{body}</office:body></office:document-content>')
+    manifest = (XML_HEADER + '<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0">'
+                f'<manifest:file-entry manifest:full-path="/" manifest:media-type="{ODF_MIMETYPES[file_ext]}"/>'
+                '<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>'
+                '</manifest:manifest>')
+    write_zip(path, [('mimetype', ODF_MIMETYPES[file_ext]), ('META-INF/manifest.xml', manifest),
+                     ('content.xml', content)])
+
+
+def write_xls(path, lines):
+    workbook = xlwt.Workbook()
+    sheet = workbook.add_sheet('Sheet1')
+    for row, line in enumerate(lines[:65535]):
+        words = line.split(' ')
+        sheet.write(row, 0, ' '.join(words[:6]))
+        sheet.write(row, 1, ' '.join(words[6:]))
+        sheet.write(row, 2, row * 17)
+    workbook.save(path)
+
+
+def _sector_chains(data, sector_size, first_sector):
+    """Split data into padded sectors numbered from first_sector; return them with their chain"""
+    count = -(-len(data) // sector_size)
+    sectors = [data[i * sector_size:(i + 1) * sector_size].ljust(sector_size, b'\0') for i in range(count)]
+    chain = list(range(first_sector + 1, first_sector + count)) + [END_OF_CHAIN] if count else []
+    return sectors, chain
+
+
+def _directory_entry(name, object_type, right, child, start, size):
+    encoded = name.encode('utf-16-le') + b'\0\0' if name else b''
+    return (encoded.ljust(64, b'\0') + struct.pack('<HBBIII', len(encoded), object_type, 1, NO_STREAM, right, child)
+            + bytes(36) + struct.pack('<IQ', start, size))
+
+
+def write_compound_file(path, streams):
+    """
+    Write (name, bytes) streams into the root storage of an OLE2 compound file
+    Streams are stored in consecutive sectors; the FAT is followed by DIFAT
+    sectors when it needs more than the header's 109 sector numbers
+    """
+    sectors, fat = [], []
+
+    def allocate(data, sector_size=OLE2_SECTOR_SIZE):
+        if not data:
+            return END_OF_CHAIN
+        new_sectors, chain = _sector_chains(data, sector_size, len(sectors))
+        sectors.extend(new_sectors)
+        fat.extend(chain)
+        return len(sectors) - len(new_sectors)
+
+    mini_stream, mini_fat, starts = [], [], {}
+    for name, data in streams:
+        if len(data) < OLE2_MINI_STREAM_CUTOFF:
+            new_sectors, chain = _sector_chains(data, OLE2_MINI_SECTOR_SIZE, len(mini_fat))
+            starts[name] = len(mini_fat) if data else END_OF_CHAIN
+            mini_stream.extend(new_sectors)
+            mini_fat.extend(chain)
+        else:
+            starts[name] = allocate(data)
+    mini_stream = b''.join(mini_stream)
+    mini_stream_start = allocate(mini_stream)
+    mini_fat_start = allocate(struct.pack(f'<{len(mini_fat)}I', *mini_fat))
+    mini_fat_sectors = len(sectors) - mini_fat_start if mini_fat else 0
+
+    # Root entry, then the streams as a chain of right siblings
+    entries = [_directory_entry('Root Entry', 5, NO_STREAM, 1 if streams else NO_STREAM,
+                                mini_stream_start, len(mini_stream))]
+    for i, (name, data) in enumerate(streams):
+        right = i + 2 if i + 1 < len(streams) else NO_STREAM
+        entries.append(_directory_entry(name, 2, right, NO_STREAM, starts[name], len(data)))
+    while len(entries) % (OLE2_SECTOR_SIZE // 128):
+        entries.append(_directory_entry('', 0, NO_STREAM, NO_STREAM, 0, 0))
+    directory_start = allocate(b''.join(entries))
+
+    # The FAT and DIFAT sectors also need FAT entries
+    entries_per_sector = OLE2_SECTOR_SIZE // 4
+    fat_count = difat_count = 0
+    while True:
+        needed = -(-(len(sectors) + fat_count + difat_count) // entries_per_sector)
+        needed_difat = -(-max(0, needed - OLE2_HEADER_DIFAT) // (entries_per_sector - 1))
+        if (needed, needed_difat) == (fat_count, difat_count):
+            break
+        fat_count, difat_count = needed, needed_difat
+    fat_sectors = list(range(len(sectors), len(sectors) + fat_count))
+    difat_sectors = list(range(fat_sectors[-1] + 1, fat_sectors[-1] + 1 + difat_count))
+    fat.extend([FAT_SECTOR] * fat_count + [DIFAT_SECTOR] * difat_count)
+    fat.extend([FREE_SECTOR] * (fat_count * entries_per_sector - len(fat)))
+    fat_data = struct.pack(f'<{len(fat)}I', *fat)
+    sectors.extend(fat_data[i * OLE2_SECTOR_SIZE:(i + 1) * OLE2_SECTOR_SIZE] for i in range(fat_count))
+
+    # DIFAT sectors list the FAT sectors past the first 109, ending with the next DIFAT sector
+    overflow = fat_sectors[OLE2_HEADER_DIFAT:]
+    for i in range(difat_count):
+        numbers = overflow[i * (entries_per_sector - 1):(i + 1) * (entries_per_sector - 1)]
+        numbers += [FREE_SECTOR] * (entries_per_sector - 1 - len(numbers))
+        next_sector = difat_sectors[i + 1] if i + 1 < difat_count else END_OF_CHAIN
+        sectors.append(struct.pack(f'<{entries_per_sector}I', *numbers, next_sector))
+
+    header_difat = fat_sectors[:OLE2_HEADER_DIFAT]
+    header_difat += [FREE_SECTOR] * (OLE2_HEADER_DIFAT - len(header_difat))
+    header = (OLE2_SIGNATURE + bytes(16) + struct.pack('<HHHHH6x', 0x3E, 3, 0xFFFE, 9, 6)
+              + struct.pack('<IIIIIIIII', 0, fat_count, directory_start, 0, OLE2_MINI_STREAM_CUTOFF,
+                            mini_fat_start, mini_fat_sectors,
+                            difat_sectors[0] if difat_sectors else END_OF_CHAIN, difat_count)
+              + struct.pack(f'<{OLE2_HEADER_DIFAT}I', *header_difat))
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(b''.join(sectors))
+
+
+def write_doc(path, lines):
+    """Write a Word 97 document whose text is split into an 8-bit and a UTF-16 piece"""
+    text = ''.join(f"{line}\r" for line in lines)
+    half = len(text) // 2
+    word = bytearray(WORD_TEXT_OFFSET)
+    struct.pack_into('<HH', word, 0, 0xA5EC, 193)  # wIdent, nFib of Word 97
+    struct.pack_into('<H', word, 0x0A, 0x0200)  # The piece table is in 1Table
+    struct.pack_into('<H', word, 32, 14)  # csw
+    struct.pack_into('<H', word, 62, 22)  # cslw
+    struct.pack_into('<I', word, 76, len(text))  # ccpText
+    struct.pack_into('<H', word, 152, 93)  # cbRgFcLcb
+    first = len(word)
+    word += text[:half].encode('cp1252')
+    word += b'\0' * (len(word) % 2)
+    second = len(word)
+    word += text[half:].encode('utf-16-le')
+
+    # Clx: the piece table (Pcdt) with the character positions and piece descriptors
+    positions = struct.pack('<III', 0, half, len(text))
+    descriptors = struct.pack('<HIHHIH', 0, (first * 2) | 0x40000000, 0, 0, second, 0)
+    clx = b'\x02' + struct.pack('<I', len(positions) + len(descriptors)) + positions + descriptors
+    struct.pack_into('<II', word, 154 + 66 * 4, 0, len(clx))  # fcClx, lcbClx
+    write_compound_file(path, [('WordDocument', bytes(word)), ('1Table', clx)])
+
+
+def ppt_record(record_type, payload, container=False):
+    return struct.pack('<HHI', 0x000F if container else 0, record_type, len(payload)) + payload
+
+
+def write_ppt(path, lines, shapes_per_slide=10):
+    """Write a PowerPoint 97 presentation with one text atom per line"""
+    slides = []
+    for start in range(0, len(lines), shapes_per_slide):
+        atoms = []
+        for i, line in enumerate(lines[start:start + shapes_per_slide]):
+            atoms.append(ppt_record(0x0F9F, struct.pack('<I', 4)))  # TextHeaderAtom: other text
+            if i % 2:
+                atoms.append(ppt_record(0x0FA8, line.encode('latin-1')))  # TextBytesAtom
+            else:
+                atoms.append(ppt_record(0x0FA0, line.encode('utf-16-le')))  # TextCharsAtom
+        slides.append(ppt_record(0x0FF0, b''.join(atoms), container=True))  # SlideListWithText
+    document = ppt_record(0x03E8, b''.join(slides), container=True)  # DocumentContainer
+    write_compound_file(path, [('Current User', bytes(20)), ('PowerPoint Document', document)])
+
+
+def load_font(text_height):
+    """Return a font about text_height pixels high"""
+    try:
+        return ImageFont.load_default(size=text_height)
+    except TypeError:
+        # Pillow < 10.1 only has the small bitmap font
+        return ImageFont.load_default()
+
+
+def render_page(text_source, page_size, text_height, planted):
+    """Render a page of black text on white with planted tokens"""
+    img = Image.new('L', page_size, 255)
+    draw = ImageDraw.Draw(img)
+    font = load_font(text_height)
+    line_height = int(text_height * 1.6)
+    margin = text_height * 2
+    words_per_line = max(3, (page_size[0] - 2 * margin) // (text_height * 5))
+    for number, y in enumerate(range(margin, page_size[1] - margin, line_height)):
+        line = text_source.sentence(words_per_line)
+        if number % 4 == 1:
+            token = text_source.token()
+            planted.append(token)
+            line = f"ref {token} " + ' '.join(line.split(' ')[:words_per_line - 2])
+        draw.text((margin, y), line, fill=0, font=font)
+    return img
+
+
+def generate(output_dir, scale=1.0, seed=1):
+    """Write the corpus and its manifest to output_dir and return the manifest"""
+    text_source = TextSource(seed)
+    files = []
+
+    def add(path, kind, size, planted):
+        files.append({
+            'path': os.path.relpath(path, output_dir).replace(os.sep, '/'),
+            'kind': kind,
+            'type': os.path.splitext(path)[1],
+            'size': size,
+            'bytes': os.path.getsize(path),
+            'planted': planted,
+        })
+
+    office_dir = os.path.join(output_dir, 'office')
+    image_dir = os.path.join(output_dir, 'images')
+    os.makedirs(office_dir, exist_ok=True)
+    os.makedirs(image_dir, exist_ok=True)
+
+    writers = [('.docx', write_docx), ('.xlsx', write_xlsx), ('.pptx', write_pptx), ('.doc', write_doc),
+               ('.ppt', write_ppt), ('.odt', write_odf), ('.ods', write_odf), ('.odp', write_odf),
+               ('.odg', write_odf)]
+    if XLWT_AVAILABLE:
+        writers.append(('.xls', write_xls))
+    for size, count in OFFICE_SIZES.items():
+        for file_ext, writer in writers:
+            planted = []
+            lines = text_source.lines(max(PLANT_EVERY, int(count * scale)), planted)
+            path = os.path.join(office_dir, f"{size}{file_ext}")
+            writer(path, lines)
+            add(path, 'office', size, planted)
+
+    for size, (page_size, text_height) in IMAGE_SIZES.items():
+        for file_ext, save_options in (('.png', {}), ('.jpg', {'quality': 85})):
+            planted = []
+            path = os.path.join(image_dir, f"{size}{file_ext}")
+            render_page(text_source, page_size, text_height, planted).save(path, **save_options)
+            add(path, 'image', size, planted)
+
+        planted = []
+        pages = [render_page(text_source, page_size, text_height, planted) for _ in range(TIFF_PAGES)]
+        path = os.path.join(image_dir, f"{size}.tif")
+        pages[0].save(path, save_all=True, append_images=pages[1:], compression='tiff_lzw')
+        add(path, 'image', size, planted)
+
+    manifest = {'seed': seed, 'scale': scale, 'pattern': PLANTED_PATTERN, 'files': files}
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic benchmark corpus")
+    parser.add_argument('output_dir', help="directory to write the corpus to")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="multiply the number of paragraphs/rows per document (default: 1)")
+    parser.add_argument('--seed', type=int, default=1, help="random seed (default: 1)")
+    args = parser.parse_args()
+
+    manifest = generate(args.output_dir, scale=args.scale, seed=args.seed)
+    total_bytes = sum(entry['bytes'] for entry in manifest['files'])
+    planted = sum(len(entry['planted']) for entry in manifest['files'])
+    print(f"Wrote {len(manifest['files'])} files ({total_bytes / (1024 * 1024):.1f} MB, "
+          f"{planted} planted matches) to {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+Measure extraction and OCR throughput on a corpus from generate_corpus.py
+
+Usage:
+    python benchmarks/generate_corpus.py bench_corpus
+    python benchmarks/run_benchmarks.py bench_corpus
+    python benchmarks/run_benchmarks.py bench_corpus --ocr --pipelines original,otsu
+    python benchmarks/run_benchmarks.py bench_corpus --json after.json --compare before.json
+
+Each file type is benchmarked in a fresh process so its peak RSS is its
+own: the Office extractors (extract_text_from_office_file), image decoding
+and preprocessing, and with --ocr the image analyzer's full OCR path for
+each preprocessing pipeline. Results are MB/s, files/s, peak RSS and the
+recall of the tokens planted in the corpus.
+
+--compare exits with status 1 when a benchmark got more than
+--tolerance slower or found fewer planted tokens than in the baseline.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import resource
+except ImportError:
+    # Windows; peak RSS is not reported
+    resource = None
+
+REPEAT = 3
+
+# Allowed throughput drop against a --compare baseline
+TOLERANCE = 0.10
+
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB, or None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_office(corpus_dir, entries, pattern, repeat):
+    """Time the Office extractor over entries; returns (seconds, found tokens)"""
+    import office_analyzer_template as office
+
+    regex = re.compile(pattern)
+    best = None
+    found = set()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        texts = [office.extract_text_from_office_file(corpus_dir / entry['path']) for entry in entries]
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    for text in texts:
+        found.update(regex.findall(text))
+    return best, found
+
+
+def run_preprocess(corpus_dir, entries, pattern, repeat):
+    """Time decoding and preprocessing of every page of the images in entries"""
+    from PIL import Image, ImageSequence
+
+    import image_analyzer_template as image
+    from image_preprocessing import get_pipeline, preprocess
+
+    steps = get_pipeline(image.PREPROCESS_PIPELINE)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for entry in entries:
+            path = corpus_dir / entry['path']
+            if path.suffix.lower() in image.MULTI_PAGE_EXTENSIONS:
+                with Image.open(path) as img:
+                    for frame in ImageSequence.Iterator(img):
+                        preprocess(frame, steps, image.MAX_IMAGE_DIMENSION, image.TARGET_DPI)
+            else:
+                preprocess(path, steps, image.MAX_IMAGE_DIMENSION, image.TARGET_DPI)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, None
+
+
+def run_ocr(corpus_dir, entries, pattern, repeat, pipeline='original', tesseract_cmd=None):
+    """Time the image analyzer's OCR path (triage, preprocessing, OCR, matching) without a cache"""
+    import image_analyzer_template as image
+    from image_preprocessing import get_pipeline
+    from rule_engine import RuleSet
+
+    if tesseract_cmd:
+        image.pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    image.image_dir = corpus_dir
+    image.rule_set = RuleSet.from_pattern('planted', pattern)
+    image.preprocess_steps = get_pipeline(pipeline)
+    image.ocr_cache = None
+    best = None
+    found = set()
+    for _ in range(repeat):
+        found = set()
+        start = time.perf_counter()
+        for entry in entries:
+            result = image.process_image(corpus_dir / entry['path'])
+            found.update(row['Match'] for row in result['rows'])
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, found
+
+
+BENCHMARKS = {'extract': run_office, 'preprocess': run_preprocess, 'ocr': run_ocr}
+
+
+def run_group(queue, benchmark, corpus_dir, entries, pattern, repeat, options):
+    """Run one benchmark in a child process and put its measurements on queue"""
+    try:
+        seconds, found = BENCHMARKS[benchmark](Path(corpus_dir), entries, pattern, repeat, **options)
+        queue.put({'seconds': seconds, 'found': sorted(found) if found is not None else None,
+                   'peak_rss_mb': peak_rss_mb()})
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def measure(benchmark, corpus_dir, entries, pattern, repeat, options=None):
+    """Run a benchmark in a fresh process and return its result entry"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=run_group,
+                              args=(queue, benchmark, str(corpus_dir), entries, pattern, repeat, options or {}))
+    process.start()
+    outcome = queue.get()
+    process.join()
+    if 'error' in outcome:
+        return {'error': outcome['error']}
+
+    total_bytes = sum(entry['bytes'] for entry in entries)
+    seconds = max(outcome['seconds'], 1e-9)
+    result = {
+        'files': len(entries),
+        'bytes': total_bytes,
+        'seconds': round(outcome['seconds'], 4),
+        'mb_per_s': round(total_bytes / (1024 * 1024) / seconds, 2),
+        'files_per_s': round(len(entries) / seconds, 2),
+        'peak_rss_mb': outcome['peak_rss_mb'],
+        'recall': None,
+    }
+    if outcome['found'] is not None:
+        planted = set(token for entry in entries for token in entry['planted'])
+        result['recall'] = round(len(planted & set(outcome['found'])) / len(planted), 4) if planted else 1.0
+    return result
+
+
+def print_results(results):
+    print(f"\n{'benchmark':<28}{'files':>6}{'MB':>8}{'MB/s':>10}{'files/s':>10}{'peak RSS':>10}{'recall':>8}")
+    for name, result in results.items():
+        if 'error' in result:
+            print(f"{name:<28}error: {result['error']}")
+            continue
+        rss = f"{result['peak_rss_mb']:.0f}MB" if result['peak_rss_mb'] is not None else '-'
+        recall = f"{result['recall']:.1%}" if result['recall'] is not None else '-'
+        print(f"{name:<28}{result['files']:>6}{result['bytes'] / (1024 * 1024):>8.1f}"
+              f"{result['mb_per_s']:>10.2f}{result['files_per_s']:>10.2f}{rss:>10}{recall:>8}")
+
+
+def compare(results, baseline, tolerance):
+    """Print regressions against baseline results; returns True if there were any"""
+    regressed = False
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None or 'error' in before or 'error' in result:
+            continue
+        if result['mb_per_s'] < before['mb_per_s'] * (1 - tolerance):
+            print(f"REGRESSION {name}: {result['mb_per_s']:.2f} MB/s, was {before['mb_per_s']:.2f} MB/s")
+            regressed = True
+        if result['recall'] is not None and before['recall'] is not None and result['recall'] < before['recall']:
+            print(f"REGRESSION {name}: recall {result['recall']:.1%}, was {before['recall']:.1%}")
+            regressed = True
+    if not regressed:
+        print(f"\nNo regressions against the baseline (tolerance {tolerance:.0%})")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extraction and OCR on a synthetic corpus")
+    parser.add_argument('corpus_dir', help="directory written by generate_corpus.py")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help=f"runs per benchmark, best is kept (default: {REPEAT})")
+    parser.add_argument('--ocr', action='store_true', help="also benchmark the OCR path (needs tesseract)")
+    parser.add_argument('--pipelines', default='original',
+                        help="comma-separated preprocessing pipelines for --ocr (default: original)")
+    parser.add_argument('--tesseract', help="path to the tesseract executable for --ocr")
+    parser.add_argument('--json', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="JSON results of an earlier run to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help=f"allowed throughput drop for --compare (default: {TOLERANCE})")
+    args = parser.parse_args()
+
+    corpus_dir = Path(args.corpus_dir)
+    with open(corpus_dir / 'manifest.json', encoding='utf-8') as f:
+        manifest = json.load(f)
+    pattern = manifest['pattern']
+
+    by_type = {}
+    for entry in manifest['files']:
+        by_type.setdefault((entry['kind'], entry['type']), []).append(entry)
+
+    runs = []
+    for (kind, file_type), entries in sorted(by_type.items()):
+        if kind == 'office':
+            runs.append((f"extract {file_type}", 'extract', entries, None))
+        else:
+            runs.append((f"preprocess {file_type}", 'preprocess', entries, None))
+    if args.ocr:
+        # OCR is slow; every image is OCR'd once per pipeline
+        for pipeline in args.pipelines.split(','):
+            for (kind, file_type), entries in sorted(by_type.items()):
+                if kind == 'image':
+                    runs.append((f"ocr {file_type} {pipeline}", 'ocr', entries,
+                                 {'pipeline': pipeline, 'tesseract_cmd': args.tesseract}))
+
+    results = {}
+    for name, benchmark, entries, options in runs:
+        print(f"Running {name} ({len(entries)} files)...")
+        repeat = 1 if benchmark == 'ocr' else args.repeat
+        results[name] = measure(benchmark, corpus_dir, entries, pattern, repeat, options)
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'corpus': {'seed': manifest['seed'], 'scale': manifest['scale']}, 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('corpus') != {'seed': manifest['seed'], 'scale': manifest['scale']}:
+            print("Warning: the baseline was measured on a different corpus")
+        if compare(results, baseline['results'], args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+OCR of images embedded in Office documents
+
+Screenshots pasted into documents, workbooks and presentations are stored
+as separate members of the ZIP container (word/media/, xl/media/,
+ppt/media/, or Pictures/ in OpenDocument files). EmbeddedImageOCR reads
+them from the archive into memory, without temporary files, and runs them
+through the same size-aware preprocessing and pre-OCR triage as the image
+analyzer before OCR.
+
+The same picture (a company logo, a slide template background) is usually
+embedded in thousands of documents. Members are identified by the CRC-32
+and size recorded in the ZIP directory, so a picture that was seen before
+is recognised without even decompressing it: its text comes from an
+in-process memo or from the shared extraction cache.
+"""
+import io
+import os
+from collections import OrderedDict
+
+from PIL import Image
+
+from image_preprocessing import preprocess
+from resource_limits import ResourceLimitExceeded
+
+try:
+    from image_triage import triage_image
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Archive folders holding the embedded pictures of each Office file type
+MEDIA_PREFIXES = {
+    '.docx': ('word/media/',),
+    '.xlsx': ('xl/media/',),
+    '.pptx': ('ppt/media/',),
+    '.odt': ('Pictures/',),
+    '.ods': ('Pictures/',),
+    '.odp': ('Pictures/',),
+    '.odg': ('Pictures/',),
+}
+
+# Picture formats Pillow decodes; vector formats (.emf, .wmf, .svg) are skipped
+IMAGE_MEMBER_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tif', '.tiff', '.webp')
+
+# Longest side of the downscaled copy measured by the triage
+TRIAGE_SIZE = 1024
+
+
+def member_key(info):
+    """Identify an archive member by the CRC-32 and size from the ZIP directory"""
+    return f"{info.CRC:08x}-{info.file_size}"
+
+
+def iter_image_members(zip_file, file_ext):
+    """Yield the ZipInfo of every embedded picture in an opened Office file"""
+    prefixes = MEDIA_PREFIXES.get(file_ext)
+    if prefixes is None:
+        return
+    for info in zip_file.infolist():
+        if (info.filename.startswith(prefixes)
+                and os.path.splitext(info.filename)[1].lower() in IMAGE_MEMBER_EXTENSIONS):
+            yield info
+
+
+class EmbeddedImageOCR:
+    """
+    OCR the pictures embedded in Office files, once per distinct picture
+
+    ocr takes a preprocessed PIL image and returns its text; steps are the
+    preprocessing pipeline steps (see image_preprocessing.get_pipeline).
+    With a cache, texts are stored as blobs under namespace and shared by
+    every process using the same cache database. Pictures larger than
+    max_member_size bytes are skipped.
+    """
+
+    def __init__(self, ocr, steps, cache=None, namespace='embedded-ocr', max_dimension=None,
+                 target_dpi=None, triage=True, max_member_size=20 * 1024 * 1024, memo_size=1024):
+        self.ocr = ocr
+        self.steps = steps
+        self.cache = cache
+        self.namespace = namespace
+        self.max_dimension = max_dimension
+        self.target_dpi = target_dpi
+        self.triage = triage and NUMPY_AVAILABLE
+        self.max_member_size = max_member_size
+        self.memo_size = memo_size
+        self.images_ocrd = 0
+        self.images_reused = 0
+        self.images_without_text = 0  # Skipped by the pre-OCR triage
+        self.errors = 0  # Pictures skipped because they could not be read or OCR'd
+        self._memo = OrderedDict()  # member key -> text, least recently used first
+
+    def iter_text(self, zip_file, file_ext, open_member=None):
+        """
+        Yield the OCR text of every embedded picture in an opened Office file
+        open_member(zip_file, name) opens a member for reading, e.g. within a
+        resource_limits.DocumentBudget (default: zip_file.open)
+        """
+        for info in iter_image_members(zip_file, file_ext):
+            if info.file_size > self.max_member_size:
+                continue
+            try:
+                text = self.member_text(zip_file, info, open_member)
+            except ResourceLimitExceeded:
+                raise
+            except Exception as e:
+                print(f"Error reading embedded image {info.filename}: {e}")
+                self.errors += 1
+                continue
+            if text:
+                yield text + "\n"
+
+    def member_text(self, zip_file, info, open_member=None):
+        """Return the OCR text of one embedded picture ('' if it shows no sign of text)"""
+        key = member_key(info)
+        text = self._memo.get(key)
+        if text is None and self.cache is not None:
+            text = self.cache.get_blob(self.namespace, key)
+        if text is not None:
+            self.images_reused += 1
+        else:
+            if open_member is None:
+                data = zip_file.read(info)
+            else:
+                with open_member(zip_file, info.filename) as f:
+                    data = f.read()
+            text = self._ocr_member(data)
+            if self.cache is not None:
+                self.cache.put_blob(self.namespace, key, text)
+
+        self._memo[key] = text
+        self._memo.move_to_end(key)
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        return text
+
+    def _ocr_member(self, data):
+        """Triage, preprocess and OCR the bytes of a picture"""
+        if self.triage:
+            with Image.open(io.BytesIO(data)) as img:
+                original_size = img.size
+                # JPEG pictures are decoded directly at a reduced scale
+                img.draft('L', (TRIAGE_SIZE, TRIAGE_SIZE))
+                small = img.convert('L')
+            small.thumbnail((TRIAGE_SIZE, TRIAGE_SIZE))
+            if triage_image(small, original_size):
+                self.images_without_text += 1
+                return ''
+
+        img = preprocess(io.BytesIO(data), self.steps,
+                         max_dimension=self.max_dimension, target_dpi=self.target_dpi)
+        self.images_ocrd += 1
+        return self.ocr(img)
@@ -0,0 +1,225 @@
+"""
+Persistent SQLite cache for extracted document text and OCR output
+
+Files are looked up by path + size + mtime, optionally falling back to a
+hash of the file content so moved or touched copies are still recognised.
+Cached text is stored zlib-compressed and evicted least-recently-used once
+the cache grows past its size cap. Every namespace (e.g. an extractor or
+tesseract version) gets its own set of entries.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    namespace TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (namespace, path)
+);
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    value BLOB NOT NULL,
+    nbytes INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (namespace, digest)
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE INDEX IF NOT EXISTS files_digest ON files (namespace, digest);
+"""
+
+# Don't rewrite last_used on every hit, an hourly resolution is plenty for LRU eviction
+TOUCH_INTERVAL = 3600
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_file_content(file_path):
+    """Return a hex digest of the file content"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CompressedText:
+    """
+    Compress text chunks as they stream past, for caching extractor output
+    without holding the whole document in memory
+    """
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(1)
+        self._parts = []
+
+    def record(self, chunks):
+        """Yield chunks unchanged while compressing a copy of them"""
+        for chunk in chunks:
+            if chunk:
+                self._parts.append(self._compressor.compress(chunk.encode('utf-8')))
+            yield chunk
+
+    def getvalue(self):
+        """Return the compressed text"""
+        self._parts.append(self._compressor.flush())
+        self._compressor = None
+        return b''.join(self._parts)
+
+
+class ExtractionCache:
+    """
+    Text cache shared by every thread and process that opens the same database
+
+    Each thread gets its own SQLite connection; WAL mode lets worker
+    processes read and write the cache concurrently.
+    """
+
+    def __init__(self, db_path, max_size_bytes=None, use_content_hash=False):
+        self.db_path = db_path
+        self.max_size_bytes = max_size_bytes
+        self.use_content_hash = use_content_hash
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+
+    def _connection(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _file_digest(self, path, file_stat):
+        """Digest used to store a file's entry: its content hash or its path + size + mtime"""
+        if self.use_content_hash:
+            return hash_file_content(path)
+        key = f"{path}\0{file_stat.st_size}\0{file_stat.st_mtime_ns}"
+        return hashlib.blake2b(key.encode('utf-8'), digest_size=20).hexdigest()
+
+    def get_file(self, namespace, path, file_stat=None):
+        """Return cached text for an unchanged file, or None"""
+        path = os.path.abspath(path)
+        if file_stat is None:
+            file_stat = os.stat(path)
+
+        conn = self._connection()
+        row = conn.execute(
+            'SELECT size, mtime_ns, digest FROM files WHERE namespace = ? AND path = ?',
+            (namespace, path)).fetchone()
+
+        if row is not None and row[0] == file_stat.st_size and row[1] == file_stat.st_mtime_ns:
+            return self.get_blob(namespace, row[2])
+
+        if not self.use_content_hash:
+            return None
+
+        # Path or mtime changed: the same content may still be cached under its hash
+        digest = hash_file_content(path)
+        text = self.get_blob(namespace, digest)
+        if text is not None:
+            self._record_file(conn, namespace, path, file_stat, digest)
+        return text
+
+    def put_file(self, namespace, path, text, file_stat=None):
+        """Cache the text extracted from a file (a string or a CompressedText)"""
+        path = os.path.abspath(path)
+        if file_stat is None:
+            file_stat = os.stat(path)
+
+        conn = self._connection()
+        digest = self._file_digest(path, file_stat)
+
+        # Path-keyed entries of an older version of this file can never be hit again
+        if not self.use_content_hash:
+            row = conn.execute('SELECT digest FROM files WHERE namespace = ? AND path = ?',
+                               (namespace, path)).fetchone()
+            if row is not None and row[0] != digest:
+                conn.execute('DELETE FROM entries WHERE namespace = ? AND digest = ?',
+                             (namespace, row[0]))
+
+        self.put_blob(namespace, digest, text)
+        self._record_file(conn, namespace, path, file_stat, digest)
+
+    def link_file(self, namespace, path, digest, file_stat=None):
+        """
+        Point a file at text cached under a digest with put_blob, e.g. the
+        hash of a decoded image, so the next lookup of the file finds it
+        """
+        path = os.path.abspath(path)
+        if file_stat is None:
+            file_stat = os.stat(path)
+        self._record_file(self._connection(), namespace, path, file_stat, digest)
+
+    def _record_file(self, conn, namespace, path, file_stat, digest):
+        conn.execute(
+            'INSERT OR REPLACE INTO files (namespace, path, size, mtime_ns, digest) VALUES (?, ?, ?, ?, ?)',
+            (namespace, path, file_stat.st_size, file_stat.st_mtime_ns, digest))
+
+    def get_blob(self, namespace, digest):
+        """Return text cached under a digest, or None"""
+        conn = self._connection()
+        row = conn.execute(
+            'SELECT value, last_used FROM entries WHERE namespace = ? AND digest = ?',
+            (namespace, digest)).fetchone()
+        if row is None:
+            return None
+
+        now = time.time()
+        if now - row[1] > TOUCH_INTERVAL:
+            conn.execute('UPDATE entries SET last_used = ? WHERE namespace = ? AND digest = ?',
+                         (now, namespace, digest))
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def put_blob(self, namespace, digest, text):
+        """Cache text (a string or a CompressedText) under a digest"""
+        if isinstance(text, CompressedText):
+            value = text.getvalue()
+        else:
+            value = zlib.compress(text.encode('utf-8'), 1)
+        self._connection().execute(
+            'INSERT OR REPLACE INTO entries (namespace, digest, value, nbytes, last_used) VALUES (?, ?, ?, ?, ?)',
+            (namespace, digest, value, len(value), time.time()))
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_size_bytes"""
+        if not self.max_size_bytes:
+            return 0
+
+        conn = self._connection()
+        total = conn.execute('SELECT COALESCE(SUM(nbytes), 0) FROM entries').fetchone()[0]
+        if total <= self.max_size_bytes:
+            return 0
+
+        evicted = []
+        for namespace, digest, nbytes in conn.execute(
+                'SELECT namespace, digest, nbytes FROM entries ORDER BY last_used'):
+            if total <= self.max_size_bytes:
+                break
+            evicted.append((namespace, digest))
+            total -= nbytes
+
+        conn.execute('BEGIN')
+        conn.executemany('DELETE FROM entries WHERE namespace = ? AND digest = ?', evicted)
+        conn.executemany('DELETE FROM files WHERE namespace = ? AND digest = ?', evicted)
+        conn.execute('COMMIT')
+        return len(evicted)
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,77 @@
+"""
+Grouping of byte-identical files before they are scanned
+
+Shares often hold the same attachment saved into many folders. Files are
+compared by extension and size first, so only files that share both are
+read: their first block is hashed, and files that still look alike are
+hashed in full. Only one file per group of identical copies needs to be
+extracted or OCR'd; its results apply to every copy.
+"""
+import hashlib
+import os
+from collections import defaultdict
+
+from extraction_cache import hash_file_content
+
+# Bytes hashed to tell apart same-size files before hashing them in full
+PARTIAL_HASH_SIZE = 64 * 1024
+
+
+def hash_file_start(file_path):
+    """Return a hex digest of the first PARTIAL_HASH_SIZE bytes of a file"""
+    with open(file_path, 'rb') as f:
+        return hashlib.blake2b(f.read(PARTIAL_HASH_SIZE), digest_size=20).hexdigest()
+
+
+def _split_by(paths, key_func):
+    """Split paths into lists with equal keys; files that cannot be read stay on their own"""
+    groups = defaultdict(list)
+    unreadable = []
+    for path in paths:
+        try:
+            groups[key_func(path)].append(path)
+        except OSError:
+            unreadable.append([path])
+    return list(groups.values()) + unreadable
+
+
+def group_duplicates(paths):
+    """
+    Group identical files among paths
+
+    Returns (representative, duplicates) pairs with the representatives in
+    the order they were given; the representative of each group is its
+    first file, duplicates is empty for unique files.
+    """
+    paths = list(paths)
+
+    # The extension decides how a file is extracted, so it is part of the key
+    by_size = defaultdict(list)
+    for path in paths:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            continue
+        by_size[(path.suffix.lower(), size)].append(path)
+
+    representative_of = {}
+    for (_, size), same_size in by_size.items():
+        if len(same_size) < 2:
+            continue
+        for same_start in _split_by(same_size, hash_file_start):
+            if len(same_start) < 2:
+                continue
+            # Small files were already hashed in full
+            same_content = [same_start] if size <= PARTIAL_HASH_SIZE else _split_by(same_start, hash_file_content)
+            for group in same_content:
+                for duplicate in group[1:]:
+                    representative_of[duplicate] = group[0]
+
+    groups = {}
+    for path in paths:
+        representative = representative_of.get(path)
+        if representative is None:
+            groups[path] = []
+        else:
+            groups[representative].append(path)
+    return list(groups.items())
@@ -0,0 +1,91 @@
+"""
+Single-pass discovery of the files to scan
+
+The directory tree is walked once with os.scandir and every file is
+classified by its lowercase extension, instead of running one rglob per
+extension (each a full walk, and case-sensitive, so '.DOCX' was missed).
+Files are yielded as soon as they are found, so scanning starts before the
+walk is over. With background=True the walk runs ahead of the scan in its
+own thread, and the counters tell how much has been discovered so far.
+"""
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+
+class FileDiscovery:
+    """
+    Iterate over the files below root whose extension is in extensions
+
+    Extensions are given with their dot ('.docx') and matched ignoring case.
+    Directories and files in each directory are visited in name order;
+    symlinked directories are not followed. Directories that cannot be read
+    are recorded in errors and skipped.
+    """
+
+    def __init__(self, root, extensions, background=False):
+        self.root = root
+        self.extensions = {extension.lower() for extension in extensions}
+        self.background = background
+        self.counts = Counter()  # Files found so far per extension
+        self.total = 0
+        self.directories = 0
+        self.errors = []  # (path, error) for entries that could not be read
+        self.finished = False
+        self.elapsed = None  # Seconds the walk took, once finished
+
+    def __iter__(self):
+        if not self.background:
+            return self._walk()
+        return self._iter_from_thread()
+
+    def _iter_from_thread(self):
+        """Walk in a background thread and yield its files as they arrive"""
+        found = queue.Queue()
+
+        def walk():
+            try:
+                for path in self._walk():
+                    found.put(path)
+            finally:
+                found.put(None)
+
+        threading.Thread(target=walk, name='file-discovery', daemon=True).start()
+        for path in iter(found.get, None):
+            yield path
+
+    def _walk(self):
+        """Yield matching files, walking the tree depth first"""
+        started = time.perf_counter()
+        stack = [os.fspath(self.root)]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                self.errors.append((directory, e))
+                continue
+            self.directories += 1
+
+            subdirectories = []
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                        continue
+                    extension = os.path.splitext(entry.name)[1].lower()
+                    if extension in self.extensions and entry.is_file():
+                        self.counts[extension] += 1
+                        self.total += 1
+                        yield Path(entry.path)
+                except OSError as e:
+                    self.errors.append((entry.path, e))
+
+            # Depth first, keeping name order
+            stack.extend(reversed(subdirectories))
+        self.elapsed = time.perf_counter() - started
+        self.finished = True
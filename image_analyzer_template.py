@@ -1,9 +1,32 @@
 import os
-import re
+import json
+import hashlib
 import pytesseract
-from PIL import Image
-import pandas as pd
-from pathlib import Path
+from PIL import Image, ImageSequence
+import argparse
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+
+from scan_pool import iter_serial_results, iter_pool_results, iter_supervised_results, TaskTimeout, WorkerCrashed
+from result_writer import StreamingResultWriter, ResumeError
+from extraction_cache import ExtractionCache
+from rule_engine import RuleSet
+from file_discovery import FileDiscovery
+from file_dedup import group_duplicates
+from tesseract_batch import TesseractBatcher, TesseractTimeout
+from image_preprocessing import PIPELINES, get_pipeline, pipeline_name, preprocess
+from perf_stats import PerfStats, run_profiled
+from resource_limits import DocumentBudget, ResourceLimitExceeded
+
+# For pre-OCR triage of images without text
+try:
+    from image_triage import triage_image
+    NUMPY_AVAILABLE = True
+except ImportError:
+    print("numpy not installed, images will not be triaged before OCR. Install with: pip install numpy")
+    NUMPY_AVAILABLE = False
 
 # =============================================================================
 # CONFIGURATION SECTION - MODIFY THESE SETTINGS AS NEEDED
@@ -19,6 +42,106 @@ pytesseract.pytesseract.tesseract_cmd = r'/usr/bin/tesseract'
 # Directory containing images - use relative path
 image_dir = 'imagenes_descargadas'  # Target directory
 output_csv = 'image_results.csv'  # Output CSV file
+skipped_images_csv = 'skipped_images.csv'  # Images that timed out or crashed their worker
+
+# Number of images processed at the same time (1 = process serially)
+# Each job decodes its image and runs its own tesseract process, so decoding
+# of one image overlaps with OCR of the others
+# Can also be set from the command line: python image_analyzer_template.py --workers 8
+OCR_WORKERS = 1
+
+# Threads each tesseract process may use (sets OMP_THREAD_LIMIT for every job)
+# Keep this at 1 when OCR_WORKERS > 1 to avoid oversubscribing the CPU
+OCR_THREADS_PER_JOB = 1
+
+# Result rows are appended to output_csv in batches as images finish
+RESULT_BATCH_SIZE = 1000  # Rows buffered before writing to the CSV
+RESULT_FLUSH_INTERVAL = 10  # Seconds between writes even if the batch is not full
+
+# Images OCR'd per tesseract process (1 = one process per image through pytesseract)
+# Batching avoids loading the language model again for every image, which
+# dominates OCR time for small images such as screenshots and thumbnails.
+# OCR_WORKERS batches run at once, so OCR_WORKERS * OCR_BATCH_SIZE images are
+# decoded and preprocessed concurrently to fill them
+OCR_BATCH_SIZE = 1
+
+# Skip OCR for images that a quick look at a downscaled copy shows cannot
+# contain text: blank scans, smooth photos and backgrounds, tiny icons (needs numpy)
+# The copy is measured in 32px tiles; an image is skipped when even its best
+# tile is below the contrast or edge density threshold
+PRE_OCR_TRIAGE = True
+TRIAGE_SIZE = 1024  # Longest side of the downscaled copy in pixels
+TRIAGE_MIN_SIZE = 16  # Images narrower or lower than this many pixels are skipped
+TRIAGE_MIN_CONTRAST = 8.0  # Standard deviation of the pixel values (0-255)
+TRIAGE_MIN_EDGE_DENSITY = 0.02  # Share of pixels next to a sharp brightness step
+
+# Preprocessing applied to every image before OCR (see image_preprocessing.py):
+# - 'original': grayscale, contrast x2
+# - 'stretch': grayscale, contrast stretched between the 1st and 99th percentile (needs numpy)
+# - 'otsu': black and white at an automatically chosen threshold (needs numpy)
+# Or a list of your own functions that take and return a grayscale PIL image
+# Can also be set from the command line: python image_analyzer_template.py --pipeline otsu
+PREPROCESS_PIPELINE = 'original'
+
+# Images are scaled down while they are decoded, so huge scans do not use
+# hundreds of MB and tesseract does not spend time on pixels it does not need
+# (JPEG files are decoded directly at a reduced scale)
+MAX_IMAGE_DIMENSION = 4000  # Longest side in pixels (None = keep full size)
+TARGET_DPI = 300  # Images scanned at a higher DPI are reduced to this (None = keep)
+
+# Pages of one multi-page TIFF or GIF in flight at the same time
+# Pages are decoded one at a time; up to this many wait for or run OCR at once.
+# They share the OCR_WORKERS tesseract processes with the other images, so a
+# multi-page image can use idle workers but never adds tesseract processes
+PAGE_OCR_JOBS = 4
+
+# Tesseract language(s) and extra command line options, e.g. OCR_LANG = 'eng+spa'
+OCR_LANG = 'eng'
+OCR_CONFIG = ''
+
+# Seconds tesseract may spend on one image (or page) before it is killed and
+# the image reported as timed out, so one image tesseract hangs on cannot stall
+# the scan (None = no limit). Batches get this much time per image in them
+OCR_TIMEOUT = 120
+
+# Seconds spent on one image file over all its pages, checked before every
+# page is decoded and passed to tesseract as the time left (None = no limit).
+# Images that run out of either limit are reported as timed out
+FILE_TIMEOUT = 600
+
+# Scan every image in a worker process that is killed and replaced when it is
+# still busy with one image after this many seconds, so a hung decoder cannot
+# stall the scan (also with --workers 1). Leave some time over FILE_TIMEOUT,
+# which stops slow images and their tesseract runs cleanly. Images that run
+# out of any limit or crash their worker are listed in skipped_images_csv and
+# not scanned again when the scan is resumed. Not used with OCR_BATCH_SIZE > 1,
+# as the images of a batch share one process (None = scan on threads of this
+# process, without a hard timeout)
+FILE_HARD_TIMEOUT = 660
+
+# Persistent cache of OCR output, so images that did not change since the
+# last run are not OCR'd again, even after the search pattern changes
+# (set CACHE_DB = None to disable). OCR text is keyed by a hash of the
+# preprocessed pixels, so moved, renamed or re-encoded copies that decode to
+# the same pixels are recognised too
+CACHE_DB = 'image_cache.sqlite'
+CACHE_MAX_SIZE = 2 * 1024 * 1024 * 1024  # Evict least recently used text above 2GB
+
+# OCR only one of several byte-identical copies of an image and report its
+# matches for every copy. Images are grouped by size and content hash after the
+# directory search finishes, so OCR only starts once the whole tree was
+# searched; worth it for trees with many copies (False starts right away)
+DEDUPLICATE_FILES = False
+
+# Continue an interrupted scan: images listed in the journal written next to
+# output_csv are skipped and new results are appended to the existing CSV
+RESUME_INTERRUPTED_SCAN = True
+
+# Write the time spent per stage (discovery, triage, preprocessing, OCR,
+# matching, CSV writing...) per image type to this JSON file, or CSV if it ends
+# in .csv (None = no report). Can also be set with --perf-report; --profile FILE
+# runs the scan under cProfile
+PERF_REPORT = None
 
 # =============================================================================
 # PATTERN CONFIGURATION - MODIFY THIS SECTION FOR YOUR SEARCH PATTERNS
@@ -38,37 +161,307 @@ pattern1 = r'\b(your_first_pattern_here)\b'
 pattern2 = r'\b(your_second_pattern_here)\b'
 combined_pattern = f'({pattern1}|{pattern2})'
 
+# Optional JSON file with many named detection rules (see examples/rules_example.json)
+# When set it replaces combined_pattern; all rules are compiled into one combined
+# scanner and the 'Rule' column of the results names the rule that matched
+RULES_FILE = None
+
 # =============================================================================
 # END CONFIGURATION SECTION
 # =============================================================================
 
-# List to store results
-results = []
+# Image file types scanned (matched ignoring case)
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tif', '.tiff', '.webp']
+
+# Image file types whose every frame is OCR'd as a separate page
+MULTI_PAGE_EXTENSIONS = ['.tif', '.tiff', '.gif']
+
+# Columns written to output_csv
+RESULT_COLUMNS = ['Image', 'PATH', 'Page', 'Match', 'Rule']
+
+# Columns of skipped_images_csv
+SKIPPED_COLUMNS = ['Image', 'PATH', 'Reason', 'Details']
+
+# Cached OCR text is only valid for the preprocessing code that produced it
+# Bump this whenever preprocess_image changes; the preprocessing settings, the
+# tesseract version, OCR_LANG and OCR_CONFIG are added in main()
+CACHE_NAMESPACE = 'ocr-3'
+
+# Set up in main() when CACHE_DB is enabled
+ocr_cache = None
+ocr_cache_namespace = None
+
+# Set up in main() when OCR_BATCH_SIZE > 1
+ocr_batcher = None
+
+# Tesseract processes running at once, across images and their pages (set to OCR_WORKERS in main())
+tesseract_slots = threading.BoundedSemaphore(OCR_WORKERS)
+
+# Steps of PREPROCESS_PIPELINE, looked up in main()
+preprocess_steps = None
+
+# Time spent per stage and image type, shared by every OCR job
+perf_timings = PerfStats()
 
-def preprocess_image(image_path):
+# Detection rules compiled once in main() from RULES_FILE or combined_pattern
+rule_set = None
+
+# Set once a supervised worker process has applied the settings of main()
+worker_settings_applied = False
+
+def preprocess_image(image):
     """
     Preprocess image for better OCR accuracy
-    Modify this function to adjust image processing parameters
+    image is a path, or the current frame of a multi-page image
+    Decodes the image as grayscale within MAX_IMAGE_DIMENSION and TARGET_DPI,
+    then runs the PREPROCESS_PIPELINE steps; set PREPROCESS_PIPELINE to a
+    list of your own functions to adjust image processing
+    """
+    return preprocess(image, preprocess_steps,
+                      max_dimension=MAX_IMAGE_DIMENSION, target_dpi=TARGET_DPI)
+
+def find_no_text_reason(image):
+    """
+    Return why an image cannot contain text ('blank', 'no edges', 'too small'), or None
+    image is a path, or the current frame of a multi-page image
+    """
+    if isinstance(image, Image.Image):
+        original_size = image.size
+        small = image.convert('L')
+    else:
+        with Image.open(image) as img:
+            original_size = img.size
+            # JPEG images are decoded directly at a reduced scale
+            img.draft('L', (TRIAGE_SIZE, TRIAGE_SIZE))
+            small = img.convert('L')
+    small.thumbnail((TRIAGE_SIZE, TRIAGE_SIZE))
+    return triage_image(small, original_size, min_size=TRIAGE_MIN_SIZE,
+                        min_contrast=TRIAGE_MIN_CONTRAST,
+                        min_edge_density=TRIAGE_MIN_EDGE_DENSITY)
+
+def hash_image_pixels(img):
+    """Return a hex digest of an image's mode, size and pixel data"""
+    digest = hashlib.blake2b(f"{img.mode}\0{img.size}\0".encode('ascii'), digest_size=20)
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+def run_ocr(img, budget):
+    """
+    OCR a preprocessed image, as part of a batch when OCR_BATCH_SIZE > 1
+    Tesseract is killed after OCR_TIMEOUT or the time left in the image's
+    budget, whichever comes first (batches only use OCR_TIMEOUT)
+    """
+    budget.check_time()
+    if ocr_batcher is not None:
+        return ocr_batcher.image_to_string(img)
+    timeout = OCR_TIMEOUT
+    remaining = budget.remaining_time()
+    if remaining is not None and (not timeout or remaining < timeout):
+        timeout = remaining
+    with tesseract_slots:
+        try:
+            return pytesseract.image_to_string(img, lang=OCR_LANG, config=OCR_CONFIG, timeout=timeout or 0)
+        except RuntimeError as e:
+            if str(e) != 'Tesseract process timeout':
+                raise
+            budget.check_time()  # Reported as the file running out of time
+            raise TesseractTimeout(f"tesseract did not finish within {timeout:.0f}s")
+
+def ocr_image(img, file_type, budget):
+    """
+    OCR a preprocessed image, reusing the cached text of identical pixels
+    Returns (text, pixel digest or None without a cache, whether the text was cached)
+    """
+    pixel_digest = None
+    if ocr_cache is not None:
+        with perf_timings.timer('pixel_hash', file_type):
+            pixel_digest = hash_image_pixels(img)
+        with perf_timings.timer('cache_lookup', file_type):
+            text = ocr_cache.get_blob(ocr_cache_namespace, pixel_digest)
+        if text is not None:
+            return text, pixel_digest, True
+    
+    # With batching this includes the wait for the batch to fill
+    with perf_timings.timer('ocr', file_type):
+        text = run_ocr(img, budget)
+    if ocr_cache is not None:
+        with perf_timings.timer('cache_store', file_type):
+            ocr_cache.put_blob(ocr_cache_namespace, pixel_digest, text)
+    return text, pixel_digest, False
+
+def iter_preprocessed_pages(image_file, budget):
+    """
+    Yield (page number, preprocessed page, no-text reason) for every frame of
+    a multi-page image, decoding one frame at a time
+    The page is None when the pre-OCR triage finds it cannot contain text
+    """
+    file_type = image_file.suffix.lower()
+    with Image.open(image_file) as img:
+        for page_number, frame in enumerate(ImageSequence.Iterator(img), 1):
+            budget.check_time()
+            if PRE_OCR_TRIAGE and NUMPY_AVAILABLE:
+                with perf_timings.timer('triage', file_type):
+                    no_text_reason = find_no_text_reason(frame)
+                if no_text_reason:
+                    yield page_number, None, no_text_reason
+                    continue
+            with perf_timings.timer('preprocess', file_type):
+                page = preprocess_image(frame)
+            yield page_number, page, None
+
+def ocr_page(page, file_type, budget):
+    """OCR one preprocessed page from iter_preprocessed_pages; returns (text, cached)"""
+    page_number, img, no_text_reason = page
+    if img is None:
+        return None, False
+    text, _, cached = ocr_image(img, file_type, budget)
+    return text, cached
+
+def ocr_single_image(image_file, file_stat, budget):
+    """Return ([text or None], [no-text reason], cached) for an image with a single page"""
+    file_type = image_file.suffix.lower()
+    
+    # Images without any sign of text are not worth a full OCR
+    if PRE_OCR_TRIAGE and NUMPY_AVAILABLE:
+        with perf_timings.timer('triage', file_type):
+            no_text_reason = find_no_text_reason(image_file)
+        if no_text_reason:
+            return [None], [no_text_reason], False
+    
+    # Preprocess the image and perform OCR
+    # The same preprocessed pixels always give the same OCR text, whichever file they came from
+    with perf_timings.timer('preprocess', file_type):
+        img = preprocess_image(image_file)
+    text, pixel_digest, cached = ocr_image(img, file_type, budget)
+    if ocr_cache is not None:
+        ocr_cache.link_file(ocr_cache_namespace, image_file, pixel_digest, file_stat)
+    return [text], [], cached
+
+def ocr_multi_page_image(image_file, file_stat, budget):
+    """Return ([text or None per page], [no-text reasons], cached) for a TIFF or GIF with any number of frames"""
+    pages = iter_preprocessed_pages(image_file, budget)
+    ocr_image_page = functools.partial(ocr_page, file_type=image_file.suffix.lower(), budget=budget)
+    if PAGE_OCR_JOBS > 1:
+        # Frames are decoded on this thread; at most 2 * PAGE_OCR_JOBS are held at once
+        page_results = iter_pool_results(ocr_image_page, pages, PAGE_OCR_JOBS,
+                                         max_pending=PAGE_OCR_JOBS * 2,
+                                         executor_class=ThreadPoolExecutor)
+    else:
+        page_results = iter_serial_results(ocr_image_page, pages)
+    
+    texts = {}
+    no_text_reasons = []
+    cached = True
+    for (page_number, _, no_text_reason), page_result, error in page_results:
+        if error is not None:
+            raise error
+        texts[page_number], page_cached = page_result
+        cached = cached and page_cached
+        if no_text_reason:
+            no_text_reasons.append(no_text_reason)
+    
+    texts = [texts[page_number] for page_number in sorted(texts)]
+    if len(no_text_reasons) == len(texts):
+        # Like single images, images without any page of text are triaged again next time
+        return texts, no_text_reasons, False
+    if ocr_cache is not None:
+        ocr_cache.put_file(ocr_cache_namespace + '-pages', image_file, json.dumps(texts), file_stat)
+    return texts, no_text_reasons, cached
+
+def process_image(image_file):
+    """
+    Preprocess and OCR a single image, then find pattern matches
+    Every frame of a multi-page TIFF or GIF is OCR'd as a separate page
+    Runs on a worker process or scheduler thread, so it returns plain data
+    instead of writing to the results CSV. Raises ResourceLimitExceeded when
+    the image takes longer than FILE_TIMEOUT, and TesseractTimeout when one
+    tesseract run takes longer than OCR_TIMEOUT
+    """
+    with perf_timings.timer('file', image_file.suffix.lower()):
+        return scan_image(image_file)
+
+def get_worker_settings():
+    """Return the state main() set up, for worker processes that were started without running it"""
+    return {'tesseract_cmd': pytesseract.pytesseract.tesseract_cmd,
+            'preprocess_pipeline': PREPROCESS_PIPELINE,
+            'ocr_cache_namespace': ocr_cache_namespace,
+            'rule_set': rule_set}
+
+def process_image_in_worker(settings, image_file):
     """
-    img = Image.open(image_path)
+    process_image for a supervised worker process: applies the settings from
+    get_worker_settings() on first use and returns the image's timings with
+    its result, as they are recorded in this process
+    """
+    global ocr_cache, ocr_cache_namespace, preprocess_steps, rule_set, tesseract_slots, worker_settings_applied
+    if not worker_settings_applied:
+        pytesseract.pytesseract.tesseract_cmd = settings['tesseract_cmd']
+        preprocess_steps = get_pipeline(settings['preprocess_pipeline'])
+        rule_set = settings['rule_set']
+        ocr_cache_namespace = settings['ocr_cache_namespace']
+        if ocr_cache_namespace is not None:
+            ocr_cache = ExtractionCache(CACHE_DB, max_size_bytes=CACHE_MAX_SIZE)
+        # Every worker runs one tesseract process at a time, so OCR_WORKERS run in all
+        tesseract_slots = threading.BoundedSemaphore(1)
+        worker_settings_applied = True
     
-    # Convert to grayscale
-    img = img.convert('L')
+    perf_timings.drain()  # Drop timings inherited from the main process or left by a failed image
+    image_result = process_image(image_file)
+    image_result['timings'] = perf_timings.drain()
+    return image_result
+
+def scan_image(image_file):
+    """OCR an image and find pattern matches, timing each stage"""
+    # Get relative path excluding the target directory
+    relative_path = str(image_file.relative_to(image_dir))
+    file_type = image_file.suffix.lower()
+    multi_page = file_type in MULTI_PAGE_EXTENSIONS
     
-    # Increase contrast (adjust the enhancement factor as needed)
-    from PIL import ImageEnhance
-    enhancer = ImageEnhance.Contrast(img)
-    img = enhancer.enhance(2)  # Increase contrast by factor of 2
+    # Reuse the OCR text from a previous run if the image file did not change
+    texts = None
+    file_stat = None
+    if ocr_cache is not None:
+        with perf_timings.timer('cache_lookup', file_type):
+            file_stat = os.stat(image_file)
+            if multi_page:
+                cached_pages = ocr_cache.get_file(ocr_cache_namespace + '-pages', image_file, file_stat)
+                texts = json.loads(cached_pages) if cached_pages is not None else None
+            else:
+                text = ocr_cache.get_file(ocr_cache_namespace, image_file, file_stat)
+                texts = [text] if text is not None else None
+    no_text_reasons = []
+    cached = texts is not None
     
-    # Optional: Add more preprocessing steps here
-    # - Resize image for better OCR
-    # - Apply filters
-    # - Adjust brightness
+    if not cached:
+        # Every image gets its own budget, as images are scanned on concurrent threads
+        budget = DocumentBudget(timeout=FILE_TIMEOUT)
+        if multi_page:
+            texts, no_text_reasons, cached = ocr_multi_page_image(image_file, file_stat, budget)
+        else:
+            texts, no_text_reasons, cached = ocr_single_image(image_file, file_stat, budget)
+    
+    # Find matches for every rule in the extracted text of each page
+    rows = []
+    with perf_timings.timer('match', file_type):
+        for page_number, text in enumerate(texts, 1):
+            if text is None:
+                continue
+            for match in rule_set.regex.finditer(text):
+                # For rules with groups this reports the first non-empty group
+                rule_name, value = rule_set.describe(match)
+                rows.append({
+                    'Image': image_file.name,
+                    'PATH': relative_path,
+                    'Page': page_number,
+                    'Match': value,
+                    'Rule': rule_name
+                })
     
-    return img
+    return {'rows': rows, 'cached': cached, 'pages': len(texts), 'no_text_reasons': no_text_reasons}
 
 def main():
     """Main function with error handling"""
+    global ocr_cache, ocr_cache_namespace, ocr_batcher, preprocess_steps, rule_set, tesseract_slots
     
     # Check if directory exists
     if not os.path.exists(image_dir):
@@ -78,94 +471,290 @@ def main():
     
     # Check if Tesseract is available
     try:
-        pytesseract.get_tesseract_version()
-        print(f"Tesseract version: {pytesseract.get_tesseract_version()}")
+        tesseract_version = pytesseract.get_tesseract_version()
+        print(f"Tesseract version: {tesseract_version}")
     except Exception as e:
         print(f"Error: Tesseract not found or not properly configured.")
         print(f"Please install Tesseract and update the 'tesseract_cmd' path.")
         print(f"Error details: {e}")
         return
     
-    # Process each image in the directory and subdirectories
-    # Use a comprehensive pattern to catch all image files
-    image_extensions = ['*.jpg', '*.jpeg', '*.png', '*.gif', '*.bmp', '*.tiff', '*.webp']
-    image_files = []
+    # Walk the directory tree once in the background; images are scanned as they are found
+    image_files = FileDiscovery(image_dir, IMAGE_EXTENSIONS, background=True)
+    print(f"Searching {image_dir} for images (a '+' after the image count means the search is still running)")
     
+    # Compile the rules once; every OCR job shares the combined regex
     try:
-        for ext in image_extensions:
-            image_files.extend(Path(image_dir).rglob(ext))
-    except Exception as e:
-        print(f"Error scanning directory: {e}")
+        if RULES_FILE:
+            rule_set = RuleSet.from_file(RULES_FILE)
+            print(f"Detection rules: {len(rule_set.rules)} loaded from {RULES_FILE}")
+        else:
+            rule_set = RuleSet.from_pattern('combined_pattern', combined_pattern)
+            print(f"Search pattern: {combined_pattern}")
+    except (OSError, ValueError) as e:
+        print(f"Error loading detection rules: {e}")
         return
-
-    print(f"Found {len(image_files)} image files to process")
-    print(f"Search pattern: {combined_pattern}")
     
-    # Process files with progress tracking
-    for i, image_file in enumerate(image_files, 1):
-        try:
-            print(f"Processing image {i}/{len(image_files)}: {image_file.name}")
-            
-            # Get relative path excluding the target directory
-            relative_path = str(image_file.relative_to(image_dir))
-            
-            # Preprocess the image
-            img = preprocess_image(image_file)
-            
-            # Perform OCR
-            text = pytesseract.image_to_string(img)
-            
-            # Find patterns in the extracted text
-            matches = re.findall(combined_pattern, text)
+    try:
+        preprocess_steps = get_pipeline(PREPROCESS_PIPELINE)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    print(f"Preprocessing: {pipeline_name(PREPROCESS_PIPELINE)} "
+          f"(max {MAX_IMAGE_DIMENSION or 'full'} px, {TARGET_DPI or 'any'} DPI)")
+    
+    # OCR output depends on the preprocessing, the tesseract version and options, so they are part of the cache namespace
+    if CACHE_DB:
+        ocr_cache = ExtractionCache(CACHE_DB, max_size_bytes=CACHE_MAX_SIZE)
+        ocr_cache_namespace = (f"{CACHE_NAMESPACE}-{pipeline_name(PREPROCESS_PIPELINE)}-"
+                               f"{MAX_IMAGE_DIMENSION}-{TARGET_DPI}-"
+                               f"tesseract-{tesseract_version}-{OCR_LANG}-{OCR_CONFIG}")
+    
+    # Pin tesseract's OpenMP threads; every OCR job inherits this environment
+    os.environ['OMP_THREAD_LIMIT'] = str(OCR_THREADS_PER_JOB)
+    
+    try:
+        result_writer = StreamingResultWriter(output_csv, RESULT_COLUMNS,
+                                              count_fields=['Image', 'Match', 'Rule'],
+                                              batch_size=RESULT_BATCH_SIZE,
+                                              flush_interval=RESULT_FLUSH_INTERVAL,
+                                              resume=RESUME_INTERRUPTED_SCAN)
+        # Doubles as the journal of skipped images, so a resumed scan does not retry them
+        skipped_writer = StreamingResultWriter(skipped_images_csv, SKIPPED_COLUMNS,
+                                               count_fields=['Reason'],
+                                               batch_size=1,
+                                               resume=RESUME_INTERRUPTED_SCAN)
+    except ResumeError as e:
+        print(f"Error: {e}")
+        return
+    if not skipped_writer.resumed_files and os.path.exists(skipped_images_csv):
+        os.remove(skipped_images_csv)  # Left by an earlier scan
+    resumed_images = result_writer.resumed_files + skipped_writer.resumed_files
+    if resumed_images:
+        print(f"Resuming interrupted scan: {resumed_images} images already processed")
+    
+    def is_done(image_file):
+        relative_path = str(image_file.relative_to(image_dir))
+        return result_writer.is_done(relative_path) or skipped_writer.is_done(relative_path)
+    
+    # Identical copies are only OCR'd once; their rows are copied to every duplicate
+    images_to_scan = image_files
+    duplicates_of = {}
+    if DEDUPLICATE_FILES:
+        print("Waiting for the directory search to finish to find identical copies...")
+        # Includes waiting for the directory search
+        with perf_timings.timer('dedup'):
+            unique_images = group_duplicates(image_file for image_file in image_files
+                                             if not is_done(image_file))
+        images_to_scan = [image_file for image_file, _ in unique_images]
+        duplicates_of = {image_file: duplicates for image_file, duplicates in unique_images if duplicates}
+        print(f"Identical copies skipped: {sum(map(len, duplicates_of.values()))} "
+              f"(scanning {len(images_to_scan)} unique images)")
+    
+    def iter_images_to_scan():
+        for i, image_file in enumerate(images_to_scan, 1):
+            if is_done(image_file):
+                continue
+            if DEDUPLICATE_FILES:
+                images_found = len(images_to_scan)
+            else:
+                images_found = f"{image_files.total}{'' if image_files.finished else '+'}"
+            print(f"Processing image {i}/{images_found}: {image_file.name}")
+            yield image_file
+    
+    # Every batch needs enough concurrent jobs to fill it; at most OCR_WORKERS tesseract processes run at once
+    ocr_jobs = OCR_WORKERS
+    tesseract_slots = threading.BoundedSemaphore(OCR_WORKERS)
+    if OCR_BATCH_SIZE > 1:
+        ocr_batcher = TesseractBatcher(pytesseract.pytesseract.tesseract_cmd, OCR_BATCH_SIZE,
+                                       lang=OCR_LANG, config=OCR_CONFIG, timeout=OCR_TIMEOUT,
+                                       process_slots=tesseract_slots)
+        ocr_jobs = OCR_WORKERS * OCR_BATCH_SIZE
+        print(f"OCR batches of up to {OCR_BATCH_SIZE} images per tesseract process")
+    
+    # Images sharing tesseract batches need threads of one process; otherwise every
+    # image is scanned in a worker process that is killed if PIL or tesseract hangs
+    if FILE_HARD_TIMEOUT and ocr_batcher is None:
+        print(f"Worker processes: {OCR_WORKERS} (a worker still busy with an image after {FILE_HARD_TIMEOUT}s is replaced)")
+        image_results = iter_supervised_results(functools.partial(process_image_in_worker, get_worker_settings()),
+                                                iter_images_to_scan(), OCR_WORKERS, FILE_HARD_TIMEOUT)
+    elif ocr_jobs > 1:
+        # OCR runs in tesseract subprocesses, so threads are enough to keep them busy
+        print(f"Running {ocr_jobs} OCR jobs at a time")
+        image_results = iter_pool_results(process_image, iter_images_to_scan(), ocr_jobs,
+                                          max_pending=ocr_jobs * 2,
+                                          executor_class=ThreadPoolExecutor)
+    else:
+        image_results = iter_serial_results(process_image, iter_images_to_scan())
+    
+    cached_images = 0
+    no_text_pages = Counter()  # Images and pages skipped by the pre-OCR triage, by reason
+    multi_page_images = 0
+    pages_scanned = 0
+    
+    # Results arrive in completion order when OCR jobs run concurrently
+    # Closing the writer in finally keeps everything found so far if the scan is interrupted
+    try:
+        for image_file, image_result, error in image_results:
+            duplicates = duplicates_of.get(image_file, [])
             
-            # Store results
-            for match in matches:
-                # Handle tuple output from regex groups (take the first non-empty group)
-                if isinstance(match, tuple):
-                    match = next((m for m in match if m), '')
-                results.append({
-                    'Image': image_file.name,
-                    'PATH': relative_path,
-                    'Match': match
-                })
+            if error is not None:
+                if isinstance(error, (TaskTimeout, TesseractTimeout)) or (isinstance(error, ResourceLimitExceeded)
+                                                                          and error.limit == 'time'):
+                    print(f"Skipping {image_file}: timed out ({error})")
+                    reason = 'Timeout'
+                elif isinstance(error, WorkerCrashed):
+                    print(f"Skipping {image_file}: {error}")
+                    reason = 'Worker crashed'
+                else:
+                    # Retried when the scan is resumed
+                    print(f"Error processing {image_file}: {error}")
+                    continue
+                for skipped_image in [image_file] + duplicates:
+                    relative_path = str(skipped_image.relative_to(image_dir))
+                    skipped_writer.add_rows([{'Image': skipped_image.name, 'PATH': relative_path,
+                                              'Reason': reason, 'Details': str(error)}],
+                                            done_key=relative_path)
+                continue
             
-            print(f"  Found {len(matches)} matches")
+            if 'timings' in image_result:
+                perf_timings.merge(image_result['timings'], image_file.suffix.lower())
+            with perf_timings.timer('csv_write', image_file.suffix.lower()):
+                result_writer.add_rows(image_result['rows'], done_key=str(image_file.relative_to(image_dir)))
+                for duplicate in duplicates:
+                    relative_path = str(duplicate.relative_to(image_dir))
+                    result_writer.add_rows([dict(row, Image=duplicate.name, PATH=relative_path)
+                                            for row in image_result['rows']], done_key=relative_path)
             
-        except Exception as e:
-            print(f"Error processing {image_file}: {e}")
-            continue
+            no_text_reasons = image_result['no_text_reasons']
+            no_text_pages.update(no_text_reasons)
+            pages_scanned += image_result['pages']
+            if image_result['pages'] > 1:
+                multi_page_images += 1
+            pages = f" in {image_result['pages']} pages" if image_result['pages'] > 1 else ""
+            if no_text_reasons and len(no_text_reasons) == image_result['pages']:
+                print(f"  {image_file.name}: No text ({', '.join(sorted(set(no_text_reasons)))}), OCR skipped")
+            elif image_result['cached']:
+                cached_images += 1
+                print(f"  {image_file.name}: Found {len(image_result['rows'])} matches{pages} (cached OCR)")
+            else:
+                print(f"  {image_file.name}: Found {len(image_result['rows'])} matches{pages}")
+                if no_text_reasons:
+                    print(f"    OCR skipped for {len(no_text_reasons)} pages without text")
+            if duplicates:
+                print(f"    Same results recorded for {len(duplicates)} identical copies")
+    finally:
+        with perf_timings.timer('csv_write'):
+            result_writer.close()
+        skipped_writer.close()
+        if ocr_batcher is not None:
+            ocr_batcher.close()
+    
+    # Only reached when every image was processed, so the next run starts from scratch
+    result_writer.mark_scan_complete()
+    skipped_writer.mark_scan_complete()
+    
+    if image_files.elapsed is not None:
+        perf_timings.add('discovery', image_files.elapsed)
+    
+    print(f"\nFound {image_files.total} images in {image_files.directories} directories")
+    for image_type, count in sorted(image_files.counts.items()):
+        print(f"  {image_type}: {count} images")
+    for path, error in image_files.errors:
+        print(f"Error scanning {path}: {error}")
 
-    # Save results to CSV
-    try:
-        if results:
-            df = pd.DataFrame(results)
-            df.to_csv(output_csv, index=False, encoding='utf-8')
-            print(f"\nResults saved to {output_csv}")
-            print(f"Total matches found: {len(results)}")
-            
-            # Print summary
-            print("\nSummary:")
-            unique_images = df['Image'].nunique()
-            unique_matches = df['Match'].nunique()
-            print(f"  Images processed: {len(image_files)}")
-            print(f"  Images with matches: {unique_images}")
-            print(f"  Unique matches found: {unique_matches}")
-            
-            # Show top matches
-            if len(results) > 0:
-                print("\nTop matches:")
-                match_counts = df['Match'].value_counts().head(10)
-                for match, count in match_counts.items():
-                    print(f"  '{match}': {count} occurrences")
-        else:
-            print("No matches found in any images.")
-    except Exception as e:
-        print(f"Error saving results: {e}")
+    # Print results summary from the writer's running totals
+    if result_writer.total_rows:
+        print(f"\nResults saved to {output_csv}")
+        print(f"Total matches found: {result_writer.total_rows}")
+        
+        # Print summary
+        print("\nSummary:")
+        print(f"  Images processed: {image_files.total}")
+        # Distinct counts are estimates and top counts lower bounds once there are many values
+        image_counts = result_writer.counts['Image']
+        match_counts = result_writer.counts['Match']
+        print(f"  Images with matches: {'' if image_counts.distinct_is_exact() else '~'}{image_counts.distinct()}")
+        print(f"  Unique matches found: {'' if match_counts.distinct_is_exact() else '~'}{match_counts.distinct()}")
+        
+        # Show top matches
+        print("\nTop matches:" if match_counts.exact else "\nTop matches (at least this many occurrences):")
+        for match, count in match_counts.most_common(10):
+            print(f"  '{match}': {count} occurrences")
+        
+        if RULES_FILE:
+            print("\nSummary by rule:")
+            for rule_name, count in result_writer.counts['Rule'].most_common():
+                print(f"  {rule_name}: {count} matches")
+    else:
+        print("No matches found in any images.")
+
+    if PRE_OCR_TRIAGE and NUMPY_AVAILABLE:
+        print(f"\nImages and pages skipped by the pre-OCR triage: {sum(no_text_pages.values())}")
+        for reason, count in no_text_pages.most_common():
+            print(f"  {reason}: {count}")
+    
+    if skipped_writer.total_rows:
+        print(f"\nImages that timed out or crashed their worker: {skipped_writer.total_rows} "
+              f"(listed in {skipped_images_csv})")
+        for reason, count in skipped_writer.counts['Reason'].most_common():
+            print(f"  {reason}: {count}")
+    
+    if multi_page_images:
+        print(f"\nMulti-page images: {multi_page_images} ({pages_scanned} pages in all images scanned)")
+    
+    if ocr_batcher is not None:
+        print(f"\nTesseract batches run: {ocr_batcher.batches_run}")
+    
+    # Per-stage timings, to tell whether a slow run is I/O, decoding or OCR
+    if PERF_REPORT:
+        perf_timings.print_summary()
+        try:
+            perf_timings.write_report(PERF_REPORT)
+            print(f"Performance report saved to {PERF_REPORT}")
+        except Exception as e:
+            print(f"Error saving performance report: {e}")
+    
+    # Keep the OCR cache within its size limit
+    if ocr_cache is not None:
+        print(f"\nImages served from the OCR cache: {cached_images}")
+        try:
+            evicted = ocr_cache.evict()
+            if evicted:
+                print(f"Evicted {evicted} old entries from {CACHE_DB}")
+        except Exception as e:
+            print(f"Error trimming OCR cache: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan images for sensitive patterns using OCR")
+    parser.add_argument('--workers', type=int, default=OCR_WORKERS,
+                        help=f"number of concurrent OCR jobs (default: {OCR_WORKERS})")
+    parser.add_argument('--batch-size', type=int, default=OCR_BATCH_SIZE,
+                        help=f"images OCR'd per tesseract process (default: {OCR_BATCH_SIZE})")
+    parser.add_argument('--pipeline', choices=sorted(PIPELINES), default=None,
+                        help=f"preprocessing applied before OCR (default: {pipeline_name(PREPROCESS_PIPELINE)})")
+    parser.add_argument('--perf-report', default=PERF_REPORT, metavar='FILE',
+                        help="write per-stage timings to FILE (.json or .csv)")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="run the scan under cProfile and save the profile to FILE")
+    args = parser.parse_args()
+    OCR_WORKERS = max(1, args.workers)
+    OCR_BATCH_SIZE = max(1, args.batch_size)
+    if args.pipeline:
+        PREPROCESS_PIPELINE = args.pipeline
+    PERF_REPORT = args.perf_report
+    if args.profile:
+        # Scan in this process so preprocessing and OCR show up in the profile
+        FILE_HARD_TIMEOUT = None
+    
     try:
-        main()
+        if args.profile:
+            run_profiled(main, args.profile)
+        else:
+            main()
     except KeyboardInterrupt:
         print("\nProcess interrupted by user")
+        if RESUME_INTERRUPTED_SCAN:
+            print("Results found so far were saved; run the script again to resume the scan")
     except Exception as e:
         print(f"Unexpected error: {e}") 
\ No newline at end of file
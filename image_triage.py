@@ -0,0 +1,67 @@
+"""
+Cheap check for images that cannot contain text
+
+Before an image is OCR'd at full resolution, a downscaled grayscale copy is
+measured with a few vectorized NumPy statistics, per tile of TILE_SIZE
+pixels so a single line of text on an otherwise empty page still counts:
+
+- contrast: the standard deviation of the pixel values; blank scans and
+  flat backgrounds have almost none
+- edge density: the share of pixels next to a sharp brightness step; text
+  strokes produce many of them, smooth photos, gradients and soft
+  backgrounds none
+
+An image is classified as having no text when even its best tile is below
+either threshold, or when it is too small to hold legible text. The
+thresholds err on the side of OCR'ing an image, because a skipped image is
+a possible missed leak.
+"""
+import numpy as np
+
+# Side of the square tiles the downscaled image is measured in
+TILE_SIZE = 32
+
+# Brightness difference between neighbouring pixels that counts as an edge
+EDGE_STEP = 32
+
+
+def image_stats(gray_img):
+    """Return the highest (contrast, edge density) of any tile of a grayscale PIL image"""
+    pixels = np.asarray(gray_img, dtype=np.int16)
+    if pixels.ndim != 2 or min(pixels.shape) < 2:
+        return 0.0, 0.0
+
+    edges = np.zeros(pixels.shape, dtype=bool)
+    edges[:, :-1] |= np.abs(np.diff(pixels, axis=1)) >= EDGE_STEP
+    edges[:-1, :] |= np.abs(np.diff(pixels, axis=0)) >= EDGE_STEP
+
+    # Cut into whole tiles; images smaller than a tile are one tile
+    height, width = pixels.shape
+    tile_height = min(TILE_SIZE, height)
+    tile_width = min(TILE_SIZE, width)
+    rows, columns = height // tile_height, width // tile_width
+    shape = (rows, tile_height, columns, tile_width)
+    tiles = pixels[:rows * tile_height, :columns * tile_width].reshape(shape)
+    edge_tiles = edges[:rows * tile_height, :columns * tile_width].reshape(shape)
+
+    contrast = float(tiles.std(axis=(1, 3)).max())
+    edge_density = float(edge_tiles.mean(axis=(1, 3)).max())
+    return contrast, edge_density
+
+
+def triage_image(gray_img, original_size, min_size=16, min_contrast=8.0, min_edge_density=0.02):
+    """
+    Return None if the image may contain text, otherwise the reason it
+    cannot ('too small', 'blank' or 'no edges')
+
+    gray_img is the downscaled grayscale copy; original_size is the
+    (width, height) of the full image.
+    """
+    if min(original_size) < min_size:
+        return 'too small'
+    contrast, edge_density = image_stats(gray_img)
+    if contrast < min_contrast:
+        return 'blank'
+    if edge_density < min_edge_density:
+        return 'no edges'
+    return None
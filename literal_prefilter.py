@@ -0,0 +1,129 @@
+"""
+Fast keyword prefilter over raw document XML
+
+Before a document is parsed, the decompressed XML of its text parts is
+searched for the literals that every match must contain (see
+rule_engine.required_literals). Tags and whitespace are stripped and the
+remaining character data is lowercased, so a keyword split over several
+formatting runs (<w:t>Jet</w:t>...<w:t>Smart</w:t>) is still found. A
+document without any literal cannot produce a match and is skipped without
+building its text. Elements the extractors write out as a character, like
+<w:noBreakHyphen/> in PRJ<w:noBreakHyphen/>12345, are replaced by that
+character rather than stripped with the other tags.
+
+The search is deliberately loose: it may let through documents that turn
+out to have no matches, but it never rejects one that has. Numeric character
+references (&#74;) are not decoded, as Office applications write document
+text as plain UTF-8.
+"""
+import codecs
+import re
+
+# Bytes of decompressed XML read per search step
+BLOCK_SIZE = 256 * 1024
+
+TAG_RE = re.compile(rb'<[^>]*>')
+
+# Extractors join text nodes with whitespace, so it is ignored on both sides
+WHITESPACE = b' \t\r\n'
+
+# Entity-escaped forms a literal can take inside XML character data
+XML_ESCAPES = (
+    {'&': '&amp;', '<': '&lt;', '>': '&gt;'},
+    {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&apos;'},
+)
+
+
+def _character_names(characters):
+    """Return the local names, as bytes, of the elements of characters standing for something other than whitespace"""
+    return sorted(name.encode('ascii') for name, character in characters.items() if character.strip())
+
+
+def _character_tags(characters):
+    """
+    Return a regex matching the elements of characters (local name -> character,
+    in any namespace) that stand for something other than whitespace, or None
+    Whitespace is ignored anyway, so those elements can go with the other tags
+    """
+    names = _character_names(characters)
+    if not names:
+        return None
+    alternatives = b'|'.join(re.escape(name) for name in names)
+    return re.compile(rb'<(?:[^\s<>/:]+:)?(' + alternatives + rb')(?=[\s/>])[^>]*>')
+
+
+def _escape(text, escapes):
+    """Replace characters using an XML escape table"""
+    return ''.join(escapes.get(char, char) for char in text)
+
+
+class LiteralPrefilter:
+    """
+    Search decompressed XML for any of a set of literals, ignoring case
+    characters maps the local names of elements standing for a character
+    (e.g. xml_text.WORDML_CHARACTERS) to that character
+    """
+
+    def __init__(self, literals, characters=None):
+        variants = set()
+        for literal in literals:
+            literal = ''.join(literal.lower().split())
+            if not literal:
+                continue
+            variants.add(literal)
+            for escapes in XML_ESCAPES:
+                variants.add(_escape(literal, escapes))
+        if not variants:
+            raise ValueError("No literals to search for")
+
+        # bytes.lower() only folds ASCII, non-ASCII literals need the text decoded
+        self.decode = not all(variant.isascii() for variant in variants)
+        if self.decode:
+            self.literals = sorted(variants, key=len)
+        else:
+            self.literals = sorted((variant.encode('ascii') for variant in variants), key=len)
+        self.max_length = max(len(variant.encode('utf-8')) for variant in variants)
+
+        self.character_tags = _character_tags(characters) if characters else None
+        if self.character_tags is not None:
+            self.character_names = _character_names(characters)
+            self.replacements = {name.encode('ascii'): character.encode('utf-8')
+                                 for name, character in characters.items()}
+
+    def _replace_character(self, match):
+        return self.replacements[match.group(1)]
+
+    def search_xml(self, blocks):
+        """Return True if the character data of an XML byte stream contains a literal"""
+        decoder = codecs.getincrementaldecoder('utf-8')('ignore') if self.decode else None
+        carry = b''  # Unfinished tag at the end of the previous block
+        tail = '' if self.decode else b''  # Text kept for literals split across blocks
+        first = True
+
+        for block in blocks:
+            # Only UTF-8 is searched; anything else goes on to the real parser
+            if first and block.startswith((b'\xff\xfe', b'\xfe\xff')):
+                return True
+            first = False
+
+            data = carry + block
+            cut = data.rfind(b'<')
+            if cut != -1 and data.find(b'>', cut) == -1:
+                data, carry = data[:cut], data[cut:]
+            else:
+                carry = b''
+
+            # Most blocks have none of these elements, a substring search is cheaper than the regex
+            if self.character_tags is not None and any(name in data for name in self.character_names):
+                data = self.character_tags.sub(self._replace_character, data)
+            text = TAG_RE.sub(b'', data).translate(None, WHITESPACE)
+            if decoder is not None:
+                text = decoder.decode(text)
+            window = tail + text.lower()
+
+            for literal in self.literals:
+                if literal in window:
+                    return True
+            tail = window[max(0, len(window) - self.max_length + 1):]
+
+        return False
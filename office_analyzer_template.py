@@ -1,18 +1,24 @@
 import os
-import re
-import pandas as pd
-from pathlib import Path
-import zipfile
 import xml.etree.ElementTree as ET
 import sys
+import time
+import argparse
 
-# For .docx, .xlsx, .pptx files
-try:
-    from docx import Document
-    DOCX_AVAILABLE = True
-except ImportError:
-    print("python-docx not installed. Install with: pip install python-docx")
-    DOCX_AVAILABLE = False
+from scan_pool import iter_serial_results, iter_pool_results, iter_supervised_results, TaskTimeout, WorkerCrashed
+from result_writer import StreamingResultWriter, ResumeError
+from extraction_cache import ExtractionCache, CompressedText
+from text_matching import ChunkMatcher
+from rule_engine import RuleSet
+from literal_prefilter import LiteralPrefilter, BLOCK_SIZE as PREFILTER_BLOCK_SIZE
+from archive_access import open_archive
+from ole2_reader import iter_doc_text, iter_ppt_text
+from xml_text import (iter_element_text, iter_element_text_etree,
+                      iter_wordml_paragraphs, iter_wordml_paragraphs_etree,
+                      ODF_CHARACTERS, WORDML_CHARACTERS)
+from file_discovery import FileDiscovery
+from file_dedup import group_duplicates
+from perf_stats import PerfStats, TimedIterator, TimedReader, run_profiled
+from resource_limits import DocumentBudget, ResourceLimitExceeded
 
 # For .xls files (legacy format)
 try:
@@ -22,14 +28,14 @@ except ImportError:
     print("xlrd not installed. Install with: pip install xlrd")
     XLRD_AVAILABLE = False
 
-# For LibreOffice/OpenDocument files (.odt, .ods, .odp, .odg)
+# For OCR of images embedded in Office files (OCR_EMBEDDED_IMAGES)
 try:
-    import zipfile
-    import xml.etree.ElementTree as ET
-    ODT_AVAILABLE = True
+    import pytesseract
+    from embedded_images import EmbeddedImageOCR, iter_image_members, MEDIA_PREFIXES
+    from image_preprocessing import get_pipeline, pipeline_name
+    OCR_AVAILABLE = True
 except ImportError:
-    print("zipfile/xml.etree not available for OpenDocument support")
-    ODT_AVAILABLE = False
+    OCR_AVAILABLE = False
 
 # =============================================================================
 # CONFIGURATION SECTION - MODIFY THESE SETTINGS AS NEEDED
@@ -43,6 +49,48 @@ skipped_files_log = 'skipped_large_files.txt'  # Log file for skipped files
 # Maximum file size in bytes (20MB = 20 * 1024 * 1024)
 MAX_FILE_SIZE = 20 * 1024 * 1024
 
+# Per-document budgets, checked while a document is decompressed and its text
+# extracted, so a small file expanding to gigabytes (a "zip bomb") cannot take
+# down a worker. Documents over budget are listed in skipped_files_log with the
+# limit they exceeded and none of their matches are reported (None = no limit)
+MAX_MEMBER_SIZE = 256 * 1024 * 1024  # Decompressed bytes of one archive member
+MAX_ARCHIVE_SIZE = 1024 * 1024 * 1024  # Decompressed bytes of all the members read from a document
+MAX_COMPRESSION_RATIO = 100  # Decompressed / compressed size of members over 1MB
+MAX_TEXT_LENGTH = 50 * 1000 * 1000  # Characters of extracted text
+FILE_TIMEOUT = 300  # Seconds spent on one document
+
+# Scan every file in a worker process that is killed and replaced when it is
+# still busy with one file after this many seconds, so a hung extractor cannot
+# stall the scan (also with --workers 1). Leave some time over FILE_TIMEOUT,
+# which stops slow documents and their tesseract runs cleanly; files that run
+# out of either are listed in skipped_files_log as 'Timeout' (None = scan in
+# this process when MAX_WORKERS is 1, without a hard timeout)
+FILE_HARD_TIMEOUT = 360
+
+# Number of worker processes used to scan files (1 = one file at a time)
+# Can also be set from the command line: python office_analyzer_template.py --workers 8
+MAX_WORKERS = 1
+
+# Result rows are appended to output_csv in batches as files finish
+RESULT_BATCH_SIZE = 1000  # Rows buffered before writing to the CSV
+RESULT_FLUSH_INTERVAL = 10  # Seconds between writes even if the batch is not full
+
+# Persistent cache of extracted text, so files that did not change since the
+# last run are not parsed again (set CACHE_DB = None to disable)
+CACHE_DB = 'office_cache.sqlite'
+CACHE_MAX_SIZE = 2 * 1024 * 1024 * 1024  # Evict least recently used text above 2GB
+CACHE_USE_CONTENT_HASH = False  # Also recognise moved/touched files by hashing their content
+
+# Scan only one of several byte-identical copies of a file and report its
+# matches for every copy. Files are grouped by size and content hash after the
+# directory search finishes, so scanning only starts once the whole tree was
+# searched; worth it for trees with many copies (False starts right away)
+DEDUPLICATE_FILES = False
+
+# Continue an interrupted scan: files listed in the journal written next to
+# output_csv are skipped and new results are appended to the existing CSV
+RESUME_INTERRUPTED_SCAN = True
+
 # =============================================================================
 # PATTERN CONFIGURATION - MODIFY THIS SECTION FOR YOUR SEARCH PATTERNS
 # =============================================================================
@@ -57,14 +105,101 @@ MAX_FILE_SIZE = 20 * 1024 * 1024
 
 exact_pattern = r'\b(your_pattern_here)\b'
 
+# Optional JSON file with many named detection rules (see examples/rules_example.json)
+# When set it replaces exact_pattern; all rules are compiled into one combined
+# scanner and the 'Rule' column of the results names the rule that matched
+RULES_FILE = None
+
+# Skip documents whose raw XML contains none of the literal keywords the
+# patterns require, without extracting their text. Only used when every
+# pattern has such keywords (e.g. r'\b(jetsmart|JA|JE)\b', but not r'\d{4}')
+USE_LITERAL_PREFILTER = True
+
+# Read document, slide and OpenDocument text with a streaming expat parser
+# instead of building an ElementTree for every member (False uses ElementTree)
+XML_FAST_PATH = True
+
+# OCR the pictures embedded in .docx, .xlsx, .pptx and OpenDocument files, such
+# as screenshots pasted into documents and slides (needs pytesseract, Pillow and
+# Tesseract). Pictures are read from the archive in memory and every distinct
+# picture, recognised by the CRC-32 and size in the ZIP directory, is OCR'd only
+# once; its text is kept in CACHE_DB for every other document that embeds it
+OCR_EMBEDDED_IMAGES = False
+TESSERACT_CMD = r'/usr/bin/tesseract'  # See image_analyzer_template.py for common paths
+OCR_LANG = 'eng'
+OCR_CONFIG = ''
+EMBEDDED_IMAGE_PIPELINE = 'original'  # Preprocessing, see image_preprocessing.PIPELINES
+EMBEDDED_IMAGE_MAX_SIZE = 20 * 1024 * 1024  # Larger pictures are not OCR'd
+
+# Write the time spent per stage (discovery, unzip, extraction, matching, OCR,
+# CSV writing...) per file type to this JSON file, or CSV if it ends in .csv
+# (None = no report). Can also be set with --perf-report; --profile FILE runs
+# the scan under cProfile (use with --workers 1, workers are not profiled)
+PERF_REPORT = None
+
 # =============================================================================
 # END CONFIGURATION SECTION
 # =============================================================================
 
-# List to store results
-results = []
+# Office file types scanned (matched ignoring case)
+OFFICE_EXTENSIONS = ['.docx', '.doc', '.xls', '.xlsx', '.pptx', '.ppt', '.odt', '.ods', '.odp', '.odg']
+
+# Columns written to output_csv
+RESULT_COLUMNS = ['File', 'PATH', 'Match', 'Rule', 'File_Type', 'File_Size_MB']
+
+# Cached text is only valid for the extractor code that produced it
+# Bump this whenever an extract_text_from_* function changes its output
+CACHE_NAMESPACE = 'office-text-6'
+
+# Cached OCR text of embedded pictures; the preprocessing settings, the
+# tesseract version and options are added (see get_embedded_ocr_settings)
+EMBEDDED_OCR_NAMESPACE = 'embedded-ocr-1'
+
+# Embedded pictures are scaled down to this size while decoding, as in the image analyzer
+EMBEDDED_IMAGE_MAX_DIMENSION = 4000
+EMBEDDED_IMAGE_TARGET_DPI = 300
+
+# Paragraph and heading elements of OpenDocument content.xml
+ODF_TEXT_NS = 'urn:oasis:names:tc:opendocument:xmlns:text:1.0'
+ODF_PARAGRAPH_TAGS = ('p', 'h')
+
+# Parts of a .docx file holding text, in the order they are read
+# Every header and footer part is read (word/header1.xml, word/footer2.xml...)
+DOCX_TEXT_MEMBERS = ('word/document.xml', 'word/header', 'word/footer', 'word/footnotes.xml',
+                     'word/endnotes.xml', 'word/comments.xml')
+
+# Archive members holding the document text, searched by the literal prefilter
+# .xls, .doc and .ppt files are binary and always go through the full extractor
+PREFILTER_MEMBERS = {
+    '.docx': DOCX_TEXT_MEMBERS,
+    '.xlsx': ('xl/sharedStrings.xml', 'xl/worksheets/sheet'),
+    '.pptx': ('ppt/slides/slide',),
+    '.odt': ('content.xml',),
+    '.ods': ('content.xml',),
+    '.odp': ('content.xml',),
+    '.odg': ('content.xml',),
+}
+
+# List to store skipped files
 skipped_files = []
 
+# Opened lazily in every process that uses them (see get_extraction_cache / get_rule_set)
+extraction_cache = None
+rule_set = None
+pattern_matcher = None
+literal_prefilter = None
+embedded_image_ocr = None
+embedded_ocr_settings = None
+
+# Stage timings of the file being scanned in this process, returned with its results
+file_timings = PerfStats()
+
+# Resource budget of the file being scanned in this process (see get_document_budget)
+document_budget = None
+
+# Set when an extractor skipped part of the file being scanned after an error
+extraction_incomplete = False
+
 def get_file_size_mb(file_path):
     """Get file size in MB"""
     try:
@@ -83,241 +218,501 @@ def format_file_size(size_bytes):
     else:
         return f"{size_bytes / (1024 * 1024):.1f} MB"
 
-def extract_text_from_docx(file_path):
-    """Extract text from .docx files"""
-    if not DOCX_AVAILABLE:
-        return ""
-    
+def iter_text_from_docx(file_path):
+    """
+    Yield the text of each paragraph in a .docx file: body (with tables and
+    text boxes), headers, footers, footnotes, endnotes and comments
+    """
     try:
-        doc = Document(file_path)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
+        with open_archive(file_path) as zip_file:
+            member_names = zip_file.namelist()
+            for prefix in DOCX_TEXT_MEMBERS:
+                for member_name in member_names:
+                    if not member_name.startswith(prefix) or not member_name.endswith('.xml'):
+                        continue
+                    try:
+                        with open_zip_member(zip_file, member_name) as f:
+                            for text in iter_wordml_text(f):
+                                if text:
+                                    yield text + "\n"
+                    except ResourceLimitExceeded:
+                        raise
+                    except Exception as e:
+                        report_extraction_error(f"Error reading {member_name} of {file_path}: {e}")
+    except ResourceLimitExceeded:
+        raise
     except Exception as e:
-        print(f"Error extracting text from {file_path}: {e}")
-        return ""
+        report_extraction_error(f"Error extracting text from {file_path}: {e}")
 
-def extract_text_from_xlsx(file_path):
-    """Extract text from .xlsx files"""
+def report_extraction_error(message):
+    """Print an error an extractor carried on after; the text of the file is then not cached"""
+    global extraction_incomplete
+    extraction_incomplete = True
+    print(message)
+
+def local_name(tag):
+    """Return an XML tag without its {namespace} prefix"""
+    return tag.rpartition('}')[2]
+
+def open_zip_member(zip_file, member_name):
+    """
+    Open an archive member for reading within the document's budget, timing
+    its decompression as the 'unzip' stage
+    """
+    return TimedReader(get_document_budget().open_member(zip_file, member_name), file_timings, 'unzip')
+
+def read_xlsx_shared_strings(zip_file):
+    """
+    Read xl/sharedStrings.xml into a list indexed by string number
+    Parsed incrementally with iterparse so the tree never holds more than one string
+    """
+    shared_strings = []
+    try:
+        with open_zip_member(zip_file, 'xl/sharedStrings.xml') as f:
+            root = None
+            for event, elem in ET.iterparse(f, events=('start', 'end')):
+                if root is None:
+                    root = elem
+                elif event == 'end' and local_name(elem.tag) == 'si':
+                    # Rich text strings are split over several <t> runs
+                    shared_strings.append(' '.join([t.text or '' for t in elem.findall('.//{*}t')]))
+                    root.clear()
+    except KeyError:
+        pass  # No shared strings file
+    return shared_strings
+
+def iter_xlsx_sheet_cells(f, shared_strings):
+    """
+    Yield the text of every cell in a worksheet XML stream
+    Rows are cleared from the tree as soon as they are read, so memory stays
+    constant regardless of sheet size
+    """
+    sheet_data = None
+    for event, elem in ET.iterparse(f, events=('start', 'end')):
+        tag = local_name(elem.tag)
+        
+        if event == 'start':
+            if tag == 'sheetData':
+                sheet_data = elem
+            continue
+        
+        if tag == 'c':
+            cell_type = elem.get('t')
+            cell_value = None
+            
+            for child in elem:
+                child_tag = local_name(child.tag)
+                if child_tag == 'v':
+                    cell_value = child.text
+                elif child_tag == 'is':
+                    # Inline strings keep their text in <is><t> instead of <v>
+                    cell_value = ' '.join([t.text or '' for t in child.findall('.//{*}t')])
+            
+            if not cell_value:
+                continue
+            
+            # Check if it's a shared string reference
+            if cell_type == 's':
+                try:
+                    cell_value = shared_strings[int(cell_value)]
+                except (IndexError, ValueError):
+                    pass
+            
+            yield cell_value
+        elif tag == 'row' and sheet_data is not None:
+            # Drop finished rows from <sheetData>
+            sheet_data.clear()
+
+def iter_text_from_xlsx(file_path):
+    """Yield the text of each cell in a .xlsx file"""
     try:
         # Open the Excel file as a ZIP archive
-        with zipfile.ZipFile(file_path, 'r') as zip_file:
-            # Read the shared strings file
-            shared_strings = {}
-            try:
-                with zip_file.open('xl/sharedStrings.xml') as f:
-                    tree = ET.parse(f)
-                    root = tree.getroot()
-                    for i, si in enumerate(root.findall('.//{*}si')):
-                        text_elements = si.findall('.//{*}t')
-                        shared_strings[i] = ' '.join([t.text or '' for t in text_elements])
-            except KeyError:
-                pass  # No shared strings file
+        with open_archive(file_path) as zip_file:
+            shared_strings = read_xlsx_shared_strings(zip_file)
             
             # Read all worksheets
-            text = ""
             for sheet_name in zip_file.namelist():
                 if sheet_name.startswith('xl/worksheets/sheet') and sheet_name.endswith('.xml'):
                     try:
-                        with zip_file.open(sheet_name) as f:
-                            tree = ET.parse(f)
-                            root = tree.getroot()
-                            
-                            # Extract text from cells
-                            for row in root.findall('.//{*}row'):
-                                for cell in row.findall('.//{*}c'):
-                                    # Get cell value
-                                    value_elem = cell.find('.//{*}v')
-                                    if value_elem is not None and value_elem.text:
-                                        cell_value = value_elem.text
-                                        
-                                        # Check if it's a shared string reference
-                                        if cell.get('t') == 's':
-                                            try:
-                                                cell_value = shared_strings[int(cell_value)]
-                                            except (KeyError, ValueError):
-                                                pass
-                                        
-                                        text += str(cell_value) + " "
+                        with open_zip_member(zip_file, sheet_name) as f:
+                            for cell_value in iter_xlsx_sheet_cells(f, shared_strings):
+                                yield cell_value + " "
+                    except ResourceLimitExceeded:
+                        raise
                     except Exception as e:
-                        print(f"Error reading sheet {sheet_name}: {e}")
+                        report_extraction_error(f"Error reading sheet {sheet_name}: {e}")
                         continue
-        return text
+    except ResourceLimitExceeded:
+        raise
     except Exception as e:
-        print(f"Error extracting text from {file_path}: {e}")
-        return ""
+        report_extraction_error(f"Error extracting text from {file_path}: {e}")
 
-def extract_text_from_pptx(file_path):
-    """Extract text from .pptx files"""
+def iter_text_from_pptx(file_path):
+    """Yield the text of each slide in a .pptx file"""
     try:
-        with zipfile.ZipFile(file_path, 'r') as zip_file:
-            text = ""
+        with open_archive(file_path) as zip_file:
             # Read all slide files
             for slide_name in zip_file.namelist():
                 if slide_name.startswith('ppt/slides/slide') and slide_name.endswith('.xml'):
                     try:
-                        with zip_file.open(slide_name) as f:
-                            tree = ET.parse(f)
-                            root = tree.getroot()
-                            
-                            # Extract text from text elements
-                            for text_elem in root.findall('.//{*}t'):
-                                if text_elem.text:
-                                    text += text_elem.text + " "
+                        with open_zip_member(zip_file, slide_name) as f:
+                            # Extract text from <a:t> text elements
+                            slide_text = [text + " " for text in iter_xml_element_text(f, ('t',))
+                                          if text]
+                    except ResourceLimitExceeded:
+                        raise
                     except Exception as e:
-                        print(f"Error reading slide {slide_name}: {e}")
+                        report_extraction_error(f"Error reading slide {slide_name}: {e}")
                         continue
-        return text
+                    yield ''.join(slide_text)
+    except ResourceLimitExceeded:
+        raise
     except Exception as e:
-        print(f"Error extracting text from {file_path}: {e}")
-        return ""
+        report_extraction_error(f"Error extracting text from {file_path}: {e}")
 
-def extract_text_from_xls(file_path):
-    """Extract text from .xls files (legacy format)"""
+def iter_text_from_xls(file_path):
+    """Yield the text of each row in a .xls file (legacy format)"""
     if not XLRD_AVAILABLE:
-        return ""
+        return
     
     try:
         workbook = xlrd.open_workbook(file_path)
-        text = ""
         for sheet_name in workbook.sheet_names():
             sheet = workbook.sheet_by_name(sheet_name)
             for row_idx in range(sheet.nrows):
-                for col_idx in range(sheet.ncols):
-                    cell_value = sheet.cell_value(row_idx, col_idx)
-                    if cell_value:
-                        text += str(cell_value) + " "
-        return text
+                yield ''.join([str(cell_value) + " " for cell_value in sheet.row_values(row_idx)
+                               if cell_value])
+    except ResourceLimitExceeded:
+        raise
     except Exception as e:
-        print(f"Error extracting text from {file_path}: {e}")
-        return ""
+        report_extraction_error(f"Error extracting text from {file_path}: {e}")
 
-def extract_text_from_odt(file_path):
-    """Extract text from .odt (OpenDocument Text) files"""
-    if not ODT_AVAILABLE:
-        return ""
-    
+def iter_text_from_doc(file_path):
+    """Yield the text of a .doc file (Word 97-2003) in blocks"""
     try:
-        with zipfile.ZipFile(file_path, 'r') as zip_file:
-            # Read the content.xml file which contains the text
-            with zip_file.open('content.xml') as f:
-                tree = ET.parse(f)
-                root = tree.getroot()
-                
-                # Extract text from all text elements
-                text_elements = root.findall('.//{*}text')
-                text = ""
-                for element in text_elements:
-                    if element.text:
-                        text += element.text + " "
-                return text
+        yield from iter_doc_text(file_path)
+    except ResourceLimitExceeded:
+        raise
     except Exception as e:
-        print(f"Error extracting text from {file_path}: {e}")
-        return ""
+        report_extraction_error(f"Error extracting text from {file_path}: {e}")
 
-def extract_text_from_ods(file_path):
-    """Extract text from .ods (OpenDocument Spreadsheet) files"""
-    if not ODT_AVAILABLE:
-        return ""
-    
+def iter_text_from_ppt(file_path):
+    """Yield the text of each text box and note in a .ppt file (PowerPoint 97-2003)"""
     try:
-        with zipfile.ZipFile(file_path, 'r') as zip_file:
-            # Read the content.xml file which contains the spreadsheet data
-            with zip_file.open('content.xml') as f:
-                tree = ET.parse(f)
-                root = tree.getroot()
-                
-                # Extract text from all table cells
-                text_elements = root.findall('.//{*}table-cell')
-                text = ""
-                for element in text_elements:
-                    # Get text from paragraph elements within cells
-                    paragraphs = element.findall('.//{*}p')
-                    for p in paragraphs:
-                        if p.text:
-                            text += p.text + " "
-                return text
+        yield from iter_ppt_text(file_path)
+    except ResourceLimitExceeded:
+        raise
     except Exception as e:
-        print(f"Error extracting text from {file_path}: {e}")
-        return ""
+        report_extraction_error(f"Error extracting text from {file_path}: {e}")
 
-def extract_text_from_odp(file_path):
-    """Extract text from .odp (OpenDocument Presentation) files"""
-    if not ODT_AVAILABLE:
-        return ""
-    
+def iter_xml_element_text(f, local_names, namespace=None, characters=None):
+    """Yield the text of matching XML elements with the parser chosen by XML_FAST_PATH"""
+    if XML_FAST_PATH:
+        return iter_element_text(f, local_names, namespace, characters=characters)
+    return iter_element_text_etree(f, local_names, namespace, characters=characters)
+
+def iter_wordml_text(f):
+    """Yield the text of each paragraph of a .docx part with the parser chosen by XML_FAST_PATH"""
+    if XML_FAST_PATH:
+        return iter_wordml_paragraphs(f)
+    return iter_wordml_paragraphs_etree(f)
+
+def iter_odf_paragraphs(file_path):
+    """Yield the text of each paragraph and heading in an OpenDocument content.xml"""
     try:
-        with zipfile.ZipFile(file_path, 'r') as zip_file:
-            # Read the content.xml file which contains the presentation data
-            with zip_file.open('content.xml') as f:
-                tree = ET.parse(f)
-                root = tree.getroot()
-                
-                # Extract text from all text elements in slides
-                text_elements = root.findall('.//{*}text')
-                text = ""
-                for element in text_elements:
-                    if element.text:
-                        text += element.text + " "
-                return text
+        with open_archive(file_path) as zip_file:
+            # Read the content.xml file which contains the document body
+            with open_zip_member(zip_file, 'content.xml') as f:
+                for text in iter_xml_element_text(f, ODF_PARAGRAPH_TAGS, ODF_TEXT_NS, ODF_CHARACTERS):
+                    if text:
+                        yield text + "\n"
+    except ResourceLimitExceeded:
+        raise
     except Exception as e:
-        print(f"Error extracting text from {file_path}: {e}")
-        return ""
+        report_extraction_error(f"Error extracting text from {file_path}: {e}")
+
+def iter_text_from_odt(file_path):
+    """Yield the text of each paragraph in a .odt (OpenDocument Text) file"""
+    yield from iter_odf_paragraphs(file_path)
 
-def extract_text_from_odg(file_path):
-    """Extract text from .odg (OpenDocument Drawing) files"""
-    if not ODT_AVAILABLE:
-        return ""
+def iter_text_from_ods(file_path):
+    """Yield the text of each cell paragraph in a .ods (OpenDocument Spreadsheet) file"""
+    # Cell text is held in text:p elements, streamed like the other OpenDocument types
+    yield from iter_odf_paragraphs(file_path)
+
+def iter_text_from_odp(file_path):
+    """Yield the text of each paragraph in a .odp (OpenDocument Presentation) file"""
+    yield from iter_odf_paragraphs(file_path)
+
+def iter_text_from_odg(file_path):
+    """Yield the text of each paragraph in a .odg (OpenDocument Drawing) file"""
+    yield from iter_odf_paragraphs(file_path)
+
+def iter_embedded_image_text(file_path):
+    """Yield the OCR text of the pictures embedded in an Office file"""
+    image_ocr = get_embedded_image_ocr()
+    if image_ocr is None or file_path.suffix.lower() not in MEDIA_PREFIXES:
+        return
     
     try:
-        with zipfile.ZipFile(file_path, 'r') as zip_file:
-            # Read the content.xml file which contains the drawing data
-            with zip_file.open('content.xml') as f:
-                tree = ET.parse(f)
-                root = tree.getroot()
-                
-                # Extract text from all text elements in drawings
-                text_elements = root.findall('.//{*}text')
-                text = ""
-                for element in text_elements:
-                    if element.text:
-                        text += element.text + " "
-                return text
+        with open_archive(file_path) as zip_file:
+            yield from image_ocr.iter_text(zip_file, file_path.suffix.lower(), open_zip_member)
+    except ResourceLimitExceeded:
+        raise
     except Exception as e:
-        print(f"Error extracting text from {file_path}: {e}")
-        return ""
+        report_extraction_error(f"Error reading embedded images from {file_path}: {e}")
 
-def extract_text_from_office_file(file_path):
-    """Extract text from Office files based on file extension"""
+def iter_text_from_office_file(file_path):
+    """Yield text chunks from Office files, followed by the OCR text of their embedded pictures"""
+    yield from iter_document_text(file_path)
+    if OCR_EMBEDDED_IMAGES:
+        yield from iter_embedded_image_text(file_path)
+
+def iter_document_text(file_path):
+    """Yield text chunks from Office files based on file extension"""
     file_ext = file_path.suffix.lower()
     
     if file_ext == '.docx':
-        return extract_text_from_docx(file_path)
+        return iter_text_from_docx(file_path)
     elif file_ext == '.xlsx':
-        return extract_text_from_xlsx(file_path)
+        return iter_text_from_xlsx(file_path)
     elif file_ext == '.pptx':
-        return extract_text_from_pptx(file_path)
+        return iter_text_from_pptx(file_path)
     elif file_ext == '.xls':
-        return extract_text_from_xls(file_path)
+        return iter_text_from_xls(file_path)
+    elif file_ext == '.doc':
+        return iter_text_from_doc(file_path)
+    elif file_ext == '.ppt':
+        return iter_text_from_ppt(file_path)
     elif file_ext == '.odt':
-        return extract_text_from_odt(file_path)
+        return iter_text_from_odt(file_path)
     elif file_ext == '.ods':
-        return extract_text_from_ods(file_path)
+        return iter_text_from_ods(file_path)
     elif file_ext == '.odp':
-        return extract_text_from_odp(file_path)
+        return iter_text_from_odp(file_path)
     elif file_ext == '.odg':
-        return extract_text_from_odg(file_path)
-    elif file_ext == '.doc':
-        print(f"Skipping {file_path}: .doc files not supported in this version")
-        return ""
+        return iter_text_from_odg(file_path)
     else:
         print(f"Unsupported file format: {file_ext}")
-        return ""
+        return iter(())
+
+def extract_text_from_office_file(file_path):
+    """
+    Extract text from Office files based on file extension
+    Starts the document budget again, so every call gets its own FILE_TIMEOUT
+    and size limits (iter_text_from_office_file uses the budget as it is)
+    """
+    get_document_budget().start()
+    return ''.join(iter_text_from_office_file(file_path))
+
+def get_extraction_cache():
+    """Return this process's extraction cache, or None if caching is disabled"""
+    global extraction_cache
+    if CACHE_DB and extraction_cache is None:
+        extraction_cache = ExtractionCache(CACHE_DB, max_size_bytes=CACHE_MAX_SIZE,
+                                           use_content_hash=CACHE_USE_CONTENT_HASH)
+    return extraction_cache
+
+def embedded_ocr_enabled():
+    """Return True if embedded pictures are OCR'd in this process"""
+    return OCR_EMBEDDED_IMAGES and OCR_AVAILABLE
+
+def get_embedded_ocr_settings():
+    """
+    Return the preprocessing and tesseract settings the OCR text of embedded
+    pictures depends on, for cache namespaces, as in the image analyzer
+    """
+    global embedded_ocr_settings
+    if embedded_ocr_settings is None:
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+        embedded_ocr_settings = (f"{pipeline_name(EMBEDDED_IMAGE_PIPELINE)}-"
+                                 f"{EMBEDDED_IMAGE_MAX_DIMENSION}-{EMBEDDED_IMAGE_TARGET_DPI}-"
+                                 f"tesseract-{pytesseract.get_tesseract_version()}-{OCR_LANG}-{OCR_CONFIG}")
+    return embedded_ocr_settings
+
+def get_text_cache_namespace():
+    """Return the cache namespace of extracted text, which includes embedded picture text when it is OCR'd"""
+    if embedded_ocr_enabled():
+        return f"{CACHE_NAMESPACE}-images-{get_embedded_ocr_settings()}"
+    return CACHE_NAMESPACE
+
+def ocr_embedded_image(img):
+    """OCR a preprocessed embedded picture, killing tesseract when the document runs out of time"""
+    timeout = get_document_budget().remaining_time()
+    with file_timings.timer('ocr'):
+        return pytesseract.image_to_string(img, lang=OCR_LANG, config=OCR_CONFIG, timeout=timeout or 0)
+
+def get_embedded_image_ocr():
+    """Return this process's OCR for embedded pictures, or None if it is disabled"""
+    global embedded_image_ocr
+    if embedded_ocr_enabled() and embedded_image_ocr is None:
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+        embedded_image_ocr = EmbeddedImageOCR(
+            ocr_embedded_image,
+            get_pipeline(EMBEDDED_IMAGE_PIPELINE),
+            cache=get_extraction_cache(),
+            namespace=f"{EMBEDDED_OCR_NAMESPACE}-{get_embedded_ocr_settings()}",
+            max_dimension=EMBEDDED_IMAGE_MAX_DIMENSION,
+            target_dpi=EMBEDDED_IMAGE_TARGET_DPI,
+            max_member_size=EMBEDDED_IMAGE_MAX_SIZE)
+    return embedded_image_ocr
+
+def get_document_budget():
+    """Return this process's budget for the document being scanned"""
+    global document_budget
+    if document_budget is None:
+        document_budget = DocumentBudget(
+            max_member_size=MAX_MEMBER_SIZE,
+            max_archive_size=MAX_ARCHIVE_SIZE,
+            max_compression_ratio=MAX_COMPRESSION_RATIO,
+            max_text_length=MAX_TEXT_LENGTH,
+            timeout=FILE_TIMEOUT)
+    return document_budget
+
+def get_rule_set():
+    """Return this process's detection rules, compiled once from RULES_FILE or exact_pattern"""
+    global rule_set, pattern_matcher, literal_prefilter
+    if rule_set is None:
+        if RULES_FILE:
+            rule_set = RuleSet.from_file(RULES_FILE, ignore_case=True)
+        else:
+            rule_set = RuleSet.from_pattern('exact_pattern', exact_pattern, ignore_case=True)
+        pattern_matcher = ChunkMatcher(rule_set.regex)
+        if USE_LITERAL_PREFILTER and rule_set.literals:
+            literal_prefilter = LiteralPrefilter(rule_set.literals,
+                                                 characters={**WORDML_CHARACTERS, **ODF_CHARACTERS})
+    return rule_set
+
+def may_contain_match(file_path):
+    """
+    Return False if the document's XML contains none of the literals the rules require
+    The decompressed XML is searched block by block and the search stops at
+    the first literal found. Documents with embedded pictures always pass
+    when those are OCR'd, as their text is not in the XML
+    """
+    get_rule_set()
+    prefixes = PREFILTER_MEMBERS.get(file_path.suffix.lower())
+    if literal_prefilter is None or prefixes is None:
+        return True
+    
+    try:
+        with open_archive(file_path) as zip_file:
+            if embedded_ocr_enabled() and any(iter_image_members(zip_file, file_path.suffix.lower())):
+                return True
+            for member_name in zip_file.namelist():
+                if not member_name.startswith(prefixes) or not member_name.endswith('.xml'):
+                    continue
+                with get_document_budget().open_member(zip_file, member_name) as f:
+                    if literal_prefilter.search_xml(iter(lambda: f.read(PREFILTER_BLOCK_SIZE), b'')):
+                        return True
+    except ResourceLimitExceeded:
+        raise
+    except Exception:
+        return True  # Let the extractor report damaged files
+    return False
+
+def process_office_file(office_file):
+    """
+    Extract text from a single Office file and find pattern matches
+    Runs inside a worker process when MAX_WORKERS > 1, so it returns plain data
+    instead of writing to the results CSV. Raises ResourceLimitExceeded if the
+    file is over its budget
+    """
+    file_timings.drain()  # Drop timings left behind by a file that failed
+    get_document_budget().start()
+    with file_timings.timer('file'):
+        file_result = scan_office_file(office_file)
+    file_result['timings'] = file_timings.drain()
+    return file_result
+
+def scan_office_file(office_file):
+    """Extract text from a single Office file and find pattern matches, timing each stage"""
+    global extraction_incomplete
+    extraction_incomplete = False
+    file_size_bytes, file_size_mb = get_file_size_mb(office_file)
+    
+    # Get relative path excluding the target directory
+    relative_path = str(office_file.relative_to(office_dir))
+    
+    # Reuse the text from a previous run if the file did not change
+    cache = get_extraction_cache()
+    cache_namespace = get_text_cache_namespace()
+    cached_text = None
+    if cache is not None:
+        with file_timings.timer('cache_lookup'):
+            file_stat = os.stat(office_file)
+            cached_text = cache.get_file(cache_namespace, office_file, file_stat)
+    cached = cached_text is not None
+    
+    # Documents without any required keyword cannot match, so skip parsing them
+    if not cached:
+        with file_timings.timer('prefilter'):
+            prefiltered = not may_contain_match(office_file)
+        if prefiltered:
+            return {'rows': [], 'text_extracted': False, 'cached': False, 'prefiltered': True,
+                    'images_ocrd': 0}
+    
+    image_ocr = get_embedded_image_ocr()
+    images_ocrd_before = image_ocr.images_ocrd if image_ocr is not None else 0
+    image_errors_before = image_ocr.errors if image_ocr is not None else 0
+    
+    text_recorder = None
+    if cached:
+        chunks = extraction = TimedIterator([cached_text])
+    else:
+        # Extract text from the Office file chunk by chunk
+        chunks = extraction = TimedIterator(iter_text_from_office_file(office_file))
+        if cache is not None:
+            text_recorder = CompressedText()
+            chunks = text_recorder.record(chunks)
+    
+    extracted_chars = 0
+    budget = get_document_budget()
+    
+    def count_chars(chunks):
+        nonlocal extracted_chars
+        for chunk in chunks:
+            extracted_chars += len(chunk)
+            budget.add_text(len(chunk))
+            yield chunk
+    
+    # Find matches for every rule while the document is still being extracted
+    rows = []
+    rules = get_rule_set()
+    scan_started = time.perf_counter()
+    for match in pattern_matcher.iter_matches(count_chars(chunks)):
+        rule_name, value = rules.describe(match)
+        rows.append({
+            'File': office_file.name,
+            'PATH': relative_path,
+            'Match': value,
+            'Rule': rule_name,
+            'File_Type': office_file.suffix.lower(),
+            'File_Size_MB': round(file_size_mb, 2)
+        })
+    
+    # Extractors that caught an exceeded budget and carried on still fail the file
+    budget.check_time()
+    
+    # Extraction runs inside the matching loop; the rest of the loop is matching
+    if not cached:
+        file_timings.add('extract', extraction.seconds)
+    file_timings.add('match', time.perf_counter() - scan_started - extraction.seconds)
+    
+    # Extractors carry on after errors, so only cache text that was extracted completely
+    extraction_complete = not extraction_incomplete and (image_ocr is None
+                                                         or image_ocr.errors == image_errors_before)
+    if text_recorder is not None and extracted_chars and extraction_complete:
+        with file_timings.timer('cache_store'):
+            cache.put_file(cache_namespace, office_file, text_recorder, file_stat)
+    
+    images_ocrd = image_ocr.images_ocrd - images_ocrd_before if image_ocr is not None else 0
+    return {'rows': rows, 'text_extracted': extracted_chars > 0, 'cached': cached,
+            'prefiltered': False, 'images_ocrd': images_ocrd}
 
 def main():
     """Main function with error handling"""
-    global results, skipped_files
+    global skipped_files
     
     # Check if directory exists
     if not os.path.exists(office_dir):
@@ -325,91 +720,228 @@ def main():
         print("Please update the 'office_dir' variable in the configuration section.")
         return
     
-    # Process each Office file in the directory and subdirectories
-    office_extensions = ['*.docx', '*.xls', '*.xlsx', '*.pptx', '*.odt', '*.ods', '*.odp', '*.odg']
-    office_files = []
+    # Time spent per stage and file type, added up over the whole scan
+    run_timings = PerfStats()
+    
+    # Walk the directory tree once in the background; files are scanned as they are found
+    office_files = FileDiscovery(office_dir, OFFICE_EXTENSIONS, background=True)
+    print(f"Searching {office_dir} for Office files (a '+' after the file count means the search is still running)")
+    print(f"Maximum file size limit: {format_file_size(MAX_FILE_SIZE)}")
     
+    # Load the rules up front so configuration errors stop the scan before it starts
     try:
-        for ext in office_extensions:
-            office_files.extend(Path(office_dir).rglob(ext))
-    except Exception as e:
-        print(f"Error scanning directory: {e}")
+        rules = get_rule_set()
+    except (OSError, ValueError) as e:
+        print(f"Error loading detection rules: {e}")
         return
-
-    print(f"Found {len(office_files)} Office files to process")
-    print(f"Maximum file size limit: {format_file_size(MAX_FILE_SIZE)}")
-    print(f"Search pattern: {exact_pattern}")
+    if RULES_FILE:
+        print(f"Detection rules: {len(rules.rules)} loaded from {RULES_FILE}")
+    else:
+        print(f"Search pattern: {exact_pattern}")
+    if literal_prefilter is not None:
+        print(f"Literal prefilter: {', '.join(sorted(rules.literals))}")
+    elif USE_LITERAL_PREFILTER:
+        print("Literal prefilter: off (a pattern has no required literal keywords)")
     
-    # Process files with progress tracking
-    for i, office_file in enumerate(office_files, 1):
+    # Embedded pictures are OCR'd in the worker processes, one tesseract process each
+    if OCR_EMBEDDED_IMAGES:
+        if not OCR_AVAILABLE:
+            print("Error: OCR_EMBEDDED_IMAGES needs pytesseract and Pillow. Install with: pip install pytesseract Pillow")
+            return
         try:
-            # Check file size before processing
+            get_pipeline(EMBEDDED_IMAGE_PIPELINE)
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+            print(f"OCR of embedded images: Tesseract {pytesseract.get_tesseract_version()}")
+        except Exception as e:
+            print(f"Error: OCR of embedded images is not available: {e}")
+            print("Please install Tesseract and update TESSERACT_CMD, or set OCR_EMBEDDED_IMAGES = False.")
+            return
+        os.environ['OMP_THREAD_LIMIT'] = '1'
+    
+    try:
+        result_writer = StreamingResultWriter(output_csv, RESULT_COLUMNS,
+                                              count_fields=['File_Type', 'Rule'],
+                                              batch_size=RESULT_BATCH_SIZE,
+                                              flush_interval=RESULT_FLUSH_INTERVAL,
+                                              resume=RESUME_INTERRUPTED_SCAN)
+    except ResumeError as e:
+        print(f"Error: {e}")
+        return
+    if result_writer.resumed_files:
+        print(f"Resuming interrupted scan: {result_writer.resumed_files} files already processed")
+    
+    # Identical copies are only scanned once; their rows are copied to every duplicate
+    files_to_scan = office_files
+    duplicates_of = {}
+    if DEDUPLICATE_FILES:
+        print("Waiting for the directory search to finish to find identical copies...")
+        # Includes waiting for the directory search
+        with run_timings.timer('dedup'):
+            unique_files = group_duplicates(office_file for office_file in office_files
+                                            if not result_writer.is_done(str(office_file.relative_to(office_dir))))
+        files_to_scan = [office_file for office_file, _ in unique_files]
+        duplicates_of = {office_file: duplicates for office_file, duplicates in unique_files if duplicates}
+        print(f"Identical copies skipped: {sum(map(len, duplicates_of.values()))} "
+              f"(scanning {len(files_to_scan)} unique files)")
+    
+    # Size check runs here in the main process so oversized files never reach a worker
+    def iter_files_to_scan():
+        for i, office_file in enumerate(files_to_scan, 1):
+            if result_writer.is_done(str(office_file.relative_to(office_dir))):
+                continue
+            
+            if DEDUPLICATE_FILES:
+                files_found = len(files_to_scan)
+            else:
+                files_found = f"{office_files.total}{'' if office_files.finished else '+'}"
             file_size_bytes, file_size_mb = get_file_size_mb(office_file)
             
             if file_size_bytes > MAX_FILE_SIZE:
-                print(f"Skipping file {i}/{len(office_files)}: {office_file.name} (Size: {format_file_size(file_size_bytes)})")
-                skipped_files.append({
-                    'file': str(office_file),
-                    'size_bytes': file_size_bytes,
-                    'size_mb': file_size_mb,
-                    'reason': 'File too large'
-                })
+                print(f"Skipping file {i}/{files_found}: {office_file.name} (Size: {format_file_size(file_size_bytes)})")
+                for skipped_file in [office_file] + duplicates_of.get(office_file, []):
+                    skipped_files.append({
+                        'file': str(skipped_file),
+                        'size_bytes': file_size_bytes,
+                        'size_mb': file_size_mb,
+                        'reason': 'File too large'
+                    })
                 continue
             
-            print(f"Processing file {i}/{len(office_files)}: {office_file.name} (Size: {format_file_size(file_size_bytes)})")
+            print(f"Processing file {i}/{files_found}: {office_file.name} (Size: {format_file_size(file_size_bytes)})")
+            yield office_file
+    
+    if FILE_HARD_TIMEOUT:
+        print(f"Worker processes: {MAX_WORKERS} (a worker still busy with a file after {FILE_HARD_TIMEOUT}s is replaced)")
+        file_results = iter_supervised_results(process_office_file, iter_files_to_scan(), MAX_WORKERS,
+                                               FILE_HARD_TIMEOUT)
+    elif MAX_WORKERS > 1:
+        print(f"Scanning with {MAX_WORKERS} worker processes")
+        file_results = iter_pool_results(process_office_file, iter_files_to_scan(), MAX_WORKERS)
+    else:
+        file_results = iter_serial_results(process_office_file, iter_files_to_scan())
+    
+    cached_files = 0
+    prefiltered_files = 0
+    embedded_images_ocrd = 0
+    
+    # Results arrive in completion order when scanning in parallel
+    # Closing the writer in finally keeps everything found so far if the scan is interrupted
+    try:
+        for office_file, file_result, error in file_results:
+            duplicates = duplicates_of.get(office_file, [])
             
-            # Get relative path excluding the target directory
-            relative_path = str(office_file.relative_to(office_dir))
+            if error is not None:
+                if isinstance(error, TaskTimeout) or (isinstance(error, ResourceLimitExceeded)
+                                                      and error.limit == 'time'):
+                    print(f"Skipping {office_file}: timed out ({error})")
+                    reason = 'Timeout'
+                elif isinstance(error, WorkerCrashed):
+                    print(f"Skipping {office_file}: {error}")
+                    reason = 'Worker crashed'
+                elif isinstance(error, ResourceLimitExceeded):
+                    # Grouped by limit in the skipped files log
+                    print(f"Skipping {office_file}: {error}")
+                    reason = f'Resource limit exceeded: {error.limit}'
+                else:
+                    print(f"Error processing {office_file}: {error}")
+                    reason = f'Error: {str(error)}'
+                for failed_file in [office_file] + duplicates:
+                    skipped_files.append({
+                        'file': str(failed_file),
+                        'size_bytes': get_file_size_mb(failed_file)[0],
+                        'size_mb': get_file_size_mb(failed_file)[1],
+                        'reason': reason
+                    })
+                    # A resumed scan would only hang or crash on these again, so journal them as done
+                    if reason in ('Timeout', 'Worker crashed'):
+                        result_writer.add_rows([], done_key=str(failed_file.relative_to(office_dir)))
+                continue  # Continue with next file instead of crashing
             
-            # Extract text from the Office file
-            text = extract_text_from_office_file(office_file)
+            run_timings.merge(file_result['timings'], office_file.suffix.lower())
+            with run_timings.timer('csv_write', office_file.suffix.lower()):
+                result_writer.add_rows(file_result['rows'], done_key=str(office_file.relative_to(office_dir)))
+                for duplicate in duplicates:
+                    relative_path = str(duplicate.relative_to(office_dir))
+                    result_writer.add_rows([dict(row, File=duplicate.name, PATH=relative_path)
+                                            for row in file_result['rows']], done_key=relative_path)
             
-            if text:
-                # Find exact patterns in the extracted text
-                matches = re.findall(exact_pattern, text, re.IGNORECASE)
-                
-                # Store results
-                for match in matches:
-                    results.append({
-                        'File': office_file.name,
-                        'PATH': relative_path,
-                        'Match': match,
-                        'File_Type': office_file.suffix.lower(),
-                        'File_Size_MB': round(file_size_mb, 2)
-                    })
-                
-                print(f"  Found {len(matches)} matches")
+            embedded_images_ocrd += file_result['images_ocrd']
+            if file_result['prefiltered']:
+                prefiltered_files += 1
+                print(f"  {office_file.name}: No required keywords, skipped parsing")
+            elif file_result['cached']:
+                cached_files += 1
+                print(f"  {office_file.name}: Found {len(file_result['rows'])} matches (cached text)")
+            elif file_result['text_extracted']:
+                print(f"  {office_file.name}: Found {len(file_result['rows'])} matches")
             else:
-                print(f"  No text extracted")
-            
+                print(f"  {office_file.name}: No text extracted")
+            if duplicates:
+                print(f"    Same results recorded for {len(duplicates)} identical copies")
+    finally:
+        with run_timings.timer('csv_write'):
+            result_writer.close()
+    
+    # Only reached when every file was processed, so the next run starts from scratch
+    result_writer.mark_scan_complete()
+    
+    if office_files.elapsed is not None:
+        run_timings.add('discovery', office_files.elapsed)
+    
+    print(f"\nFound {office_files.total} Office files in {office_files.directories} directories")
+    for file_type, count in sorted(office_files.counts.items()):
+        print(f"  {file_type}: {count} files")
+    for path, error in office_files.errors:
+        print(f"Error scanning {path}: {error}")
+        skipped_files.append({
+            'file': path,
+            'size_bytes': 0,
+            'size_mb': 0,
+            'reason': 'Unreadable path'
+        })
+
+    # Print results summary from the writer's running totals
+    if result_writer.total_rows:
+        print(f"\nResults saved to {output_csv}")
+        print(f"Total matches found: {result_writer.total_rows}")
+        
+        # Print summary by file type
+        print("\nSummary by file type:")
+        for file_type, count in sorted(result_writer.counts['File_Type'].items()):
+            print(f"  {file_type}: {count} matches")
+        
+        if RULES_FILE:
+            print("\nSummary by rule:")
+            for rule_name, count in result_writer.counts['Rule'].most_common():
+                print(f"  {rule_name}: {count} matches")
+    else:
+        print("No matches found in any Office files.")
+
+    if literal_prefilter is not None:
+        print(f"\nFiles skipped by the literal prefilter: {prefiltered_files}")
+    
+    if OCR_EMBEDDED_IMAGES:
+        print(f"\nEmbedded images OCR'd: {embedded_images_ocrd} (pictures seen before reuse their text)")
+    
+    # Keep the extraction cache within its size limit
+    if CACHE_DB:
+        print(f"\nFiles served from the extraction cache: {cached_files}")
+        try:
+            evicted = get_extraction_cache().evict()
+            if evicted:
+                print(f"Evicted {evicted} old entries from {CACHE_DB}")
         except Exception as e:
-            print(f"Error processing {office_file}: {e}")
-            skipped_files.append({
-                'file': str(office_file),
-                'size_bytes': get_file_size_mb(office_file)[0],
-                'size_mb': get_file_size_mb(office_file)[1],
-                'reason': f'Error: {str(e)}'
-            })
-            continue  # Continue with next file instead of crashing
-
-    # Save results to CSV
-    try:
-        if results:
-            df = pd.DataFrame(results)
-            df.to_csv(output_csv, index=False, encoding='utf-8')
-            print(f"\nResults saved to {output_csv}")
-            print(f"Total matches found: {len(results)}")
-            
-            # Print summary by file type
-            print("\nSummary by file type:")
-            summary = df.groupby('File_Type').size()
-            for file_type, count in summary.items():
-                print(f"  {file_type}: {count} matches")
-        else:
-            print("No matches found in any Office files.")
-    except Exception as e:
-        print(f"Error saving results: {e}")
+            print(f"Error trimming extraction cache: {e}")
 
+    # Per-stage timings, to tell whether a slow run is I/O, parsing or OCR
+    if PERF_REPORT:
+        run_timings.print_summary()
+        try:
+            run_timings.write_report(PERF_REPORT)
+            print(f"Performance report saved to {PERF_REPORT}")
+        except Exception as e:
+            print(f"Error saving performance report: {e}")
+    
     # Save skipped files log
     try:
         if skipped_files:
@@ -449,10 +981,29 @@ def main():
         print(f"Error saving skipped files log: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan Office documents for sensitive patterns")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help=f"number of worker processes (default: {MAX_WORKERS})")
+    parser.add_argument('--perf-report', default=PERF_REPORT, metavar='FILE',
+                        help="write per-stage timings to FILE (.json or .csv)")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="run the scan under cProfile and save the profile to FILE")
+    args = parser.parse_args()
+    MAX_WORKERS = max(1, args.workers)
+    PERF_REPORT = args.perf_report
+    if args.profile:
+        # Scan in this process so the extractors show up in the profile
+        FILE_HARD_TIMEOUT = None
+    
     try:
-        main()
+        if args.profile:
+            run_profiled(main, args.profile)
+        else:
+            main()
     except KeyboardInterrupt:
         print("\nProcess interrupted by user")
+        if RESUME_INTERRUPTED_SCAN:
+            print("Results found so far were saved; run the script again to resume the scan")
         sys.exit(1)
     except Exception as e:
         print(f"Unexpected error: {e}")
@@ -0,0 +1,348 @@
+"""
+Text of legacy binary Word (.doc) and PowerPoint (.ppt) files
+
+Both formats are OLE2 compound files: a small FAT file system whose
+streams hold the document. CompoundFile memory-maps the file and reads
+the sector allocation table and the directory; a stream stored in
+consecutive sectors (the usual case) is returned as a view of the map
+without copying it.
+
+Word keeps all of a document's text (body, headers, footnotes, comments)
+in the WordDocument stream as pieces of 8-bit or UTF-16LE text, listed by
+the piece table in the 0Table or 1Table stream. PowerPoint stores text
+atoms among the records of the PowerPoint Document stream, which are
+walked in a single pass. Only the standard library is used, so this runs
+in the same worker processes as the other extractors.
+"""
+import mmap
+import struct
+import sys
+from array import array
+
+SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# Sector numbers at or above this mark the end of a chain or unused sectors
+MAX_REGULAR_SECTOR = 0xFFFFFFFA
+NO_STREAM = 0xFFFFFFFF
+
+DIRECTORY_ENTRY_SIZE = 128
+STREAM_OBJECT = 2
+ROOT_OBJECT = 5
+
+# Word: FIB flags and the offset of the fcClx/lcbClx pair in FibRgFcLcb97
+WORD_IDENT = 0xA5EC
+FIB_COMPLEX = 0x0004
+FIB_ENCRYPTED = 0x0100
+FIB_TABLE_1 = 0x0200
+WORD_97_NFIB = 101  # Word 6 and 95 files have a lower nFib and no piece table
+FIB_CLX_INDEX = 66
+PIECE_COMPRESSED = 0x40000000
+
+# PowerPoint record types holding text
+TEXT_CHARS_ATOM = 0x0FA0  # UTF-16LE
+TEXT_BYTES_ATOM = 0x0FA8  # 8-bit, the high byte of every character is 0
+CSTRING = 0x0FBA  # UTF-16LE: comments, notes, hyperlink titles
+
+# Characters of text decoded at a time from a long piece
+TEXT_BLOCK_CHARS = 64 * 1024
+
+# Word marks paragraphs, cells, breaks and fields with control characters
+CONTROL_CHARACTERS = dict.fromkeys(range(32))
+CONTROL_CHARACTERS.update({ord('\t'): '\t', ord('\n'): '\n', ord('\r'): '\n', 0x0B: '\n', 0x0C: '\n',
+                           0x07: '\t', 0x13: ' ', 0x14: ' ', 0x15: ' '})
+
+
+class OLE2Error(Exception):
+    """A file is not a readable OLE2 compound file, or lacks the expected streams"""
+
+
+class CompoundFile:
+    """Read the top-level streams of a memory-mapped OLE2 compound file"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise OLE2Error("Empty file")
+        self._data = memoryview(self._map)
+        try:
+            self._read_header()
+            self._fat = self._read_fat()
+            self._entries = self._read_directory()
+            self.streams = self._root_streams()
+            self._mini_stream = None
+            self._mini_fat = None
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self._map is None:
+            return
+        self._mini_stream = None
+        self._data.release()
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # A stream view is still in use; the map is closed when it is freed
+        self._file.close()
+        self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read_header(self):
+        if len(self._data) < 512 or self._data[:8] != SIGNATURE:
+            raise OLE2Error("Not an OLE2 compound file")
+        (sector_shift, mini_sector_shift, self._fat_sectors, self._first_directory_sector,
+         self._mini_stream_cutoff, self._first_mini_fat_sector, self._mini_fat_sectors,
+         self._first_difat_sector, self._difat_sectors) = struct.unpack_from('<HH10xII4xIIIII',
+                                                                              self._data, 0x1E)
+        if sector_shift not in (9, 12) or mini_sector_shift != 6:
+            raise OLE2Error(f"Unsupported sector size 2^{sector_shift}")
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_size = 1 << mini_sector_shift
+
+    def _sector(self, sector):
+        """Return a view of one regular sector"""
+        start = (sector + 1) * self.sector_size
+        if start + self.sector_size > len(self._data):
+            raise OLE2Error(f"Sector {sector} is past the end of the file")
+        return self._data[start:start + self.sector_size]
+
+    def _read_fat(self):
+        """Collect the FAT sector numbers from the header and DIFAT sectors and read the FAT"""
+        fat_sector_numbers = _uint32_array(self._data[0x4C:0x200])
+        sector = self._first_difat_sector
+        seen = set()
+        for _ in range(self._difat_sectors):
+            if sector >= MAX_REGULAR_SECTOR or len(fat_sector_numbers) >= self._fat_sectors:
+                break
+            if sector in seen:
+                raise OLE2Error("Damaged DIFAT chain")
+            seen.add(sector)
+            # Every DIFAT sector ends with the number of the next one
+            entries = _uint32_array(self._sector(sector))
+            fat_sector_numbers.extend(entries[:-1])
+            sector = entries[-1]
+
+        fat = array('I')
+        for sector in fat_sector_numbers[:self._fat_sectors]:
+            if sector < MAX_REGULAR_SECTOR:
+                fat.extend(_uint32_array(self._sector(sector)))
+        return fat
+
+    def _chain(self, start, fat):
+        """Return the sector numbers of a chain, guarding against loops"""
+        sectors = []
+        sector = start
+        while sector < MAX_REGULAR_SECTOR:
+            if sector >= len(fat) or len(sectors) > len(fat):
+                raise OLE2Error("Damaged sector chain")
+            sectors.append(sector)
+            sector = fat[sector]
+        return sectors
+
+    def _read_chain(self, data, sectors, sector_size, offset, size):
+        """
+        Return size bytes stored in sectors of data, where sector n starts at
+        offset + n * sector_size; runs of consecutive sectors are read as one
+        slice, and a single run is returned as a view without copying
+        """
+        runs = []
+        for sector in sectors:
+            if runs and runs[-1][1] == sector:
+                runs[-1][1] = sector + 1
+            else:
+                runs.append([sector, sector + 1])
+
+        parts = []
+        remaining = size
+        for first, end in runs:
+            if remaining <= 0:
+                break
+            start = offset + first * sector_size
+            length = min((end - first) * sector_size, remaining)
+            if start + length > len(data):
+                raise OLE2Error("Stream is past the end of the file")
+            parts.append(data[start:start + length])
+            remaining -= length
+        if remaining > 0:
+            raise OLE2Error("Stream is shorter than its directory entry")
+        if len(parts) == 1:
+            return parts[0]
+        return memoryview(b''.join(parts))
+
+    def _read_directory(self):
+        """Return the directory entries as (name, type, left, right, child, start sector, size)"""
+        sectors = self._chain(self._first_directory_sector, self._fat)
+        data = self._read_chain(self._data, sectors, self.sector_size, self.sector_size,
+                                len(sectors) * self.sector_size)
+        entries = []
+        for offset in range(0, len(data) - DIRECTORY_ENTRY_SIZE + 1, DIRECTORY_ENTRY_SIZE):
+            name_length, object_type, left, right, child, start, size = struct.unpack_from(
+                '<HB1xIII36xIQ', data, offset + 64)
+            name = str(data[offset:offset + max(0, min(name_length, 64) - 2)], 'utf-16-le', 'replace')
+            if self.sector_size == 512:
+                size &= 0xFFFFFFFF  # Version 3 files may leave garbage in the high half
+            entries.append((name, object_type, left, right, child, start, size))
+        if not entries or entries[0][1] != ROOT_OBJECT:
+            raise OLE2Error("Missing root directory entry")
+        return entries
+
+    def _root_streams(self):
+        """Map the names of the streams directly in the root storage to their entries"""
+        streams = {}
+        pending = [self._entries[0][4]]
+        seen = set()
+        while pending:
+            index = pending.pop()
+            if index == NO_STREAM or index in seen or index >= len(self._entries):
+                continue
+            seen.add(index)
+            entry = self._entries[index]
+            if entry[1] == STREAM_OBJECT:
+                streams[entry[0]] = entry
+            # Siblings form a tree; children of storages are not part of the root
+            pending.extend((entry[2], entry[3]))
+        return streams
+
+    def open_stream(self, name):
+        """Return the content of a top-level stream as a memoryview"""
+        entry = self.streams.get(name)
+        if entry is None:
+            raise OLE2Error(f"No '{name}' stream")
+        start, size = entry[5], entry[6]
+        if size < self._mini_stream_cutoff:
+            return self._read_mini_stream(start, size)
+        return self._read_chain(self._data, self._chain(start, self._fat), self.sector_size,
+                                self.sector_size, size)
+
+    def _read_mini_stream(self, start, size):
+        """Read a small stream from the mini stream held by the root entry"""
+        if self._mini_stream is None:
+            root = self._entries[0]
+            self._mini_stream = self._read_chain(self._data, self._chain(root[5], self._fat),
+                                                 self.sector_size, self.sector_size, root[6])
+            mini_fat_sectors = self._chain(self._first_mini_fat_sector, self._fat)
+            self._mini_fat = _uint32_array(self._read_chain(
+                self._data, mini_fat_sectors, self.sector_size, self.sector_size,
+                len(mini_fat_sectors) * self.sector_size))
+        return self._read_chain(self._mini_stream, self._chain(start, self._mini_fat),
+                                self.mini_sector_size, 0, size)
+
+
+def _uint32_array(data):
+    """Return little-endian 32-bit integers from data as an array"""
+    values = array('I')
+    values.frombytes(data[:len(data) - len(data) % 4])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def clean_text(text):
+    """Replace Word and PowerPoint control characters with whitespace"""
+    return text.translate(CONTROL_CHARACTERS)
+
+
+def _iter_decoded(data, start, length, encoding, char_size):
+    """Yield length characters of text at byte offset start, decoded in blocks"""
+    if start + length * char_size > len(data):
+        raise OLE2Error("Text piece is past the end of the WordDocument stream")
+    for block_start in range(0, length, TEXT_BLOCK_CHARS):
+        block_length = min(TEXT_BLOCK_CHARS, length - block_start)
+        offset = start + block_start * char_size
+        yield clean_text(str(data[offset:offset + block_length * char_size], encoding, 'replace'))
+
+
+def _iter_pieces(table, clx_offset, clx_length):
+    """Yield (byte offset, characters, compressed) of each text piece in the Clx of a Word table stream"""
+    offset = clx_offset
+    end = clx_offset + clx_length
+    if end > len(table):
+        raise OLE2Error("Piece table is past the end of the table stream")
+    # Property modifiers (Prc, type 1) come first, then the piece table (Pcdt, type 2)
+    while offset < end and table[offset] == 1:
+        offset += 3 + struct.unpack_from('<h', table, offset + 1)[0]
+    if offset + 5 > end or table[offset] != 2:
+        raise OLE2Error("Piece table not found")
+    plc_length = struct.unpack_from('<I', table, offset + 1)[0]
+    offset += 5
+    # n + 1 character positions followed by n 8-byte piece descriptors
+    pieces = (plc_length - 4) // 12
+    if offset + plc_length > end or pieces <= 0:
+        raise OLE2Error("Damaged piece table")
+    positions = struct.unpack_from(f'<{pieces + 1}I', table, offset)
+    descriptors = offset + (pieces + 1) * 4
+    for i in range(pieces):
+        fc = struct.unpack_from('<I', table, descriptors + i * 8 + 2)[0]
+        length = positions[i + 1] - positions[i]
+        if length <= 0:
+            continue
+        if fc & PIECE_COMPRESSED:
+            yield (fc & ~PIECE_COMPRESSED) // 2, length, True
+        else:
+            yield fc, length, False
+
+
+def iter_doc_text(path):
+    """Yield the text of a Word 97-2003 .doc file in blocks, including headers, notes and comments"""
+    with CompoundFile(path) as ole:
+        word = ole.open_stream('WordDocument')
+        if len(word) < 0x20:
+            raise OLE2Error("WordDocument stream is too short")
+        ident, nfib = struct.unpack_from('<HH', word, 0)
+        flags = struct.unpack_from('<H', word, 0x0A)[0]
+        if ident != WORD_IDENT:
+            raise OLE2Error("Not a Word document")
+        if flags & FIB_ENCRYPTED:
+            raise OLE2Error("Document is encrypted")
+
+        if nfib < WORD_97_NFIB:
+            # Word 6/95 keep the text as 8-bit characters between fcMin and fcMac
+            if flags & FIB_COMPLEX:
+                raise OLE2Error("Fast-saved Word 6/95 documents are not supported")
+            fc_min, fc_mac = struct.unpack_from('<II', word, 0x18)
+            yield from _iter_decoded(word, fc_min, max(0, fc_mac - fc_min), 'cp1252', 1)
+            return
+
+        # The FIB has variable-length arrays before the fcClx/lcbClx pair
+        offset = 32
+        csw = struct.unpack_from('<H', word, offset)[0]
+        offset += 2 + csw * 2
+        cslw = struct.unpack_from('<H', word, offset)[0]
+        offset += 2 + cslw * 4 + 2
+        clx_offset, clx_length = struct.unpack_from('<II', word, offset + FIB_CLX_INDEX * 4)
+        table = ole.open_stream('1Table' if flags & FIB_TABLE_1 else '0Table')
+        for start, length, compressed in _iter_pieces(table, clx_offset, clx_length):
+            if compressed:
+                yield from _iter_decoded(word, start, length, 'cp1252', 1)
+            else:
+                yield from _iter_decoded(word, start, length, 'utf-16-le', 2)
+
+
+def iter_ppt_text(path):
+    """Yield the text of every text atom of a PowerPoint 97-2003 .ppt file"""
+    with CompoundFile(path) as ole:
+        data = ole.open_stream('PowerPoint Document')
+        offset = 0
+        end = len(data)
+        while offset + 8 <= end:
+            version_instance, record_type, record_length = struct.unpack_from('<HHI', data, offset)
+            offset += 8
+            # The records of a container follow its header
+            if version_instance & 0x000F == 0x000F:
+                continue
+            if offset + record_length > end:
+                break
+            if record_type == TEXT_CHARS_ATOM or record_type == CSTRING:
+                yield clean_text(str(data[offset:offset + record_length], 'utf-16-le', 'replace')) + "\n"
+            elif record_type == TEXT_BYTES_ATOM:
+                yield clean_text(str(data[offset:offset + record_length], 'latin-1')) + "\n"
+            offset += record_length
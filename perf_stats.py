@@ -0,0 +1,210 @@
+"""
+Per-stage timing of a scan, for telling I/O, parsing and OCR time apart
+
+Code under test wraps each stage in a timer:
+
+    with perf_stats.timer('ocr', '.png'):
+        text = run_ocr(img)
+
+Durations are aggregated per stage and per file type into a count, total,
+maximum and a histogram with logarithmic buckets, so thousands of files
+cost a few counters, not a list of samples. Stages may be nested (e.g. the
+'unzip' time spent decompressing archive members is part of 'extract').
+
+Worker processes keep their own PerfStats; drain() returns what was
+recorded since the last call as plain picklable data, which the main
+process adds to the run's totals with merge(). The totals are written as
+JSON or CSV with write_report().
+"""
+import cProfile
+import csv
+import json
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds of the histogram buckets in seconds; the last bucket is open
+BUCKET_BOUNDS = (0.001, 0.01, 0.1, 1.0, 10.0)
+BUCKET_LABELS = ('<1ms', '<10ms', '<100ms', '<1s', '<10s', '>=10s')
+
+
+def _empty_stage():
+    return {'count': 0, 'total': 0.0, 'max': 0.0, 'buckets': [0] * len(BUCKET_LABELS)}
+
+
+def _add_to_stage(stage, seconds):
+    stage['count'] += 1
+    stage['total'] += seconds
+    stage['max'] = max(stage['max'], seconds)
+    bucket = 0
+    while bucket < len(BUCKET_BOUNDS) and seconds >= BUCKET_BOUNDS[bucket]:
+        bucket += 1
+    stage['buckets'][bucket] += 1
+
+
+def _merge_stage(stage, other):
+    stage['count'] += other['count']
+    stage['total'] += other['total']
+    stage['max'] = max(stage['max'], other['max'])
+    stage['buckets'] = [a + b for a, b in zip(stage['buckets'], other['buckets'])]
+
+
+class PerfStats:
+    """Thread-safe timing totals keyed by (stage, file type)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stages = {}  # (stage, file type or None) -> stage totals
+
+    @contextmanager
+    def timer(self, stage, file_type=None):
+        """Time the body of a with statement as one occurrence of stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, file_type)
+
+    def add(self, stage, seconds, file_type=None):
+        """Record one occurrence of stage that took seconds"""
+        with self._lock:
+            totals = self._stages.get((stage, file_type))
+            if totals is None:
+                totals = self._stages[(stage, file_type)] = _empty_stage()
+            _add_to_stage(totals, seconds)
+
+    def drain(self):
+        """Return the totals recorded so far as plain data and start over"""
+        with self._lock:
+            stages, self._stages = self._stages, {}
+        return stages
+
+    def merge(self, stages, file_type=None):
+        """Add totals returned by drain(), filing those without a file type under file_type"""
+        with self._lock:
+            for (stage, stage_file_type), other in stages.items():
+                key = (stage, stage_file_type or file_type)
+                totals = self._stages.get(key)
+                if totals is None:
+                    totals = self._stages[key] = _empty_stage()
+                _merge_stage(totals, other)
+
+    def report(self):
+        """Return the totals per stage, with a breakdown per file type"""
+        with self._lock:
+            stages = dict(self._stages)
+
+        combined = {}
+        by_file_type = {}
+        for (stage, file_type), totals in stages.items():
+            _merge_stage(combined.setdefault(stage, _empty_stage()), totals)
+            if file_type:
+                by_file_type.setdefault(stage, {})[file_type] = _describe(totals)
+
+        report = {'wall_time': round(time.perf_counter() - self.started, 3), 'stages': {}}
+        for stage in sorted(combined):
+            report['stages'][stage] = dict(_describe(combined[stage]),
+                                           by_file_type=dict(sorted(by_file_type.get(stage, {}).items())))
+        return report
+
+    def write_report(self, path):
+        """Write the report as CSV if path ends in .csv, otherwise as JSON"""
+        report = self.report()
+        if not path.lower().endswith('.csv'):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            return
+
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['stage', 'file_type', 'count', 'total_seconds', 'mean_seconds', 'max_seconds']
+                            + list(BUCKET_LABELS))
+            for stage, entry in report['stages'].items():
+                rows = [('', entry)] + sorted(entry['by_file_type'].items())
+                for file_type, totals in rows:
+                    writer.writerow([stage, file_type, totals['count'], totals['total'], totals['mean'],
+                                     totals['max']] + [totals['histogram'][label] for label in BUCKET_LABELS])
+
+    def print_summary(self):
+        """Print the time spent in each stage, longest first"""
+        report = self.report()
+        print(f"\nTime by stage (wall time {report['wall_time']:.1f}s; nested stages overlap):")
+        for stage, entry in sorted(report['stages'].items(), key=lambda item: -item[1]['total']):
+            print(f"  {stage}: {entry['total']:.2f}s over {entry['count']} calls "
+                  f"(mean {entry['mean'] * 1000:.1f}ms, max {entry['max'] * 1000:.1f}ms)")
+
+
+def _describe(totals):
+    """Turn stage totals into their report form"""
+    return {
+        'count': totals['count'],
+        'total': round(totals['total'], 6),
+        'mean': round(totals['total'] / totals['count'], 6) if totals['count'] else 0.0,
+        'max': round(totals['max'], 6),
+        'histogram': dict(zip(BUCKET_LABELS, totals['buckets'])),
+    }
+
+
+class TimedReader:
+    """Wrap a file object, recording the time spent in read() as one occurrence of stage when it is closed"""
+
+    def __init__(self, f, perf_stats, stage):
+        self._f = f
+        self._perf_stats = perf_stats
+        self._stage = stage
+        self._seconds = 0.0
+
+    def read(self, size=-1):
+        start = time.perf_counter()
+        try:
+            return self._f.read(size)
+        finally:
+            self._seconds += time.perf_counter() - start
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+            self._perf_stats.add(self._stage, self._seconds)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TimedIterator:
+    """Iterate over an iterable, adding up the time spent producing its items in seconds"""
+
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self._iterator)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+def run_profiled(func, profile_path, top=25):
+    """
+    Run func under cProfile, save the profile to profile_path and print the
+    functions with the most cumulative time (only this process is profiled)
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return func()
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+        print(f"\nProfile saved to {profile_path} (top {top} functions by cumulative time):")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(top)
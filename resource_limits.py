@@ -0,0 +1,132 @@
+"""
+Per-document resource budgets, so one pathological file cannot stall or
+exhaust the memory of a scan
+
+MAX_FILE_SIZE only looks at the size on disk, but a few MB of deflated XML
+can expand to gigabytes (a "zip bomb"). A DocumentBudget is started for
+every document and checked while it is read:
+
+- the decompressed size of each archive member, and of all the members
+  read from one archive, checked against the central directory before a
+  member is opened (archive_access refuses members that expand past the
+  size recorded there, so it can be trusted)
+- the compression ratio of members large enough for it to matter
+- the length of the extracted text, as it is produced
+- the wall-clock time spent on the document, checked on every read and
+  every text chunk (extractors that spend a long time without reading,
+  like a stuck tesseract, need a hard timeout instead)
+
+An exceeded limit raises ResourceLimitExceeded, which the extractors let
+through instead of reporting it as a damaged member. The budget stays
+exceeded until it is started again, so anything that catches the error
+and carries on is stopped at its next check.
+"""
+import time
+
+# Members smaller than this are not checked for their compression ratio;
+# small runs of repeated XML compress far better than the limit
+RATIO_CHECK_MIN_SIZE = 1024 * 1024
+
+
+class ResourceLimitExceeded(Exception):
+    """A document needs more memory, text or time than its budget allows"""
+
+    def __init__(self, limit, detail):
+        super().__init__(limit, detail)
+        self.limit = limit  # Name of the limit, e.g. 'compression ratio'
+        self.detail = detail
+
+    def __str__(self):
+        return f"{self.limit} limit exceeded: {self.detail}"
+
+
+class DocumentBudget:
+    """
+    Limits on the resources used to scan one document; any limit set to None
+    is not checked. Call start() before each document
+    """
+
+    def __init__(self, max_member_size=None, max_archive_size=None, max_compression_ratio=None,
+                 max_text_length=None, timeout=None):
+        self.max_member_size = max_member_size
+        self.max_archive_size = max_archive_size
+        self.max_compression_ratio = max_compression_ratio
+        self.max_text_length = max_text_length
+        self.timeout = timeout
+        self.start()
+
+    def start(self):
+        """Reset the budget for the next document"""
+        self.archive_size = 0
+        self.text_length = 0
+        self.deadline = time.monotonic() + self.timeout if self.timeout else None
+        self.exceeded = None
+        self._members_seen = set()
+
+    def _exceed(self, limit, detail):
+        self.exceeded = ResourceLimitExceeded(limit, detail)
+        raise self.exceeded
+
+    def check_time(self):
+        """Raise if the document is over its budget, or out of time"""
+        if self.exceeded is not None:
+            raise self.exceeded
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self._exceed('time', f"took longer than {self.timeout}s")
+
+    def remaining_time(self):
+        """Return the seconds left before the time limit (a little above 0 once it passed), or None"""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.01)
+
+    def check_member(self, member):
+        """Check an archive member (an ArchiveMember or ZipInfo) before it is decompressed"""
+        self.check_time()
+        size = member.file_size
+        if self.max_member_size is not None and size > self.max_member_size:
+            self._exceed('member size', f"{member.filename} expands to {size} bytes")
+        if (self.max_compression_ratio is not None and size > RATIO_CHECK_MIN_SIZE
+                and size > self.max_compression_ratio * max(member.compress_size, 1)):
+            ratio = size / max(member.compress_size, 1)
+            self._exceed('compression ratio', f"{member.filename} is compressed {ratio:.0f} to 1")
+        # A member read twice (by the prefilter and the extractor) is counted once
+        if member.filename not in self._members_seen:
+            self._members_seen.add(member.filename)
+            self.archive_size += size
+            if self.max_archive_size is not None and self.archive_size > self.max_archive_size:
+                self._exceed('archive size', f"members expand to more than {self.max_archive_size} bytes")
+
+    def open_member(self, zip_file, member_name):
+        """Open an archive member for reading after checking it, stopping reads when out of time"""
+        member = zip_file.getinfo(member_name)
+        self.check_member(member)
+        return BudgetedReader(zip_file.open(member), self)
+
+    def add_text(self, length):
+        """Account for length characters of extracted text"""
+        self.check_time()
+        self.text_length += length
+        if self.max_text_length is not None and self.text_length > self.max_text_length:
+            self._exceed('text length', f"more than {self.max_text_length} characters of text")
+
+
+class BudgetedReader:
+    """Wrap a file object, checking the budget's time limit before every read()"""
+
+    def __init__(self, f, budget):
+        self._f = f
+        self._budget = budget
+
+    def read(self, size=-1):
+        self._budget.check_time()
+        return self._f.read(size)
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
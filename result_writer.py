@@ -0,0 +1,247 @@
+"""
+Streaming CSV writer for scan results
+
+Rows are buffered in small batches and appended to the output CSV as files
+finish, so memory stays bounded no matter how many matches a scan produces
+and a crash only loses the last unflushed batch. Running counters replace the
+DataFrame that used to be built at the end of the run for the summaries; they
+keep a fixed number of values, so a pattern matching millions of distinct
+values does not grow them either (see TopCounts).
+
+A journal of completed files is kept next to the CSV while a scan runs. If
+the scan is interrupted, the next run reads the journal, skips the files it
+lists and appends to the existing CSV, unless the CSV was written with
+other columns (see ResumeError). The journal is removed once a scan
+finishes.
+"""
+import csv
+import hashlib
+import heapq
+import os
+import time
+
+# Values counted per column by TopCounts; columns with at most this many
+# distinct values (file types, rule names) are counted exactly
+TOP_COUNTS_CAPACITY = 1000
+
+# Smallest value hashes kept per column to estimate its number of distinct values
+DISTINCT_SKETCH_SIZE = 1024
+
+
+class ResumeError(Exception):
+    """The results of an interrupted run cannot be appended to"""
+
+
+class TopCounts:
+    """
+    Counts of the most frequent values of a column, in bounded memory
+
+    Uses the Misra-Gries summary: up to capacity values are counted; when a
+    new value arrives with no room left, every count is decremented and the
+    values reaching zero are dropped. Any value seen more than total /
+    (capacity + 1) times is kept, and a count is at most undercounted by the
+    number of decrement rounds, so counts are exact while exact is True.
+
+    The number of distinct values is estimated from the sketch_size smallest
+    value hashes (k minimum values), and exact below sketch_size values.
+    """
+
+    def __init__(self, capacity=TOP_COUNTS_CAPACITY, sketch_size=DISTINCT_SKETCH_SIZE):
+        self.capacity = capacity
+        self.sketch_size = sketch_size
+        self.total = 0
+        self.decrements = 0  # Decrement rounds, the most any count is below its true value
+        self._counts = {}
+        self._smallest_hashes = []  # Max-heap (negated) of the smallest hashes seen
+        self._hashes_kept = set()
+
+    @property
+    def exact(self):
+        return self.decrements == 0
+
+    def add(self, value):
+        self.total += 1
+        self._add_hash(value)
+        counts = self._counts
+        if value in counts:
+            counts[value] += 1
+        elif len(counts) < self.capacity:
+            counts[value] = 1
+        else:
+            # Each round removes as many counts as the values counted so far, so it costs O(1) per value
+            self.decrements += 1
+            for key in list(counts):
+                counts[key] -= 1
+                if not counts[key]:
+                    del counts[key]
+
+    def _add_hash(self, value):
+        digest = hashlib.blake2b(str(value).encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+        value_hash = int.from_bytes(digest, 'big')
+        if value_hash in self._hashes_kept:
+            return
+        if len(self._smallest_hashes) < self.sketch_size:
+            heapq.heappush(self._smallest_hashes, -value_hash)
+            self._hashes_kept.add(value_hash)
+        elif value_hash < -self._smallest_hashes[0]:
+            dropped = -heapq.heapreplace(self._smallest_hashes, -value_hash)
+            self._hashes_kept.discard(dropped)
+            self._hashes_kept.add(value_hash)
+
+    def distinct(self):
+        """Return the number of distinct values, estimated once there are more than sketch_size"""
+        if len(self._smallest_hashes) < self.sketch_size:
+            return len(self._smallest_hashes)
+        largest_kept = -self._smallest_hashes[0]
+        return int((self.sketch_size - 1) * (1 << 64) / (largest_kept + 1))
+
+    def distinct_is_exact(self):
+        return len(self._smallest_hashes) < self.sketch_size
+
+    def most_common(self, n=None):
+        """Return (value, count) pairs, most frequent first, like Counter.most_common"""
+        pairs = sorted(self._counts.items(), key=lambda pair: pair[1], reverse=True)
+        return pairs if n is None else pairs[:n]
+
+    def items(self):
+        return self._counts.items()
+
+
+def journal_path_for(csv_path):
+    """Return the journal file used for a results CSV"""
+    return csv_path + '.journal'
+
+
+class StreamingResultWriter:
+    """
+    Append result rows to a CSV file in batches
+
+    The file is created (and any previous results overwritten) on the first
+    flush, so a run without matches leaves no CSV behind. count_fields lists
+    the columns whose values are tallied for the end-of-run summary, each in
+    a TopCounts.
+
+    With resume=True and a journal left behind by an interrupted run, the
+    files listed in the journal are reported by is_done(), new rows are
+    appended to the existing CSV and the counters include its rows.
+    ResumeError is raised if that CSV has other columns than fieldnames.
+    """
+
+    def __init__(self, path, fieldnames, count_fields=(), batch_size=1000, flush_interval=10.0,
+                 resume=False):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path_for(path)
+
+        self.total_rows = 0
+        self.counts = {field: TopCounts() for field in count_fields}
+
+        self._buffer = []
+        self._done_buffer = []
+        self._done = set()
+        self._file = None
+        self._writer = None
+        self._journal = None
+        self._append = False
+        self._last_flush = time.monotonic()
+
+        if resume and os.path.exists(self.journal_path):
+            self._load_previous_run()
+        elif os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    @property
+    def resumed_files(self):
+        """Number of files completed by the interrupted run being resumed"""
+        return len(self._done)
+
+    def _load_previous_run(self):
+        """Read the journal and the rows already written by an interrupted run"""
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            self._done = {line.rstrip('\n') for line in f if line.strip()}
+
+        if os.path.exists(self.path):
+            with open(self.path, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                if reader.fieldnames is None:
+                    return  # Empty file, written again with its header
+                # Rows appended under another header would end up in the wrong columns
+                if reader.fieldnames != self.fieldnames:
+                    raise ResumeError(f"Cannot resume the interrupted scan: {self.path} has the columns "
+                                      f"{', '.join(reader.fieldnames)} instead of {', '.join(self.fieldnames)}. "
+                                      f"Move it away or delete {self.journal_path} to start a new scan")
+                self._append = True
+                for row in reader:
+                    self.total_rows += 1
+                    for field, counter in self.counts.items():
+                        counter.add(row[field])
+
+    def is_done(self, key):
+        """Return True if an interrupted run already finished this file"""
+        return key in self._done
+
+    def add_rows(self, rows, done_key=None):
+        """
+        Queue result rows, flushing when the batch is full or the flush interval passed
+        done_key marks the file the rows came from as finished once they are written
+        """
+        for row in rows:
+            self._buffer.append(row)
+            self.total_rows += 1
+            for field, counter in self.counts.items():
+                counter.add(row[field])
+
+        if done_key is not None:
+            self._done_buffer.append(done_key)
+
+        if (len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows to the CSV file, then record their files in the journal"""
+        self._last_flush = time.monotonic()
+
+        if self._buffer:
+            if self._file is None:
+                mode = 'a' if self._append else 'w'
+                self._file = open(self.path, mode, newline='', encoding='utf-8')
+                self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+                if not self._append:
+                    self._writer.writeheader()
+
+            self._writer.writerows(self._buffer)
+            self._file.flush()
+            self._buffer = []
+
+        # Only journal files whose rows are already on disk
+        if self._done_buffer:
+            if self._journal is None:
+                self._journal = open(self.journal_path, 'a', encoding='utf-8')
+            self._journal.write(''.join(key + '\n' for key in self._done_buffer))
+            self._journal.flush()
+            self._done_buffer = []
+
+    def close(self):
+        """Flush remaining rows and close the CSV file and journal"""
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def mark_scan_complete(self):
+        """Remove the journal so the next run starts a fresh scan"""
+        self.close()
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
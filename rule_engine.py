@@ -0,0 +1,257 @@
+"""
+Named detection rules compiled into a single combined scanner
+
+Rules are loaded from a JSON file such as examples/rules_example.json:
+
+    {
+      "rules": [
+        {"name": "email", "pattern": "\\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Za-z]{2,}\\b"},
+        {"name": "jetsmart", "keywords": ["jetsmart", "JA", "JE", "JS"]},
+        {"name": "card_number", "pattern": "\\b(?:\\d{4}[- ]?){3}\\d{4}\\b", "ignore_case": false}
+      ]
+    }
+
+Every rule becomes one named alternative of a single compiled regex, so a
+document is scanned once no matter how many rules are configured. Keyword
+rules are escaped and merged into one longest-first alternation with word
+boundaries. When rules overlap at the same position, the rule listed first
+in the file wins.
+
+Each rule also records the literal strings one of which every match must
+contain (see required_literals), so documents without any of them can be
+skipped before their text is extracted.
+"""
+import json
+import re
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# Group names used for the rules inside the combined regex
+RULE_GROUP_PREFIX = 'rule_'
+
+# Shorter required literals match almost every document and are not worth searching for
+MIN_LITERAL_LENGTH = 2
+
+
+class Rule:
+    """A named regex, or a list of keywords, that marks sensitive data"""
+
+    def __init__(self, name, pattern=None, keywords=None, ignore_case=None):
+        if not name:
+            raise ValueError("Every rule needs a name")
+        if (pattern is None) == (keywords is None):
+            raise ValueError(f"Rule '{name}' needs either a pattern or a keywords list")
+
+        self.name = name
+        self.keywords = list(keywords) if keywords is not None else None
+        self.ignore_case = ignore_case
+
+        if pattern is None:
+            # Longest keywords first so 'JetSmart' is not reported as 'Jet'
+            escaped = sorted({re.escape(keyword) for keyword in self.keywords if keyword},
+                             key=len, reverse=True)
+            if not escaped:
+                raise ValueError(f"Rule '{name}' has an empty keywords list")
+            pattern = r'\b(?:' + '|'.join(escaped) + r')\b'
+
+        # Leading global flags such as (?i) are only allowed at the start of the
+        # combined regex, so turn them into flags scoped to this rule
+        global_flags = re.match(r'\(\?([aiLmsux]+)\)', pattern)
+        if global_flags:
+            pattern = f'(?{global_flags.group(1)}:{pattern[global_flags.end():]})'
+        self.pattern = pattern
+
+        try:
+            compiled = re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Rule '{name}' has an invalid pattern: {e}")
+
+        # Numbered backreferences would point at the wrong group once rules are combined
+        if _uses_numbered_backreference(pattern):
+            raise ValueError(f"Rule '{name}' uses a numbered backreference; use a named group instead")
+        self.group_count = compiled.groups
+        self.literals = required_literals(pattern)
+
+    def __repr__(self):
+        return f"Rule({self.name!r})"
+
+
+def _uses_numbered_backreference(pattern):
+    """Return True if the pattern refers back to a group by number rather than by name"""
+    # Put a group in front, as combining the rules does: references by name
+    # follow their group to its new number, references by number do not
+    references = _group_references(sre_parse.parse(pattern))
+    shifted = _group_references(sre_parse.parse(f'()(?:{pattern})'))
+    return any(group == shifted_group for group, shifted_group in zip(references, shifted))
+
+
+def _group_references(items):
+    """Return the group numbers of the backreferences and conditionals in a parsed regex, in order"""
+    references = []
+    for op, value in items:
+        if op == sre_parse.GROUPREF:
+            references.append(value)
+        elif op == sre_parse.GROUPREF_EXISTS:
+            references.append(value[0])
+        for sub in _subpatterns(op, value):
+            references.extend(_group_references(sub))
+    return references
+
+
+def _subpatterns(op, value):
+    """Return the nested subpatterns of a parsed regex item"""
+    if op == sre_parse.SUBPATTERN:
+        return [value[-1]]
+    if op == sre_parse.BRANCH:
+        return value[1]
+    if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+        return [value[2]]
+    if op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+        return [value[1]]
+    if op == sre_parse.GROUPREF_EXISTS:
+        return [branch for branch in value[1:] if branch is not None]
+    return []
+
+
+def required_literals(pattern):
+    """
+    Return a set of lowercase strings at least one of which appears in every
+    match of the pattern, or None if the pattern has no usable literals
+    """
+    literals = _required_literals(sre_parse.parse(pattern))
+    if not literals or min(len(literal) for literal in literals) < MIN_LITERAL_LENGTH:
+        return None
+    return literals
+
+
+def _required_literals(items):
+    """Pick the most selective set of required literals from a parsed regex sequence"""
+    candidates = []
+    run = []  # Consecutive literal characters
+
+    for op, value in items:
+        char = _literal_char(op, value)
+        if char is not None:
+            run.append(char)
+            continue
+
+        if run:
+            candidates.append({''.join(run)})
+            run = []
+
+        found = None
+        if op == sre_parse.SUBPATTERN:
+            found = _required_literals(value[-1])
+        elif op == sre_parse.BRANCH:
+            # Every alternative must contribute, otherwise a match can avoid all of them
+            branches = [_required_literals(branch) for branch in value[1]]
+            if all(branches):
+                found = set().union(*branches)
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and value[0] >= 1:
+            found = _required_literals(value[2])
+        if found:
+            candidates.append(found)
+
+    if run:
+        candidates.append({''.join(run)})
+
+    # Prefer long literals, then fewer alternatives
+    return max(candidates, key=lambda literals: (min(map(len, literals)), -len(literals)),
+               default=None)
+
+
+def _literal_char(op, value):
+    """Return the lowercase character matched by a parsed item, or None if it matches more"""
+    if op == sre_parse.LITERAL:
+        return chr(value).lower()
+    # Classes such as [jJ] only differ in case
+    if op == sre_parse.IN and all(item_op == sre_parse.LITERAL for item_op, _ in value):
+        chars = {chr(item_value).lower() for _, item_value in value}
+        if len(chars) == 1:
+            return chars.pop()
+    return None
+
+
+class RuleSet:
+    """
+    Rules compiled into one combined regex
+
+    Use regex to scan text and describe(match) to find out which rule
+    produced a match and what value to report for it.
+    """
+
+    def __init__(self, rules, ignore_case=False):
+        self.rules = list(rules)
+        if not self.rules:
+            raise ValueError("No detection rules configured")
+
+        names = [rule.name for rule in self.rules]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate rule names: {', '.join(duplicates)}")
+
+        parts = []
+        self._rules_by_group = {}
+        group_index = 1
+        for i, rule in enumerate(self.rules):
+            rule_ignore_case = ignore_case if rule.ignore_case is None else rule.ignore_case
+            flag = 'i' if rule_ignore_case else '-i'
+            parts.append(f'(?P<{RULE_GROUP_PREFIX}{i}>(?{flag}:{rule.pattern}))')
+            self._rules_by_group[group_index] = rule
+            group_index += 1 + rule.group_count
+
+        try:
+            self.regex = re.compile('|'.join(parts))
+        except re.error as e:
+            # Typically two rules defining the same named group
+            raise ValueError(f"Rules cannot be combined: {e}")
+
+    @property
+    def literals(self):
+        """
+        Lowercase strings at least one of which appears in every match of any
+        rule, or None if some rule has no required literals
+        """
+        literals = set()
+        for rule in self.rules:
+            if rule.literals is None:
+                return None
+            literals |= rule.literals
+        return literals
+
+    def describe(self, match):
+        """Return (rule name, reported value) for a match of the combined regex"""
+        # The rule's own group encloses its inner groups, so it always closes last
+        group_index = match.lastindex
+        rule = self._rules_by_group[group_index]
+
+        # Like re.findall: report the first non-empty inner group if the rule has groups
+        for inner in range(group_index + 1, group_index + 1 + rule.group_count):
+            value = match.group(inner)
+            if value:
+                return rule.name, value
+        if rule.group_count:
+            return rule.name, ''
+        return rule.name, match.group(group_index)
+
+    @classmethod
+    def from_pattern(cls, name, pattern, ignore_case=False):
+        """Build a rule set holding a single regex"""
+        return cls([Rule(name, pattern=pattern)], ignore_case=ignore_case)
+
+    @classmethod
+    def from_file(cls, rules_file, ignore_case=False):
+        """Load rules from a JSON file"""
+        with open(rules_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+
+        rules = []
+        for entry in config.get('rules', []):
+            rules.append(Rule(entry.get('name'),
+                              pattern=entry.get('pattern'),
+                              keywords=entry.get('keywords'),
+                              ignore_case=entry.get('ignore_case')))
+        return cls(rules, ignore_case=ignore_case)
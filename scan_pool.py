@@ -0,0 +1,221 @@
+"""
+Helpers for running per-file scan work serially or on a pool of workers
+
+All helpers yield (item, result, error) tuples so the analyzers can use the
+same result handling loop regardless of how the work was scheduled.
+
+iter_supervised_results runs every item in a worker process it watches, so
+an item that hangs or crashes its process is killed and reported instead of
+stalling the scan.
+"""
+import multiprocessing
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing.connection import wait as wait_for_connections
+
+
+class TaskTimeout(Exception):
+    """An item was still running after its time limit; the worker running it was killed"""
+
+
+class WorkerCrashed(Exception):
+    """The worker process running an item exited without returning a result"""
+
+
+def iter_serial_results(func, items):
+    """Run func(item) for every item in this process, yielding results in order"""
+    for item in items:
+        try:
+            result = func(item)
+        except Exception as e:
+            yield item, None, e
+        else:
+            yield item, result, None
+
+
+def iter_pool_results(func, items, max_workers, max_pending=None,
+                      executor_class=ProcessPoolExecutor):
+    """
+    Run func(item) for every item on a pool of workers and yield results
+    in completion order
+
+    At most max_pending calls are queued at once, so very large (or lazily
+    discovered) item lists are never submitted to the pool all at once.
+    func and its return value must be picklable for process pools.
+    """
+    if max_pending is None:
+        max_pending = max_workers * 4
+
+    items = iter(items)
+    pending = {}
+    exhausted = False
+
+    executor = executor_class(max_workers=max_workers)
+    try:
+        while True:
+            # Keep the pool busy without queueing the whole item list
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(func, item)] = item
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    yield item, None, e
+                else:
+                    yield item, result, None
+    finally:
+        # Drop queued work if the caller stops early (e.g. Ctrl+C)
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _supervised_worker(func, conn):
+    """Run func on every item received on conn and send back (result, error), until None is received"""
+    # Ctrl+C is handled by the supervising process, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        try:
+            outcome = (func(task[0]), None)
+        except Exception as e:
+            outcome = (None, e)
+        try:
+            conn.send(outcome)
+        except Exception as e:
+            # The result or the exception could not be pickled
+            conn.send((None, RuntimeError(f"Cannot return the result: {e}")))
+
+
+class _Worker:
+    """A supervised worker process and the item it is running"""
+
+    def __init__(self, context, func):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_supervised_worker, args=(func, child_conn), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task = None  # (item,) while an item is running
+        self.deadline = None
+
+    def run(self, item, timeout):
+        self.task = (item,)
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.conn.send(self.task)
+
+    def stop(self):
+        """Let an idle worker exit, or kill a busy or unresponsive one"""
+        if self.task is None:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        self.conn.close()
+
+
+def iter_supervised_results(func, items, max_workers, timeout, context=None):
+    """
+    Run func(item) for every item on supervised worker processes and yield
+    results in completion order
+
+    Each worker runs one item at a time. A worker still running an item
+    after timeout seconds (None = no limit) is killed and replaced, and the
+    item is yielded with a TaskTimeout error; a worker that dies (e.g.
+    killed for running out of memory) is replaced and its item is yielded
+    with a WorkerCrashed error. Items are taken from items only when a
+    worker is free. func, items and results must be picklable.
+    """
+    context = context or multiprocessing.get_context()
+    items = iter(items)
+    workers = []
+    exhausted = False
+
+    try:
+        while True:
+            # Give every idle worker an item, starting workers up to max_workers
+            while not exhausted:
+                worker = next((worker for worker in workers if worker.task is None), None)
+                if worker is None:
+                    if len(workers) >= max_workers:
+                        break
+                    worker = _Worker(context, func)
+                    workers.append(worker)
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                # A worker that died while idle (e.g. killed for running out of memory) is replaced
+                while True:
+                    if worker.process.is_alive():
+                        try:
+                            worker.run(item, timeout)
+                            break
+                        except OSError:
+                            pass  # Died after the check
+                    workers.remove(worker)
+                    worker.stop()
+                    worker = _Worker(context, func)
+                    workers.append(worker)
+
+            busy = [worker for worker in workers if worker.task is not None]
+            if not busy:
+                break
+
+            wait_timeout = None
+            if timeout:
+                wait_timeout = max(0, min(worker.deadline for worker in busy) - time.monotonic())
+            ready = wait_for_connections([worker.conn for worker in busy] +
+                                         [worker.process.sentinel for worker in busy], wait_timeout)
+
+            now = time.monotonic()
+            for worker in busy:
+                item = worker.task[0]
+                if worker.conn in ready:
+                    try:
+                        result, error = worker.conn.recv()
+                    except EOFError:
+                        pass  # Died before sending a result
+                    else:
+                        worker.task = None
+                        yield item, result, error
+                        continue
+                elif worker.process.sentinel not in ready:
+                    if worker.deadline is None or now < worker.deadline:
+                        continue
+                    workers.remove(worker)
+                    worker.stop()
+                    yield item, None, TaskTimeout(f"Still running after {timeout}s, worker killed")
+                    continue
+
+                workers.remove(worker)
+                worker.stop()
+                yield item, None, WorkerCrashed(f"Worker process exited with code {worker.process.exitcode}")
+    finally:
+        # Also stops workers still running items if the caller stops early (e.g. Ctrl+C)
+        for worker in workers:
+            worker.stop()
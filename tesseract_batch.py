@@ -0,0 +1,170 @@
+"""
+Batch OCR: many images per tesseract process
+
+pytesseract starts a new tesseract process for every image, and each one
+loads the language model again, which dominates the time spent on small
+screenshots and thumbnails. TesseractBatcher collects the images that
+concurrent OCR jobs hand to it and runs them through a single tesseract
+process using its file-list input. The output is split back per image on
+the form feed tesseract writes after every page.
+
+Jobs block until their batch is done. A batch runs as soon as it is full,
+or once the oldest image in it has waited max_wait seconds, so the last
+images of a scan are not held back. With a timeout, a tesseract process
+still running after timeout seconds per image in its batch is killed; the
+batch is then retried one image at a time, so only the image tesseract
+hangs on fails.
+"""
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+import uuid
+
+# Tesseract ends the text of every page with this separator
+PAGE_SEPARATOR = '\f'
+
+
+class TesseractBatchError(Exception):
+    """A batch of images could not be OCR'd"""
+
+
+class TesseractTimeout(TesseractBatchError):
+    """Tesseract was killed for running longer than its timeout"""
+
+
+class _Request:
+    """An image waiting for OCR, and its result once the batch ran"""
+
+    def __init__(self, image_path):
+        self.image_path = image_path
+        self.done = threading.Event()
+        self.text = None
+        self.error = None
+
+
+class TesseractBatcher:
+    """
+    Shared by the OCR job threads; image_to_string() can be called from any thread
+
+    Keep at least batch_size jobs running at once, otherwise batches only
+    fill up when max_wait runs out.
+    """
+
+    def __init__(self, tesseract_cmd, batch_size, lang=None, config='', max_wait=0.5, timeout=None,
+                 process_slots=None):
+        self.tesseract_cmd = tesseract_cmd
+        self.batch_size = batch_size
+        self.lang = lang
+        self.config = config
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.process_slots = process_slots  # Semaphore held while a tesseract process runs, or None
+        self.batches_run = 0
+        self._work_dir = tempfile.mkdtemp(prefix='ocr-batch-')
+        self._lock = threading.Lock()
+        self._pending = []
+
+    def image_to_string(self, img):
+        """OCR a PIL image as part of the next batch and return its text"""
+        # Uncompressed PNM is the quickest format to write here and load in tesseract
+        image_path = os.path.join(self._work_dir, uuid.uuid4().hex + '.pnm')
+        img.save(image_path, format='PPM')
+        request = _Request(image_path)
+
+        with self._lock:
+            self._pending.append(request)
+            batch = self._take_batch() if len(self._pending) >= self.batch_size else None
+        if batch:
+            self._run(batch)
+
+        if not request.done.wait(self.max_wait):
+            # Nobody filled the batch in time: run whatever is waiting
+            with self._lock:
+                batch = self._take_batch() if request in self._pending else None
+            if batch:
+                self._run(batch)
+            request.done.wait()
+
+        if request.error is not None:
+            raise request.error
+        return request.text
+
+    def _take_batch(self):
+        """Remove and return the waiting requests (call with the lock held)"""
+        batch = self._pending
+        self._pending = []
+        return batch
+
+    def _run(self, batch):
+        """OCR a batch in one tesseract process, falling back to one process per image"""
+        try:
+            try:
+                texts = self._ocr_files([request.image_path for request in batch])
+            except TesseractBatchError:
+                # One bad image should not fail the whole batch
+                if len(batch) == 1:
+                    raise
+                texts = None
+
+            for i, request in enumerate(batch):
+                try:
+                    request.text = texts[i] if texts is not None else self._ocr_files([request.image_path])[0]
+                except TesseractBatchError as e:
+                    request.error = e
+        except Exception as e:
+            for request in batch:
+                if request.text is None:
+                    request.error = e
+        finally:
+            with self._lock:
+                self.batches_run += 1
+            for request in batch:
+                try:
+                    os.remove(request.image_path)
+                except OSError:
+                    pass
+                request.done.set()
+
+    def _ocr_files(self, image_paths):
+        """Run tesseract over a list of image files and return one text per file"""
+        list_path = os.path.join(self._work_dir, uuid.uuid4().hex + '.txt')
+        with open(list_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(path + '\n' for path in image_paths))
+
+        command = [self.tesseract_cmd, list_path, 'stdout']
+        if self.lang:
+            command += ['-l', self.lang]
+        if self.config:
+            command += shlex.split(self.config, posix=os.name != 'nt')
+
+        timeout = self.timeout * len(image_paths) if self.timeout else None
+        try:
+            if self.process_slots is not None:
+                with self.process_slots:
+                    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+            else:
+                result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise TesseractTimeout(f"tesseract did not finish within {timeout}s")
+        except OSError as e:
+            raise TesseractBatchError(f"Cannot run {self.tesseract_cmd}: {e}")
+        finally:
+            os.remove(list_path)
+
+        if result.returncode:
+            raise TesseractBatchError(result.stderr.decode('utf-8', 'replace').strip()
+                                      or f"tesseract exited with status {result.returncode}")
+
+        pages = result.stdout.decode('utf-8', 'replace').split(PAGE_SEPARATOR)
+        if pages and not pages[-1].strip():
+            pages.pop()
+        if len(pages) != len(image_paths):
+            raise TesseractBatchError(f"Expected text for {len(image_paths)} images, got {len(pages)}")
+        return pages
+
+    def close(self):
+        """Remove the temporary directory used for batch input files"""
+        shutil.rmtree(self._work_dir, ignore_errors=True)
@@ -0,0 +1,228 @@
+import io
+import struct
+import zipfile
+import zlib
+
+import pytest
+
+from archive_access import ArchiveError, ZipArchive
+
+MEMBERS = [
+    ('mimetype', b'application/vnd.oasis.opendocument.text', zipfile.ZIP_STORED),
+    ('word/document.xml', b'<w:document>' + b'<w:p><w:t>text</w:t></w:p>' * 2000 + b'</w:document>',
+     zipfile.ZIP_DEFLATED),
+    ('word/media/', b'', zipfile.ZIP_STORED),
+    ('word/empty.xml', b'', zipfile.ZIP_DEFLATED),
+    ('word/media/image1.png', bytes(range(256)) * 40, zipfile.ZIP_STORED),
+    ('déjà vu.xml', '<t>café</t>'.encode('utf-8'), zipfile.ZIP_DEFLATED),
+]
+
+
+class Unseekable(io.RawIOBase):
+    """A write-only stream that cannot seek, so zipfile writes data descriptors"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+
+def zip_bytes(members=MEMBERS, comment=b'', data_descriptors=False):
+    stream = Unseekable() if data_descriptors else io.BytesIO()
+    with zipfile.ZipFile(stream, 'w') as zip_file:
+        zip_file.comment = comment
+        for name, data, compress_type in members:
+            info = zipfile.ZipInfo(name, date_time=(2020, 1, 1, 0, 0, 0))
+            info.compress_type = compress_type
+            zip_file.writestr(info, data)
+    return bytes(stream.data) if data_descriptors else stream.getvalue()
+
+
+def zip64_bytes(members):
+    """
+    Build a ZIP64 archive by hand: every size and offset in the central
+    directory is 0xFFFFFFFF with the real value in a ZIP64 extra field
+    """
+    local, central = bytearray(), bytearray()
+    for name, data in members:
+        encoded = name.encode('utf-8')
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        crc = zlib.crc32(data)
+        extra = struct.pack('<HHQQ', 1, 16, len(data), len(compressed))
+        offset = len(local)
+        local += struct.pack('<4sHHHHHIIIHH', b'PK\x03\x04', 45, 0x0800, 8, 0, 0, crc,
+                             0xFFFFFFFF, 0xFFFFFFFF, len(encoded), len(extra)) + encoded + extra + compressed
+        extra = struct.pack('<HHQQQ', 1, 24, len(data), len(compressed), offset)
+        central += struct.pack('<4sHHHHHHIIIHHHHHII', b'PK\x01\x02', 45, 45, 0x0800, 8, 0, 0, crc,
+                               0xFFFFFFFF, 0xFFFFFFFF, len(encoded), len(extra), 0, 0, 0, 0,
+                               0xFFFFFFFF) + encoded + extra
+    record = len(local) + len(central)
+    end = struct.pack('<4sQHHIIQQQQ', b'PK\x06\x06', 44, 45, 45, 0, 0, len(members), len(members),
+                      len(central), len(local))
+    end += struct.pack('<4sIQI', b'PK\x06\x07', 0, record, 1)
+    end += struct.pack('<4sHHHHIIH', b'PK\x05\x06', 0, 0, 0xFFFF, 0xFFFF, 0xFFFFFFFF, 0xFFFFFFFF, 0)
+    return bytes(local + central + end)
+
+
+def assert_same_as_zipfile(path):
+    with zipfile.ZipFile(path) as reference, ZipArchive(path) as archive:
+        assert archive.namelist() == reference.namelist()
+        for member, info in zip(archive.infolist(), reference.infolist()):
+            assert (member.filename, member.CRC, member.file_size, member.compress_size,
+                    member.compress_type, member.flag_bits, member.is_dir()) == (
+                info.filename, info.CRC, info.file_size, info.compress_size,
+                info.compress_type, info.flag_bits, info.is_dir())
+            expected = reference.read(info)
+            assert archive.read(member.filename) == expected
+            if member.compress_type == zipfile.ZIP_STORED:
+                assert bytes(archive.view(member)) == expected
+            with archive.open(member) as f:
+                assert b''.join(iter(lambda: f.read(1000), b'')) == expected
+
+
+@pytest.mark.parametrize('comment', [b'', b'archive comment'])
+def test_same_as_zipfile(tmp_path, comment):
+    path = tmp_path / 'a.zip'
+    path.write_bytes(zip_bytes(comment=comment))
+    assert_same_as_zipfile(path)
+
+
+def test_cp437_names(tmp_path):
+    path = tmp_path / 'a.zip'
+    data = bytearray(zip_bytes([('café.xml', b'<t/>', zipfile.ZIP_STORED)]))
+    # Clear the UTF-8 flag, so the name is read as cp437 by both readers
+    for signature, flag_offset in ((b'PK\x03\x04', 6), (b'PK\x01\x02', 8)):
+        header = data.find(signature)
+        struct.pack_into('<H', data, header + flag_offset,
+                         struct.unpack_from('<H', data, header + flag_offset)[0] & ~0x0800)
+    path.write_bytes(bytes(data))
+    assert_same_as_zipfile(path)
+
+
+def test_data_descriptors(tmp_path):
+    path = tmp_path / 'a.zip'
+    path.write_bytes(zip_bytes(data_descriptors=True))
+    with ZipArchive(path) as archive:
+        assert all(member.flag_bits & 0x08 for member in archive.infolist())
+    assert_same_as_zipfile(path)
+
+
+def test_prepended_data(tmp_path):
+    path = tmp_path / 'a.zip'
+    path.write_bytes(b'MZ self-extracting stub' * 100 + zip_bytes())
+    assert_same_as_zipfile(path)
+
+
+@pytest.mark.parametrize('prepended', [b'', b'stub' * 100], ids=['plain', 'prepended'])
+def test_zip64(tmp_path, prepended):
+    path = tmp_path / 'a.zip'
+    path.write_bytes(prepended + zip64_bytes([(name, data) for name, data, _ in MEMBERS if data]))
+    assert_same_as_zipfile(path)
+
+
+def test_zip64_written_by_zipfile(tmp_path):
+    # More members than the end of central directory record can count
+    path = tmp_path / 'a.zip'
+    with zipfile.ZipFile(path, 'w') as zip_file:
+        for i in range(0x10000):
+            zip_file.writestr(f'{i}.xml', b'')
+    with ZipArchive(path) as archive:
+        assert len(archive.namelist()) == 0x10000
+        assert archive.read('65535.xml') == b''
+
+
+def test_truncated_archive(tmp_path):
+    data = zip_bytes()
+    path = tmp_path / 'a.zip'
+    for cut in list(range(0, len(data), 97)) + [len(data) - 1]:
+        path.write_bytes(data[:cut])
+        with pytest.raises(ArchiveError):
+            ZipArchive(path)
+
+
+def corrupt_central_directory(data, offset, fmt, value):
+    data = bytearray(data)
+    header = data.find(b'PK\x01\x02')
+    struct.pack_into(fmt, data, header + offset, value)
+    return bytes(data)
+
+
+def corrupt_end_record(data, offset, fmt, value):
+    data = bytearray(data)
+    struct.pack_into(fmt, data, data.rfind(b'PK\x05\x06') + offset, value)
+    return bytes(data)
+
+
+@pytest.mark.parametrize('corrupt', [
+    lambda data: corrupt_central_directory(data, 0, '<4s', b'XX\x01\x02'),
+    lambda data: corrupt_end_record(data, 10, '<H', 200),  # More entries than the directory has
+    lambda data: corrupt_end_record(data, 16, '<I', 0x0FFFFFFF),  # Directory offset past the end
+    lambda data: corrupt_end_record(data, 10, '<H', 0xFFFF),  # ZIP64 without its records
+    lambda data: corrupt_central_directory(data, 24, '<I', 0xFFFFFFFF),  # ZIP64 size without extra field
+    lambda data: data[:data.rfind(b'PK\x05\x06')],  # No end of central directory record
+], ids=['signature', 'entries', 'offset', 'zip64-locator', 'zip64-extra', 'end-record'])
+def test_corrupted_central_directory(tmp_path, corrupt):
+    path = tmp_path / 'a.zip'
+    path.write_bytes(corrupt(zip_bytes()))
+    with pytest.raises(ArchiveError):
+        ZipArchive(path)
+
+
+def test_truncated_zip64_extra_field(tmp_path):
+    path = tmp_path / 'a.zip'
+    data = bytearray(zip64_bytes([('a.xml', b'<t/>')]))
+    header = data.find(b'PK\x01\x02')
+    struct.pack_into('<H', data, header + 46 + len('a.xml') + 2, 8)  # Only the file size is left
+    path.write_bytes(bytes(data))
+    with pytest.raises(ArchiveError):
+        ZipArchive(path)
+
+
+@pytest.mark.parametrize('offset', [4, 0xFFFFFF])
+def test_local_header_offset(tmp_path, offset):
+    path = tmp_path / 'a.zip'
+    path.write_bytes(corrupt_central_directory(zip_bytes(), 42, '<I', offset))
+    with ZipArchive(path) as archive:
+        with pytest.raises(ArchiveError):
+            archive.read(archive.namelist()[0])
+
+
+@pytest.mark.parametrize('change', [-100, 100])
+def test_member_size_differs_from_directory(tmp_path, change):
+    path = tmp_path / 'a.zip'
+    data = zip_bytes([('a.xml', bytes(range(256)) * 100, zipfile.ZIP_DEFLATED)])
+    path.write_bytes(corrupt_central_directory(data, 24, '<I', 25600 + change))
+    with ZipArchive(path) as archive:
+        with pytest.raises(ArchiveError):
+            archive.read('a.xml')
+
+
+def test_view_is_limited_to_stored_members(tmp_path):
+    path = tmp_path / 'a.zip'
+    data = zip_bytes([('a.xml', b'x' * 10000, zipfile.ZIP_DEFLATED), ('b.png', b'y' * 10000, zipfile.ZIP_STORED)])
+    # A deflated member claiming 100 bytes must not be inflated past them
+    path.write_bytes(corrupt_central_directory(data, 24, '<I', 100))
+    with ZipArchive(path) as archive:
+        with pytest.raises(ArchiveError):
+            archive.view('a.xml')
+        with pytest.raises(ArchiveError, match="larger than its declared size"):
+            archive.read('a.xml')
+        assert bytes(archive.view('b.png')) == b'y' * 10000
+
+
+@pytest.mark.parametrize('compress_type', [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_truncated_member_data(tmp_path, compress_type):
+    path = tmp_path / 'a.zip'
+    data = zip_bytes([('a.xml', bytes(range(256)) * 100, compress_type)])
+    header = data.find(b'PK\x01\x02')
+    compress_size = struct.unpack_from('<I', data, header + 20)[0]
+    path.write_bytes(corrupt_central_directory(data, 20, '<I', compress_size // 2))
+    with ZipArchive(path) as archive:
+        with pytest.raises(ArchiveError):
+            archive.read('a.xml')
@@ -0,0 +1,44 @@
+import io
+import zipfile
+
+import pytest
+from PIL import Image
+
+from archive_access import ZipArchive
+from embedded_images import EmbeddedImageOCR
+from resource_limits import DocumentBudget, ResourceLimitExceeded
+
+
+@pytest.fixture
+def docx(tmp_path):
+    picture = io.BytesIO()
+    Image.new('L', (200, 100), 255).save(picture, 'PNG')
+    path = tmp_path / 'pictures.docx'
+    with zipfile.ZipFile(path, 'w') as zip_file:
+        zip_file.writestr('word/document.xml', b'<w:document/>')
+        zip_file.writestr('word/media/image1.png', picture.getvalue())
+    return path
+
+
+def make_ocr():
+    return EmbeddedImageOCR(lambda img: f"text {img.size[0]}", [], triage=False)
+
+
+def test_members_are_read_through_open_member(docx):
+    opened = []
+
+    def open_member(zip_file, name):
+        opened.append(name)
+        return zip_file.open(name)
+
+    with ZipArchive(docx) as zip_file:
+        assert list(make_ocr().iter_text(zip_file, '.docx', open_member)) == ["text 200\n"]
+    assert opened == ['word/media/image1.png']
+
+
+def test_budget_limits_are_not_reported_as_damaged_pictures(docx, capsys):
+    budget = DocumentBudget(max_member_size=10)
+    with ZipArchive(docx) as zip_file:
+        with pytest.raises(ResourceLimitExceeded, match="member size"):
+            list(make_ocr().iter_text(zip_file, '.docx', budget.open_member))
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+from extraction_cache import CompressedText, ExtractionCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ExtractionCache(str(tmp_path / 'cache.sqlite'))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / 'doc.docx'
+    path.write_bytes(b'original content')
+    return path
+
+
+def touch(path, content):
+    """Rewrite a file with a different mtime, whatever the filesystem's timestamp resolution"""
+    mtime_ns = os.stat(path).st_mtime_ns
+    path.write_bytes(content)
+    os.utime(path, ns=(mtime_ns + 10 ** 9, mtime_ns + 10 ** 9))
+
+
+def test_put_and_get_round_trip(cache, document):
+    assert cache.get_file('ns', document) is None
+    cache.put_file('ns', document, 'text ñ €')
+    assert cache.get_file('ns', document) == 'text ñ €'
+    assert cache.get_file('other-ns', document) is None
+
+
+def test_compressed_text_round_trip(cache, document):
+    recorder = CompressedText()
+    chunks = ['first ', '', 'second\n', 'third']
+    assert list(recorder.record(chunks)) == chunks
+    cache.put_file('ns', document, recorder)
+    assert cache.get_file('ns', document) == 'first second\nthird'
+
+
+def test_changed_file_is_not_served(cache, document):
+    cache.put_file('ns', document, 'old text')
+    touch(document, b'changed content')
+    assert cache.get_file('ns', document) is None
+
+    # Storing the new version drops the text of the old one
+    cache.put_file('ns', document, 'new text')
+    assert cache.get_file('ns', document) == 'new text'
+    conn = cache._connection()
+    assert conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0] == 1
+
+
+def test_content_hash_finds_moved_and_touched_copies(tmp_path, document):
+    cache = ExtractionCache(str(tmp_path / 'hashed.sqlite'), use_content_hash=True)
+    cache.put_file('ns', document, 'text')
+    moved = tmp_path / 'moved.docx'
+    moved.write_bytes(document.read_bytes())
+    assert cache.get_file('ns', moved) == 'text'
+    touch(document, b'original content')
+    assert cache.get_file('ns', document) == 'text'
+    touch(document, b'other content')
+    assert cache.get_file('ns', document) is None
+    cache.close()
+
+
+def test_link_file_shares_one_blob(tmp_path, cache):
+    copies = []
+    for name in ('a.png', 'b.png'):
+        path = tmp_path / name
+        path.write_bytes(name.encode())
+        copies.append(path)
+
+    cache.put_blob('ns', 'pixels-digest', 'shared text')
+    for path in copies:
+        cache.link_file('ns', path, 'pixels-digest')
+        assert cache.get_file('ns', path) == 'shared text'
+
+    conn = cache._connection()
+    assert conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0] == 1
+    assert conn.execute('SELECT COUNT(*) FROM files').fetchone()[0] == 2
+
+
+def test_evict_drops_least_recently_used(tmp_path, monkeypatch):
+    cache = ExtractionCache(str(tmp_path / 'cache.sqlite'), max_size_bytes=1)
+    clock = [1000.0]
+    monkeypatch.setattr('extraction_cache.time.time', lambda: clock[0])
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'{i}.docx'
+        path.write_bytes(b'x' * i)
+        cache.put_file('ns', path, os.urandom(300).hex())
+        paths.append(path)
+        clock[0] += 1
+
+    sizes = [row[0] for row in cache._connection().execute('SELECT nbytes FROM entries ORDER BY last_used')]
+    cache.max_size_bytes = sum(sizes[1:])
+    assert cache.evict() == 1
+    assert cache.get_file('ns', paths[0]) is None
+    assert cache.get_file('ns', paths[1]) is not None
+    assert cache.get_file('ns', paths[2]) is not None
+    assert cache._connection().execute('SELECT COUNT(*) FROM files').fetchone()[0] == 2
+
+    # A hit long after the entry was stored keeps it over newer, unused entries
+    clock[0] += 2 * 3600
+    cache.get_file('ns', paths[1])
+    cache.max_size_bytes = sizes[1]
+    assert cache.evict() == 1
+    assert cache.get_file('ns', paths[1]) is not None
+    assert cache.get_file('ns', paths[2]) is None
+    assert cache.evict() == 0
+    cache.close()
+
+
+def test_evict_without_size_limit(cache, document):
+    cache.put_file('ns', document, 'text')
+    assert cache.evict() == 0
+    assert cache.get_file('ns', document) == 'text'
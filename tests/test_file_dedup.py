@@ -0,0 +1,45 @@
+import file_dedup
+from file_dedup import group_duplicates
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+
+def test_identical_files_are_grouped_under_the_first(tmp_path):
+    a = write(tmp_path / 'a.docx', b'same content')
+    unique = write(tmp_path / 'u.docx', b'other content')
+    b = write(tmp_path / 'sub/b.docx', b'same content')
+    c = write(tmp_path / 'c.docx', b'same content')
+    assert group_duplicates([a, unique, b, c]) == [(a, [b, c]), (unique, [])]
+
+
+def test_same_size_files_with_other_content_stay_apart(tmp_path):
+    a = write(tmp_path / 'a.docx', b'content A')
+    b = write(tmp_path / 'b.docx', b'content B')
+    assert group_duplicates([a, b]) == [(a, []), (b, [])]
+
+
+def test_extension_is_part_of_the_key(tmp_path):
+    docx = write(tmp_path / 'a.docx', b'same content')
+    upper = write(tmp_path / 'b.DOCX', b'same content')
+    xlsx = write(tmp_path / 'a.xlsx', b'same content')
+    assert group_duplicates([docx, upper, xlsx]) == [(docx, [upper]), (xlsx, [])]
+
+
+def test_large_files_differing_after_the_first_block(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_dedup, 'PARTIAL_HASH_SIZE', 16)
+    start = b'0123456789abcdef'
+    a = write(tmp_path / 'a.png', start + b'tail 1')
+    b = write(tmp_path / 'b.png', start + b'tail 2')
+    c = write(tmp_path / 'c.png', start + b'tail 1')
+    assert group_duplicates([a, b, c]) == [(a, [c]), (b, [])]
+
+
+def test_unreadable_files_are_kept_on_their_own(tmp_path):
+    a = write(tmp_path / 'a.docx', b'same content')
+    missing = tmp_path / 'missing.docx'
+    b = write(tmp_path / 'b.docx', b'same content')
+    assert group_duplicates(iter([a, missing, b])) == [(a, [b]), (missing, [])]
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from file_discovery import FileDiscovery
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for name in ['b.docx', 'a.DOCX', 'notes.txt', 'sub/c.xlsx', 'sub/deeper/d.Docx', 'z/e.pptx',
+                 'sub/archive.docx.bak', 'folder.docx/inner.xlsx']:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x')
+    return tmp_path
+
+
+def relative(paths, root):
+    return [str(path.relative_to(root)).replace(os.sep, '/') for path in paths]
+
+
+@pytest.mark.parametrize('background', [False, True])
+def test_matches_extensions_ignoring_case_in_name_order(tree, background):
+    discovery = FileDiscovery(tree, ['.docx', '.XLSX'], background=background)
+    assert relative(discovery, tree) == [
+        'a.DOCX', 'b.docx', 'folder.docx/inner.xlsx', 'sub/c.xlsx', 'sub/deeper/d.Docx']
+    assert discovery.finished
+    assert discovery.elapsed is not None
+    assert discovery.total == 5
+    assert discovery.counts == {'.docx': 3, '.xlsx': 2}
+    assert discovery.directories == 5
+    assert discovery.errors == []
+
+
+def test_directories_with_matching_names_are_walked_not_yielded(tree):
+    assert 'folder.docx' not in relative(FileDiscovery(tree, ['.docx']), tree)
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason="needs symlinks")
+def test_symlinked_directories_are_not_followed(tree, tmp_path_factory):
+    outside = tmp_path_factory.mktemp('outside')
+    (outside / 'linked.docx').write_bytes(b'x')
+    try:
+        os.symlink(outside, tree / 'link', target_is_directory=True)
+        os.symlink(tree / 'b.docx', tree / 'file_link.docx')
+        os.symlink(tree / 'missing.docx', tree / 'broken_link.docx')
+    except OSError:
+        pytest.skip("cannot create symlinks here")
+
+    found = relative(FileDiscovery(tree, ['.docx']), tree)
+    assert 'link/linked.docx' not in found
+    # Links to files are scanned like the files; broken links are skipped
+    assert 'file_link.docx' in found
+    assert 'broken_link.docx' not in found
+
+
+@pytest.mark.skipif(os.name == 'nt' or os.geteuid() == 0, reason="needs a user that permissions apply to")
+def test_unreadable_directories_are_recorded_and_skipped(tree):
+    locked = tree / 'sub'
+    os.chmod(locked, 0)
+    try:
+        discovery = FileDiscovery(tree, ['.docx', '.xlsx'])
+        found = relative(discovery, tree)
+    finally:
+        os.chmod(locked, 0o755)
+    assert found == ['a.DOCX', 'b.docx', 'folder.docx/inner.xlsx']
+    assert [path for path, _ in discovery.errors] == [str(locked)]
+
+
+def test_missing_root_is_an_error_not_an_exception(tmp_path):
+    discovery = FileDiscovery(tmp_path / 'missing', ['.docx'])
+    assert list(discovery) == []
+    assert len(discovery.errors) == 1
+    assert discovery.finished
@@ -0,0 +1,82 @@
+import io
+
+import pytest
+from PIL import Image
+
+from image_preprocessing import (PIPELINES, enhance_contrast, get_pipeline, load_image, pipeline_name,
+                                 preprocess)
+
+
+def saved(img, format, **params):
+    data = io.BytesIO()
+    img.save(data, format, **params)
+    data.seek(0)
+    return Image.open(data)
+
+
+def test_small_images_keep_their_size():
+    img = load_image(Image.new('RGB', (300, 200), 'white'), max_dimension=4000, target_dpi=300)
+    assert img.mode == 'L' and img.size == (300, 200)
+
+
+@pytest.mark.parametrize('format', ['PNG', 'JPEG', 'BMP', 'TIFF'])
+def test_large_images_are_reduced_to_max_dimension(format):
+    img = load_image(saved(Image.new('RGB', (2000, 1000), 'white'), format), max_dimension=500)
+    assert img.mode == 'L' and img.size == (500, 250)
+
+
+def test_jpeg_is_decoded_at_reduced_scale():
+    source = saved(Image.new('RGB', (3200, 1600), 'white'), 'JPEG')
+    target_size = (400, 200)
+    source.draft('L', target_size)
+    # Decoded at 1/8 scale, the smallest above the target size
+    assert source.size == target_size
+
+    img = load_image(saved(Image.new('RGB', (3200, 1600), 'white'), 'JPEG'), max_dimension=400)
+    assert img.size == target_size
+
+
+def test_high_dpi_scans_are_reduced_to_target_dpi():
+    source = saved(Image.new('L', (1200, 600), 255), 'PNG', dpi=(600, 600))
+    assert load_image(source, target_dpi=300).size == (600, 300)
+    # The smaller of the two limits wins
+    source = saved(Image.new('L', (1200, 600), 255), 'PNG', dpi=(600, 600))
+    assert load_image(source, max_dimension=400, target_dpi=300).size == (400, 200)
+
+
+def test_low_dpi_and_missing_dpi_keep_the_size():
+    assert load_image(saved(Image.new('L', (800, 400), 255), 'PNG', dpi=(150, 150)), target_dpi=300).size == (800, 400)
+    assert load_image(saved(Image.new('L', (800, 400), 255), 'PNG'), target_dpi=300).size == (800, 400)
+
+
+@pytest.mark.parametrize('mode', ['1', 'P', 'CMYK', 'LA', 'I'])
+def test_other_modes_are_reduced_as_grayscale(mode):
+    img = load_image(Image.new(mode, (1000, 500)), max_dimension=300)
+    assert img.mode == 'L' and img.size == (300, 150)
+
+
+def test_very_thin_images_keep_at_least_one_pixel():
+    assert load_image(Image.new('L', (5000, 2), 255), max_dimension=1000).size == (1000, 1)
+
+
+@pytest.mark.parametrize('name', sorted(PIPELINES))
+def test_pipelines_return_grayscale_images_of_the_same_size(name):
+    pytest.importorskip('numpy')
+    img = Image.linear_gradient('L').resize((200, 100))
+    result = preprocess(img, get_pipeline(name))
+    assert result.mode == 'L' and result.size == (200, 100)
+
+
+def test_otsu_output_is_black_and_white():
+    pytest.importorskip('numpy')
+    result = preprocess(Image.linear_gradient('L'), get_pipeline('otsu'))
+    histogram = result.histogram()
+    assert [level for level in range(256) if histogram[level]] == [0, 255]
+
+
+def test_custom_pipelines():
+    steps = get_pipeline([enhance_contrast(3.0)])
+    assert pipeline_name(steps) == 'enhance_contrast_3.0'
+    assert pipeline_name('otsu') == 'otsu'
+    with pytest.raises(ValueError, match="Unknown preprocessing pipeline 'sharpen'"):
+        get_pipeline('sharpen')
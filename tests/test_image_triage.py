@@ -0,0 +1,64 @@
+import pytest
+from PIL import Image, ImageDraw
+
+pytest.importorskip('numpy')
+
+from image_triage import image_stats, triage_image  # noqa: E402
+
+
+def text_image(size=(400, 200)):
+    """White page with a few lines of black 'text' strokes in one corner"""
+    img = Image.new('L', size, 255)
+    draw = ImageDraw.Draw(img)
+    for line in range(3):
+        draw.text((10, 10 + 15 * line), "SECRET-1234 confidential", fill=0)
+    return img
+
+
+def test_text_is_not_skipped():
+    img = text_image()
+    assert triage_image(img, img.size) is None
+
+
+def test_single_line_on_a_large_page_is_not_skipped():
+    img = Image.new('L', (1024, 1024), 255)
+    ImageDraw.Draw(img).text((500, 900), "ID 42", fill=0)
+    assert triage_image(img, img.size) is None
+
+
+@pytest.mark.parametrize('value', [0, 128, 255])
+def test_blank_images_are_skipped(value):
+    img = Image.new('L', (300, 300), value)
+    assert triage_image(img, img.size) == 'blank'
+
+
+def test_faint_noise_is_blank():
+    img = Image.effect_noise((300, 300), 2).point(lambda level: 200 + level // 64)
+    assert triage_image(img, img.size) == 'blank'
+
+
+def test_smooth_gradient_has_no_edges():
+    # 4 brightness levels per pixel: plenty of contrast per tile, but no sharp steps
+    img = Image.linear_gradient('L').resize((256, 64))
+    contrast, edge_density = image_stats(img)
+    assert contrast > 8 and edge_density == 0
+    assert triage_image(img, img.size) == 'no edges'
+
+
+def test_tiny_images_are_too_small():
+    img = text_image((40, 12))
+    assert triage_image(img, img.size) == 'too small'
+    # The original size decides, not the size of the downscaled copy
+    assert triage_image(text_image((40, 40)), (4000, 4000)) is None
+
+
+@pytest.mark.parametrize('size', [(1, 1), (1, 50), (50, 1)])
+def test_degenerate_images_have_no_stats(size):
+    assert image_stats(Image.new('L', size, 0)) == (0.0, 0.0)
+
+
+def test_images_smaller_than_a_tile():
+    img = Image.new('L', (20, 10), 255)
+    ImageDraw.Draw(img).line((0, 5, 19, 5), fill=0)
+    contrast, edge_density = image_stats(img)
+    assert contrast > 0 and edge_density > 0
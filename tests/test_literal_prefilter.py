@@ -0,0 +1,55 @@
+import zipfile
+
+import pytest
+
+import office_analyzer_template as office
+from literal_prefilter import LiteralPrefilter
+from xml_text import ODF_CHARACTERS, WORDML_CHARACTERS
+
+CHARACTERS = {**WORDML_CHARACTERS, **ODF_CHARACTERS}
+
+DOCX_BODY = (b'<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+             b'<w:body><w:p><w:r><w:t>PRJ</w:t><w:noBreakHyphen/><w:t>12345</w:t></w:r></w:p>'
+             b'</w:body></w:document>')
+
+
+def blocks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_no_break_hyphen_is_written_out():
+    prefilter = LiteralPrefilter(['prj-'], characters=CHARACTERS)
+    assert prefilter.search_xml([DOCX_BODY])
+
+
+@pytest.mark.parametrize('size', [1, 7, 64])
+def test_no_break_hyphen_split_across_blocks(size):
+    prefilter = LiteralPrefilter(['prj-'], characters=CHARACTERS)
+    assert prefilter.search_xml(blocks(DOCX_BODY, size))
+
+
+def test_character_elements_are_stripped_without_characters():
+    assert not LiteralPrefilter(['prj-']).search_xml([DOCX_BODY])
+
+
+def test_other_elements_are_still_stripped():
+    xml = b'<w:p><w:t>PRJ</w:t><w:noBreakHyphenX/><w:tab/><w:t>12345</w:t></w:p>'
+    prefilter = LiteralPrefilter(['prj-', 'prj12345'], characters=CHARACTERS)
+    assert prefilter.search_xml([xml])
+    assert not LiteralPrefilter(['prj-'], characters=CHARACTERS).search_xml([xml])
+
+
+def test_docx_with_no_break_hyphen_is_scanned(tmp_path, monkeypatch):
+    docx = tmp_path / 'hyphen.docx'
+    with zipfile.ZipFile(docx, 'w') as zip_file:
+        zip_file.writestr('word/document.xml', DOCX_BODY)
+    monkeypatch.setattr(office, 'office_dir', str(tmp_path))
+    monkeypatch.setattr(office, 'exact_pattern', r'\bPRJ-\d{4,6}\b')
+    monkeypatch.setattr(office, 'RULES_FILE', None)
+    monkeypatch.setattr(office, 'CACHE_DB', None)
+    monkeypatch.setattr(office, 'rule_set', None)
+    monkeypatch.setattr(office, 'literal_prefilter', None)
+
+    result = office.process_office_file(docx)
+    assert not result['prefiltered']
+    assert [row['Match'] for row in result['rows']] == ['PRJ-12345']
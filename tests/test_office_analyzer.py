@@ -0,0 +1,72 @@
+import time
+import zipfile
+
+import pytest
+
+import office_analyzer_template as office
+
+DOCX_BODY = (b'<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+             b'<w:body><w:p><w:r><w:t>ref SECRET-1234</w:t></w:r></w:p></w:body></w:document>')
+
+
+@pytest.fixture
+def docx(tmp_path):
+    path = tmp_path / 'a.docx'
+    with zipfile.ZipFile(path, 'w') as zip_file:
+        zip_file.writestr('word/document.xml', DOCX_BODY)
+    return path
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setattr(office, 'FILE_TIMEOUT', 0.2)
+    monkeypatch.setattr(office, 'MAX_ARCHIVE_SIZE', len(DOCX_BODY) * 3 // 2)
+    monkeypatch.setattr(office, 'document_budget', None)
+
+
+def test_every_extraction_gets_its_own_time_limit(docx, budget):
+    assert 'SECRET-1234' in office.extract_text_from_office_file(docx)
+    time.sleep(0.3)
+    assert 'SECRET-1234' in office.extract_text_from_office_file(docx)
+
+
+def test_members_are_counted_for_every_document(tmp_path, docx, budget):
+    big = tmp_path / 'big.docx'
+    with zipfile.ZipFile(big, 'w') as zip_file:
+        zip_file.writestr('word/document.xml', DOCX_BODY.replace(b'ref ', b'ref ' * 100))
+    assert 'SECRET-1234' in office.extract_text_from_office_file(docx)
+    # The same member name in another document counts towards that document's MAX_ARCHIVE_SIZE
+    with pytest.raises(office.ResourceLimitExceeded, match="archive size"):
+        office.extract_text_from_office_file(big)
+
+
+@pytest.fixture
+def scan_setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(office, 'office_dir', str(tmp_path))
+    monkeypatch.setattr(office, 'exact_pattern', r'\bSECRET-\d+\b')
+    monkeypatch.setattr(office, 'RULES_FILE', None)
+    monkeypatch.setattr(office, 'OCR_EMBEDDED_IMAGES', False)
+    monkeypatch.setattr(office, 'CACHE_DB', str(tmp_path / 'cache.sqlite'))
+    monkeypatch.setattr(office, 'extraction_cache', None)
+    monkeypatch.setattr(office, 'rule_set', None)
+    monkeypatch.setattr(office, 'literal_prefilter', None)
+    monkeypatch.setattr(office, 'document_budget', None)
+
+
+def test_complete_text_is_cached(docx, scan_setup):
+    assert not office.process_office_file(docx)['cached']
+    result = office.process_office_file(docx)
+    assert result['cached']
+    assert [row['Match'] for row in result['rows']] == ['SECRET-1234']
+
+
+def test_text_of_damaged_documents_is_not_cached(tmp_path, scan_setup, capsys):
+    damaged = tmp_path / 'damaged.docx'
+    with zipfile.ZipFile(damaged, 'w') as zip_file:
+        zip_file.writestr('word/document.xml', DOCX_BODY)
+        zip_file.writestr('word/footer1.xml', b'<w:ftr><w:p><w:t>SECRET-99</w:t>')
+    for _ in range(2):
+        result = office.process_office_file(damaged)
+        assert not result['cached']
+        assert [row['Match'] for row in result['rows']] == ['SECRET-1234']
+    assert 'Error reading word/footer1.xml' in capsys.readouterr().out
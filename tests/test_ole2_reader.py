@@ -0,0 +1,158 @@
+import struct
+
+import olefile
+import pytest
+
+from benchmarks.generate_corpus import write_compound_file, write_doc, write_ppt
+from ole2_reader import CompoundFile, OLE2Error, iter_doc_text, iter_ppt_text
+
+SECTOR_SIZE = 512
+LINES = [f"line {i} of the document LEAK-{100000 + i}" for i in range(300)]
+
+
+def sector_offset(sector):
+    return (sector + 1) * SECTOR_SIZE
+
+
+def header_field(data, offset):
+    return struct.unpack_from('<I', data, offset)[0]
+
+
+def set_fat_entry(data, sector, value):
+    """Point the FAT entry of sector at value; the entry must be in a FAT sector listed in the header"""
+    fat_sector = header_field(data, 0x4C + (sector // 128) * 4)
+    struct.pack_into('<I', data, sector_offset(fat_sector) + (sector % 128) * 4, value)
+
+
+def rewrite(path, change):
+    data = bytearray(path.read_bytes())
+    change(data)
+    path.write_bytes(bytes(data))
+
+
+def stream_sectors(path, name):
+    """Return the sector chain of a regular (not mini) stream"""
+    with CompoundFile(path) as ole:
+        return ole._chain(ole.streams[name][5], ole._fat)
+
+
+@pytest.mark.parametrize('sizes', [
+    [0, 3, 63, 64, 65, 4095],  # Mini streams only
+    [4096, 5000, 100, 70000],  # Regular and mini streams
+    [8 * 1024 * 1024],  # More than 109 FAT sectors, so DIFAT sectors are needed
+])
+def test_streams_match_olefile(tmp_path, sizes):
+    path = tmp_path / 'streams.ole'
+    streams = [(f'Stream{i}', bytes((i * 7 + j) % 251 for j in range(size)) if size < 100000
+                else bytes(range(256)) * (size // 256))
+               for i, size in enumerate(sizes)]
+    write_compound_file(str(path), streams)
+
+    reference = olefile.OleFileIO(str(path))
+    with CompoundFile(path) as ole:
+        assert sorted(ole.streams) == sorted(entry[0] for entry in reference.listdir())
+        for name, data in streams:
+            content = bytes(ole.open_stream(name))
+            assert content == reference.openstream(name).read()
+            assert content == data
+    reference.close()
+
+
+def test_doc_and_ppt_text(tmp_path):
+    doc, ppt = tmp_path / 'a.doc', tmp_path / 'a.ppt'
+    write_doc(str(doc), LINES)
+    write_ppt(str(ppt), LINES)
+    assert ''.join(iter_doc_text(doc)).split('\n')[:-1] == LINES
+    assert ''.join(iter_ppt_text(ppt)).split('\n')[:-1] == LINES
+
+
+@pytest.mark.parametrize('extract, writer', [(iter_doc_text, write_doc), (iter_ppt_text, write_ppt)])
+def test_truncated_files(tmp_path, extract, writer):
+    path = tmp_path / 'full'
+    writer(str(path), LINES)
+    data = path.read_bytes()
+    truncated = tmp_path / 'truncated'
+    for cut in list(range(0, 1024, 64)) + list(range(1024, len(data), 509)):
+        truncated.write_bytes(data[:cut])
+        with pytest.raises(OLE2Error):
+            ''.join(extract(truncated))
+
+
+def test_not_a_compound_file(tmp_path):
+    path = tmp_path / 'text.doc'
+    path.write_bytes(b'plain text ' * 100)
+    with pytest.raises(OLE2Error):
+        CompoundFile(path)
+    path.write_bytes(b'')
+    with pytest.raises(OLE2Error):
+        CompoundFile(path)
+
+
+def test_fat_entry_past_the_fat(tmp_path):
+    path = tmp_path / 'a.doc'
+    write_doc(str(path), LINES)
+    sectors = stream_sectors(path, 'WordDocument')
+    rewrite(path, lambda data: set_fat_entry(data, sectors[0], 0x00FFFFFF))
+    with pytest.raises(OLE2Error, match="Damaged sector chain"):
+        ''.join(iter_doc_text(path))
+
+
+@pytest.mark.parametrize('loop_to', [0, -1])
+def test_circular_sector_chain(tmp_path, loop_to):
+    path = tmp_path / 'a.doc'
+    write_doc(str(path), LINES)
+    sectors = stream_sectors(path, 'WordDocument')
+    rewrite(path, lambda data: set_fat_entry(data, sectors[-1], sectors[loop_to]))
+    with pytest.raises(OLE2Error, match="Damaged sector chain"):
+        ''.join(iter_doc_text(path))
+
+
+def test_circular_directory_chain(tmp_path):
+    path = tmp_path / 'a.ppt'
+    write_ppt(str(path), LINES)
+    rewrite(path, lambda data: set_fat_entry(data, header_field(data, 0x30), header_field(data, 0x30)))
+    with pytest.raises(OLE2Error, match="Damaged sector chain"):
+        CompoundFile(path)
+
+
+def test_fat_sector_past_the_end(tmp_path):
+    path = tmp_path / 'a.doc'
+    write_doc(str(path), LINES)
+    rewrite(path, lambda data: struct.pack_into('<I', data, 0x4C, len(data) // SECTOR_SIZE + 10))
+    with pytest.raises(OLE2Error, match="past the end"):
+        CompoundFile(path)
+
+
+@pytest.fixture
+def difat_file(tmp_path):
+    path = tmp_path / 'difat.ole'
+    write_compound_file(str(path), [('Big', bytes(8 * 1024 * 1024)), ('Small', b'x' * 100)])
+    data = path.read_bytes()
+    assert header_field(data, 0x48) == 1  # One DIFAT sector
+    return path
+
+
+def test_circular_difat_chain(difat_file):
+    def loop(data):
+        difat_sector = header_field(data, 0x44)
+        # The DIFAT sector points back at itself and the header claims a huge chain
+        struct.pack_into('<I', data, sector_offset(difat_sector) + SECTOR_SIZE - 4, difat_sector)
+        struct.pack_into('<I', data, 0x2C, 0x7FFFFFFF)
+        struct.pack_into('<I', data, 0x48, 0x7FFFFFFF)
+    rewrite(difat_file, loop)
+    with pytest.raises(OLE2Error, match="Damaged DIFAT chain"):
+        CompoundFile(difat_file)
+
+
+def test_difat_sector_past_the_end(difat_file):
+    rewrite(difat_file, lambda data: struct.pack_into('<I', data, 0x44, len(data) // SECTOR_SIZE + 10))
+    with pytest.raises(OLE2Error, match="past the end"):
+        CompoundFile(difat_file)
+
+
+def test_truncated_difat_file(difat_file):
+    data = difat_file.read_bytes()
+    difat_file.write_bytes(data[:sector_offset(header_field(data, 0x44))])
+    with pytest.raises(OLE2Error):
+        with CompoundFile(difat_file) as ole:
+            ole.open_stream('Big')
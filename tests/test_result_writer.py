@@ -0,0 +1,131 @@
+import csv
+import os
+import random
+from collections import Counter
+
+import pytest
+
+from result_writer import ResumeError, StreamingResultWriter, TopCounts, journal_path_for
+
+FIELDS = ['File', 'Match']
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_rows_are_written_in_batches(tmp_path):
+    path = str(tmp_path / 'results.csv')
+    writer = StreamingResultWriter(path, FIELDS, batch_size=2, flush_interval=3600)
+    writer.add_rows([{'File': 'a', 'Match': '1'}])
+    assert not os.path.exists(path)
+    writer.add_rows([{'File': 'b', 'Match': '2'}])
+    assert len(read_rows(path)) == 2
+    writer.close()
+
+
+def test_interrupted_scan_resumes_from_the_journal(tmp_path):
+    path = str(tmp_path / 'results.csv')
+    writer = StreamingResultWriter(path, FIELDS, count_fields=['Match'], batch_size=1)
+    writer.add_rows([{'File': 'a', 'Match': 'x'}, {'File': 'a', 'Match': 'y'}], done_key='a')
+    writer.add_rows([], done_key='empty')
+    writer.add_rows([{'File': 'b', 'Match': 'x'}], done_key=None)  # Not finished when interrupted
+    writer.close()
+
+    resumed = StreamingResultWriter(path, FIELDS, count_fields=['Match'], resume=True)
+    assert resumed.resumed_files == 2
+    assert resumed.is_done('a') and resumed.is_done('empty') and not resumed.is_done('b')
+    assert resumed.total_rows == 3
+    assert dict(resumed.counts['Match'].items()) == {'x': 2, 'y': 1}
+    resumed.add_rows([{'File': 'c', 'Match': 'z'}], done_key='c')
+    resumed.mark_scan_complete()
+
+    assert [row['File'] for row in read_rows(path)] == ['a', 'a', 'b', 'c']
+    assert not os.path.exists(journal_path_for(path))
+
+    # A finished scan leaves no journal, so the next run starts over
+    fresh = StreamingResultWriter(path, FIELDS, resume=True)
+    assert fresh.resumed_files == 0
+    fresh.add_rows([{'File': 'd', 'Match': 'w'}])
+    fresh.close()
+    assert [row['File'] for row in read_rows(path)] == ['d']
+
+
+def test_journal_is_dropped_without_resume(tmp_path):
+    path = str(tmp_path / 'results.csv')
+    writer = StreamingResultWriter(path, FIELDS)
+    writer.add_rows([{'File': 'a', 'Match': '1'}], done_key='a')
+    writer.close()
+    assert not StreamingResultWriter(path, FIELDS, resume=False).is_done('a')
+    assert not os.path.exists(journal_path_for(path))
+
+
+def test_resume_refuses_a_csv_with_other_columns(tmp_path):
+    path = str(tmp_path / 'results.csv')
+    writer = StreamingResultWriter(path, ['File', 'Match', 'Page'])
+    writer.add_rows([{'File': 'a', 'Match': '1', 'Page': 1}], done_key='a')
+    writer.close()
+
+    with pytest.raises(ResumeError, match='File, Match, Page instead of File, Match'):
+        StreamingResultWriter(path, FIELDS, resume=True)
+    assert len(read_rows(path)) == 1
+
+
+def test_resume_with_an_empty_csv_writes_the_header(tmp_path):
+    path = str(tmp_path / 'results.csv')
+    open(path, 'w').close()
+    with open(journal_path_for(path), 'w') as f:
+        f.write('a\n')
+    writer = StreamingResultWriter(path, FIELDS, resume=True)
+    assert writer.is_done('a')
+    writer.add_rows([{'File': 'b', 'Match': '2'}])
+    writer.close()
+    assert read_rows(path) == [{'File': 'b', 'Match': '2'}]
+
+
+def test_top_counts_are_exact_below_capacity():
+    counts = TopCounts(capacity=10)
+    values = ['a'] * 5 + ['b'] * 3 + ['c']
+    for value in values:
+        counts.add(value)
+    assert counts.exact
+    assert counts.most_common() == [('a', 5), ('b', 3), ('c', 1)]
+    assert counts.most_common(1) == [('a', 5)]
+    assert counts.distinct() == 3 and counts.distinct_is_exact()
+
+
+def test_misra_gries_keeps_frequent_values():
+    capacity = 20
+    rng = random.Random(1)
+    values = [f'heavy-{i}' for i in range(5) for _ in range(1000 * (i + 1))]
+    values += [f'rare-{rng.randrange(10 ** 6)}' for _ in range(20000)]
+    rng.shuffle(values)
+
+    counts = TopCounts(capacity=capacity)
+    for value in values:
+        counts.add(value)
+    true_counts = Counter(values)
+
+    assert not counts.exact
+    assert counts.total == len(values)
+    assert counts.decrements <= len(values) / (capacity + 1)
+    kept = dict(counts.items())
+    for value, true_count in true_counts.items():
+        # Values above total / (capacity + 1) are always kept
+        if true_count > len(values) / (capacity + 1):
+            assert value in kept
+        if value in kept:
+            assert true_count - counts.decrements <= kept[value] <= true_count
+    assert {value for value, _ in counts.most_common(4)} == {f'heavy-{i}' for i in range(1, 5)}
+
+
+@pytest.mark.parametrize('distinct', [5000, 100000])
+def test_distinct_estimate_error(distinct):
+    counts = TopCounts(sketch_size=1024)
+    for i in range(distinct):
+        counts.add(f'value-{i}')
+        counts.add(f'value-{i // 2}')  # Repeats do not change the estimate
+    assert not counts.distinct_is_exact()
+    # The k minimum values estimate has a standard error of about 1 / sqrt(k - 2), ~3% here
+    assert abs(counts.distinct() - distinct) / distinct < 0.1
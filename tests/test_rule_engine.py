@@ -0,0 +1,136 @@
+import json
+import os
+
+import pytest
+
+from rule_engine import Rule, RuleSet, required_literals
+
+EXAMPLE_RULES = os.path.join(os.path.dirname(__file__), '..', 'examples', 'rules_example.json')
+
+
+def scan(rule_set, text):
+    return [rule_set.describe(match) for match in rule_set.regex.finditer(text)]
+
+
+def test_reports_the_rule_that_fired():
+    rule_set = RuleSet([
+        Rule('grouped', pattern=r'\b(ID)-(\d+)\b'),
+        Rule('project', pattern=r'\bPRJ-\d{4}\b'),
+        Rule('names', keywords=['Jet', 'JetSmart']),
+    ])
+    text = "PRJ-1234 and ID-77 on JetSmart, then ID-"
+    assert scan(rule_set, text) == [('project', 'PRJ-1234'), ('grouped', 'ID'), ('names', 'JetSmart')]
+
+
+def test_rule_without_non_empty_group_reports_empty_value():
+    rule_set = RuleSet([Rule('optional', pattern=r'x(a)?y')])
+    assert scan(rule_set, 'xy xay') == [('optional', ''), ('optional', 'a')]
+
+
+def test_first_listed_rule_wins_at_the_same_position():
+    rule_set = RuleSet([Rule('short', pattern=r'ab'), Rule('long', pattern=r'abc')])
+    assert scan(rule_set, 'abc') == [('short', 'ab')]
+
+
+def test_ignore_case_is_scoped_to_each_rule():
+    rule_set = RuleSet([
+        Rule('default', pattern=r'\bsecret\b'),
+        Rule('exact', pattern=r'\bPRJ\b', ignore_case=False),
+        Rule('loose', pattern=r'\bcode\b', ignore_case=True),
+    ], ignore_case=False)
+    assert scan(rule_set, 'SECRET secret prj PRJ CODE') == [
+        ('default', 'secret'), ('exact', 'PRJ'), ('loose', 'CODE')]
+
+    rule_set = RuleSet([Rule('default', pattern=r'\bsecret\b'), Rule('exact', pattern=r'\bPRJ\b', ignore_case=False)],
+                       ignore_case=True)
+    assert scan(rule_set, 'SECRET prj PRJ') == [('default', 'SECRET'), ('exact', 'PRJ')]
+
+
+@pytest.mark.parametrize('pattern, text, expected', [
+    (r'(?i)secret', 'SECRET', ['SECRET']),
+    (r'(?s)a.b', 'a\nb', ['a\nb']),
+    (r'(?a)\w+', 'ñandú', ['and']),
+    (r'(?u)\w+', 'ñandú', ['ñandú']),
+])
+def test_leading_global_flags_only_apply_to_their_rule(pattern, text, expected):
+    rule_set = RuleSet([Rule('flagged', pattern=pattern), Rule('other', pattern=r'b\n')])
+    assert [value for name, value in scan(rule_set, text) if name == 'flagged'] == expected
+
+
+def test_leading_global_flags_do_not_leak_into_other_rules():
+    rule_set = RuleSet([Rule('loose', pattern=r'(?i)abc'), Rule('strict', pattern=r'XYZ')])
+    assert scan(rule_set, 'xyz ABC XYZ') == [('loose', 'ABC'), ('strict', 'XYZ')]
+
+
+def test_locale_flag_is_reported_for_the_rule():
+    with pytest.raises(ValueError, match="Rule 'bytes_only' has an invalid pattern"):
+        Rule('bytes_only', pattern=r'(?L)\w+')
+
+
+@pytest.mark.parametrize('pattern', [
+    r'(a)\1',
+    r'(?P<quote>")x\1',
+    r'(<)?x(?(1)>)',
+])
+def test_numbered_backreferences_are_rejected(pattern):
+    with pytest.raises(ValueError, match='numbered backreference'):
+        Rule('numbered', pattern=pattern)
+
+
+def test_named_backreferences_are_allowed():
+    rule_set = RuleSet([
+        Rule('first', pattern=r'(\d+)'),
+        Rule('quoted', pattern=r'(?P<quote>["\'])(?P<word>[a-z]+)(?P=quote)'),
+        Rule('tag', pattern=r'(?P<open><)?tag(?(open)>)'),
+    ])
+    assert scan(rule_set, '"abc" \'d" <tag> tag 42') == [
+        ('quoted', '"'), ('tag', '<'), ('tag', ''), ('first', '42')]
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    (r'\bPRJ-\d{4,6}\b', {'prj-'}),
+    (r'\b(?:ABC|XYZ)-\d+', {'abc', 'xyz'}),
+    (r'[Jj]et[Ss]mart', {'jetsmart'}),
+    (r'(?:abc)+x', {'abc'}),
+    (r'(?:abc)?x', None),
+    (r'\d{3}-\d{4}', None),
+    (r'ab|\d+', None),
+])
+def test_required_literals(pattern, expected):
+    assert required_literals(pattern) == expected
+
+
+def test_rule_set_literals_need_every_rule():
+    assert RuleSet([Rule('a', pattern='PRJ-1'), Rule('b', keywords=['Secret'])]).literals == {'prj-1', 'secret'}
+    assert RuleSet([Rule('a', pattern='PRJ-1'), Rule('b', pattern=r'\d+')]).literals is None
+
+
+def test_from_file(tmp_path):
+    rules_file = tmp_path / 'rules.json'
+    rules_file.write_text(json.dumps({'rules': [
+        {'name': 'code', 'pattern': r'\bC-\d+\b', 'ignore_case': False},
+        {'name': 'names', 'keywords': ['acme']},
+    ]}), encoding='utf-8')
+    rule_set = RuleSet.from_file(str(rules_file), ignore_case=True)
+    assert [rule.name for rule in rule_set.rules] == ['code', 'names']
+    assert scan(rule_set, 'C-1 c-2 ACME') == [('code', 'C-1'), ('names', 'ACME')]
+
+
+def test_example_rules_file_loads():
+    rule_set = RuleSet.from_file(EXAMPLE_RULES)
+    assert scan(rule_set, 'mail me at a.b@example.com') == [('email', 'a.b@example.com')]
+
+
+@pytest.mark.parametrize('rules, message', [
+    ([{'name': 'a', 'pattern': 'x'}, {'name': 'a', 'pattern': 'y'}], 'Duplicate rule names: a'),
+    ([{'name': 'a'}], "Rule 'a' needs either a pattern or a keywords list"),
+    ([{'pattern': 'x'}], 'Every rule needs a name'),
+    ([{'name': 'a', 'keywords': []}], "Rule 'a' has an empty keywords list"),
+    ([{'name': 'a', 'pattern': '('}], "Rule 'a' has an invalid pattern"),
+    ([], 'No detection rules configured'),
+])
+def test_from_file_errors(tmp_path, rules, message):
+    rules_file = tmp_path / 'rules.json'
+    rules_file.write_text(json.dumps({'rules': rules}), encoding='utf-8')
+    with pytest.raises(ValueError, match=message):
+        RuleSet.from_file(str(rules_file))
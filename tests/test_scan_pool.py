@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+
+import pytest
+
+from scan_pool import (TaskTimeout, WorkerCrashed, iter_pool_results, iter_serial_results,
+                       iter_supervised_results)
+
+
+def work(item):
+    """Worker function: sleep, crash, fail or return the item doubled with the worker's pid"""
+    kind, value = item
+    if kind == 'sleep':
+        time.sleep(value)
+    elif kind == 'crash':
+        os._exit(value)
+    elif kind == 'fail':
+        raise ValueError(value)
+    elif kind == 'exit-when-idle':
+        # Returns, then the process dies before it gets its next item
+        threading.Timer(value, os._exit, (0,)).start()
+    return value * 2, os.getpid()
+
+
+def run_supervised(items, max_workers=1, timeout=5):
+    return list(iter_supervised_results(work, items, max_workers, timeout))
+
+
+def test_results_stay_in_order_with_one_worker():
+    items = [('ok', i) for i in range(20)]
+    results = run_supervised(items)
+    assert [item for item, _, _ in results] == items
+    assert [result[0] for _, result, _ in results] == [i * 2 for i in range(20)]
+    assert len({result[1] for _, result, _ in results}) == 1  # One worker ran them all
+
+
+def test_every_item_is_returned_with_several_workers():
+    items = [('sleep', 0.01 * (i % 3)) for i in range(12)]
+    results = run_supervised(items, max_workers=3)
+    assert sorted(item for item, _, _ in results) == sorted(items)
+    assert all(error is None for _, _, error in results)
+
+
+def test_task_past_its_deadline_is_killed_and_the_worker_replaced():
+    start = time.monotonic()
+    results = run_supervised([('ok', 1), ('sleep', 30), ('ok', 2)], timeout=0.5)
+    assert time.monotonic() - start < 10
+
+    (_, first, _), (slow, result, error), (_, last, _) = results
+    assert slow == ('sleep', 30) and result is None
+    assert isinstance(error, TaskTimeout)
+    assert last[0] == 4
+    assert first[1] != last[1]  # The killed worker was replaced by a new process
+
+
+def test_crash_is_reported_as_worker_crashed():
+    results = run_supervised([('crash', 3), ('ok', 5)])
+    (crashed, result, error), (_, last, last_error) = results
+    assert crashed == ('crash', 3) and result is None
+    assert isinstance(error, WorkerCrashed)
+    assert "code 3" in str(error)
+    assert last == (10, last[1]) and last_error is None
+
+
+def test_exceptions_are_returned_without_replacing_the_worker():
+    (_, _, error), (_, result, _) = run_supervised([('fail', 'bad item'), ('ok', 1)])
+    assert isinstance(error, ValueError) and str(error) == 'bad item'
+    assert result[0] == 2
+
+
+def test_worker_that_dies_while_idle_is_replaced():
+    def items():
+        yield 'exit-when-idle', 0.1
+        time.sleep(0.5)  # The worker exits while it waits for this item
+        yield 'ok', 7
+
+    (_, first, _), (_, second, error) = run_supervised(items())
+    assert error is None
+    assert second[0] == 14
+    assert first[1] != second[1]
+
+
+@pytest.mark.parametrize('run', [
+    lambda items: iter_serial_results(work, items),
+    lambda items: iter_pool_results(work, items, 2),
+])
+def test_serial_and_pool_results(run):
+    items = [('ok', 1), ('fail', 'x'), ('ok', 3)]
+    results = {item: (result, error) for item, result, error in run(items)}
+    assert results[('ok', 1)][0][0] == 2
+    assert isinstance(results[('fail', 'x')][1], ValueError)
+    assert results[('ok', 3)][0][0] == 6
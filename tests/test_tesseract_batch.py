@@ -0,0 +1,112 @@
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+import tesseract_batch
+from tesseract_batch import TesseractBatchError, TesseractBatcher, TesseractTimeout
+
+# Images this wide make the fake tesseract hang
+HANGING_WIDTH = 13
+
+
+class FakeTesseract:
+    """Stands in for subprocess.run, 'reading' every image as its width"""
+
+    def __init__(self, drop_last_page=False):
+        self.drop_last_page = drop_last_page
+        self.batches = []  # Image widths per call
+        self.timeouts = []
+
+    def __call__(self, command, stdout=None, stderr=None, timeout=None):
+        with open(command[1], encoding='utf-8') as f:
+            widths = [Image.open(path).size[0] for path in f.read().splitlines()]
+        self.batches.append(widths)
+        self.timeouts.append(timeout)
+        if HANGING_WIDTH in widths:
+            raise subprocess.TimeoutExpired(command, timeout)
+        pages = [f"width {width}\n" for width in widths]
+        if self.drop_last_page and len(pages) > 1:
+            pages.pop()
+        output = ''.join(page + '\f' for page in pages)
+        return subprocess.CompletedProcess(command, 0, output.encode('utf-8'), b'')
+
+
+@pytest.fixture
+def fake_tesseract(monkeypatch):
+    def install(**kwargs):
+        fake = FakeTesseract(**kwargs)
+        monkeypatch.setattr(tesseract_batch.subprocess, 'run', fake)
+        return fake
+    return install
+
+
+def ocr_concurrently(batcher, widths):
+    """OCR one image per width on as many threads, returning (text, error) per image"""
+    def ocr(width):
+        try:
+            return batcher.image_to_string(Image.new('L', (width, 10), 255)), None
+        except TesseractBatchError as e:
+            return None, e
+
+    with ThreadPoolExecutor(len(widths)) as executor:
+        return list(executor.map(ocr, widths))
+
+
+def test_batch_output_is_split_on_form_feeds(fake_tesseract):
+    fake = fake_tesseract()
+    batcher = TesseractBatcher('tesseract', 3, max_wait=10, timeout=5)
+    results = ocr_concurrently(batcher, [20, 30, 40])
+    batcher.close()
+
+    assert results == [("width 20\n", None), ("width 30\n", None), ("width 40\n", None)]
+    assert [sorted(widths) for widths in fake.batches] == [[20, 30, 40]]
+    assert fake.timeouts == [15]  # timeout per image in the batch
+    assert batcher.batches_run == 1
+
+
+def test_page_count_mismatch_falls_back_to_one_image_per_process(fake_tesseract):
+    fake = fake_tesseract(drop_last_page=True)
+    batcher = TesseractBatcher('tesseract', 3, max_wait=10)
+    results = ocr_concurrently(batcher, [20, 30, 40])
+    batcher.close()
+
+    assert results == [("width 20\n", None), ("width 30\n", None), ("width 40\n", None)]
+    assert len(fake.batches) == 4
+    assert sorted(fake.batches[0]) == [20, 30, 40]
+    assert sorted(fake.batches[1:]) == [[20], [30], [40]]
+
+
+def test_timeout_only_fails_the_hanging_image(fake_tesseract):
+    fake = fake_tesseract()
+    batcher = TesseractBatcher('tesseract', 3, max_wait=10, timeout=2)
+    results = ocr_concurrently(batcher, [20, HANGING_WIDTH, 40])
+    batcher.close()
+
+    assert results[0] == ("width 20\n", None)
+    assert results[2] == ("width 40\n", None)
+    text, error = results[1]
+    assert text is None
+    assert isinstance(error, TesseractTimeout)
+    assert "within 2s" in str(error)
+    assert fake.timeouts == [6, 2, 2, 2]
+
+
+def test_partial_batch_runs_after_max_wait(fake_tesseract):
+    fake = fake_tesseract()
+    batcher = TesseractBatcher('tesseract', 4, max_wait=0.05)
+    assert ocr_concurrently(batcher, [20]) == [("width 20\n", None)]
+    batcher.close()
+    assert fake.batches == [[20]]
+
+
+def test_tesseract_errors_are_raised(monkeypatch):
+    def failing_run(command, stdout=None, stderr=None, timeout=None):
+        return subprocess.CompletedProcess(command, 1, b'', b'Error opening data file eng.traineddata')
+
+    monkeypatch.setattr(tesseract_batch.subprocess, 'run', failing_run)
+    batcher = TesseractBatcher('tesseract', 1)
+    with pytest.raises(TesseractBatchError, match='eng.traineddata'):
+        batcher.image_to_string(Image.new('L', (20, 10), 255))
+    batcher.close()
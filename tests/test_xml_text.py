@@ -0,0 +1,48 @@
+import io
+
+import pytest
+
+from xml_text import (ODF_CHARACTERS, iter_element_text, iter_element_text_etree,
+                      iter_wordml_paragraphs, iter_wordml_paragraphs_etree)
+
+ODF_TEXT_NS = 'urn:oasis:names:tc:opendocument:xmlns:text:1.0'
+WORDML_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+
+def odf_content(body):
+    return (f'<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+            f'xmlns:text="{ODF_TEXT_NS}"><office:body>{body}</office:body>'
+            f'</office:document-content>').encode('utf-8')
+
+
+@pytest.mark.parametrize('extract', [iter_element_text, iter_element_text_etree])
+def test_odf_spaces_tabs_and_line_breaks(extract):
+    content = odf_content('<text:p>foo<text:s/>bar<text:tab/>baz<text:line-break/>q'
+                          '<text:span>x<text:s text:c="3"/>y</text:span></text:p>')
+    texts = list(extract(io.BytesIO(content), ('p', 'h'), ODF_TEXT_NS, characters=ODF_CHARACTERS))
+    assert texts == ['foo bar\tbaz\nqx   y']
+
+
+@pytest.mark.parametrize('extract', [iter_element_text, iter_element_text_etree])
+def test_character_elements_are_dropped_without_characters(extract):
+    content = odf_content('<text:p>foo<text:s/>bar</text:p>')
+    assert list(extract(io.BytesIO(content), ('p',), ODF_TEXT_NS)) == ['foobar']
+
+
+def test_expat_and_etree_agree_across_blocks():
+    body = ''.join(f'<text:h>Title {i}</text:h><text:p>a<text:s text:c="2"/>b<text:tab/>{i}</text:p>'
+                   for i in range(500))
+    content = odf_content(body)
+    expected = list(iter_element_text_etree(io.BytesIO(content), ('p', 'h'), ODF_TEXT_NS,
+                                            characters=ODF_CHARACTERS))
+    streamed = list(iter_element_text(io.BytesIO(content), ('p', 'h'), ODF_TEXT_NS, block_size=97,
+                                      characters=ODF_CHARACTERS))
+    assert streamed == expected
+    assert expected[1] == 'a  b\t0'
+
+
+@pytest.mark.parametrize('extract', [iter_wordml_paragraphs, iter_wordml_paragraphs_etree])
+def test_wordml_characters(extract):
+    content = (f'<w:document xmlns:w="{WORDML_NS}"><w:body><w:p><w:r><w:t>PRJ</w:t><w:noBreakHyphen/>'
+               f'<w:t>12345</w:t><w:tab/><w:t>x</w:t></w:r></w:p></w:body></w:document>').encode('utf-8')
+    assert list(extract(io.BytesIO(content))) == ['PRJ-12345\tx']
@@ -0,0 +1,71 @@
+"""
+Pattern matching over streamed text chunks
+
+Extractors yield text in small chunks (paragraphs, rows, slides). The
+matcher buffers chunks up to a scan size, runs the compiled pattern over the
+buffer and keeps a short overlap window at the end, so a match that spans a
+chunk boundary is still found while memory stays proportional to the scan
+size rather than to the whole document.
+"""
+import re
+
+# Characters buffered before the pattern is run over the pending text
+DEFAULT_SCAN_SIZE = 64 * 1024
+
+# Matches are only reported once this many characters follow them, so the
+# longest match that can straddle a chunk boundary is this long
+DEFAULT_OVERLAP = 1024
+
+# Characters kept in front of the unscanned text so lookbehinds and \b see
+# the real preceding text instead of the start of the buffer
+CONTEXT_SIZE = 64
+
+
+class ChunkMatcher:
+    """Find pattern matches in an iterable of text chunks"""
+
+    def __init__(self, pattern, flags=0, scan_size=DEFAULT_SCAN_SIZE, overlap=DEFAULT_OVERLAP):
+        # pattern may be a string or an already compiled regex
+        self.regex = re.compile(pattern, flags)
+        self.scan_size = scan_size
+        self.overlap = overlap
+
+    def iter_matches(self, chunks):
+        """Yield match objects as soon as they can no longer change"""
+        buffer = ''
+        start = 0  # Matches may only begin at or after this buffer position
+        pending = []
+        pending_size = 0
+
+        for chunk in chunks:
+            if not chunk:
+                continue
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size < self.scan_size:
+                continue
+
+            buffer += ''.join(pending)
+            pending = []
+            pending_size = 0
+
+            # Matches ending inside the overlap window could still grow with
+            # the next chunk, so they are rescanned with more text later
+            safe_end = len(buffer) - self.overlap
+            next_start = max(start, safe_end)
+            for match in self.regex.finditer(buffer, start):
+                if match.end() > safe_end:
+                    next_start = match.start()
+                    break
+                yield match
+                next_start = max(match.end(), safe_end)
+                if match.end() == match.start():
+                    next_start = max(match.end() + 1, safe_end)
+
+            # Drop scanned text, keeping a little context before the next scan position
+            keep_from = max(0, next_start - CONTEXT_SIZE)
+            buffer = buffer[keep_from:]
+            start = next_start - keep_from
+
+        buffer += ''.join(pending)
+        yield from self.regex.finditer(buffer, min(start, len(buffer)))
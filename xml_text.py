@@ -0,0 +1,276 @@
+"""
+Character data extraction from document XML without building a tree
+
+Slides and OpenDocument content.xml members are streamed through expat and
+only the text inside the wanted elements is kept, instead of parsing the
+whole member into an ElementTree and throwing the tree away. The
+ElementTree version is kept for comparison (benchmarks/bench_xml_parsing.py)
+and as a fallback; both yield the same text. Elements standing for a
+character inside the text, like OpenDocument spaces, tabs and line breaks,
+can be written out as that character.
+
+WordprocessingML parts (.docx body, headers, footers, notes and comments)
+need more than the text of matching elements: tabs and breaks are elements
+of their own, and text boxes are stored twice (as DrawingML and as a VML
+fallback). iter_wordml_paragraphs handles them, again with an ElementTree
+twin.
+"""
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+
+# Bytes of decompressed XML handed to expat at a time
+BLOCK_SIZE = 64 * 1024
+
+# Transitional and strict namespaces of WordprocessingML
+WORDML_NAMESPACES = ('http://schemas.openxmlformats.org/wordprocessingml/2006/main',
+                     'http://purl.oclc.org/ooxml/wordprocessingml/main')
+MC_NAMESPACE = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+
+# Kinds of WordprocessingML elements
+PARAGRAPH = 'paragraph'
+TEXT = 'text'  # Runs of text, including deleted text of tracked changes
+SKIP = 'skip'  # Duplicate content, ignored with everything inside it
+
+WORDML_TEXT_TAGS = ('t', 'delText')
+
+# Elements standing for a single character
+WORDML_CHARACTERS = {'tab': '\t', 'ptab': '\t', 'br': '\n', 'cr': '\n', 'noBreakHyphen': '-'}
+
+# OpenDocument text elements standing for a character; text:s stands for
+# as many spaces as its text:c attribute says (1 without it)
+ODF_CHARACTERS = {'s': ' ', 'tab': '\t', 'line-break': '\n'}
+
+# Attribute repeating the character of an element
+REPEAT_ATTRIBUTE = 'c'
+
+
+def _matches(name, local_names, namespace):
+    """Check an expat 'uri}local' or ElementTree '{uri}local' name"""
+    uri, _, local = name.rpartition('}')
+    return local in local_names and (namespace is None or uri.lstrip('{') == namespace)
+
+
+def _character(name, characters, namespace, attributes):
+    """
+    Return the text an element inside a match stands for, from characters
+    (local name -> character, in namespace), or None if it is not one of them
+    attributes is a dict, or an expat ordered attribute list
+    """
+    if not characters:
+        return None
+    uri, _, local = name.rpartition('}')
+    character = characters.get(local)
+    if character is None or (namespace is not None and uri.lstrip('{') != namespace):
+        return None
+    if not isinstance(attributes, dict):
+        attributes = dict(zip(attributes[::2], attributes[1::2]))
+    for attribute, value in attributes.items():
+        if attribute.rpartition('}')[2] == REPEAT_ATTRIBUTE:
+            try:
+                return character * max(int(value), 1)
+            except ValueError:
+                break
+    return character
+
+
+def iter_element_text(f, local_names, namespace=None, block_size=BLOCK_SIZE, characters=None):
+    """
+    Yield the character data inside each element named in local_names, in
+    namespace (or any namespace if None), from an XML byte stream
+    Matching elements nested inside another one are part of its text;
+    elements named in characters (e.g. ODF_CHARACTERS) add their character
+    """
+    parser = expat.ParserCreate(namespace_separator='}')
+    parser.buffer_text = True
+    parser.ordered_attributes = True
+
+    depth = 0  # Elements open inside the current match, 0 outside of one
+    parts = []
+    found = []
+    matching_names = {}  # Documents use few distinct tags, so remember each check
+
+    def start_element(name, attributes):
+        nonlocal depth
+        if depth:
+            depth += 1
+            character = _character(name, characters, namespace, attributes)
+            if character:
+                parts.append(character)
+            return
+        is_match = matching_names.get(name)
+        if is_match is None:
+            is_match = matching_names[name] = _matches(name, local_names, namespace)
+        if is_match:
+            depth = 1
+
+    def end_element(name):
+        nonlocal depth
+        if depth:
+            depth -= 1
+            if not depth:
+                found.append(''.join(parts))
+                parts.clear()
+
+    def character_data(data):
+        if depth:
+            parts.append(data)
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = character_data
+
+    for block in iter(lambda: f.read(block_size), b''):
+        parser.Parse(block, False)
+        if found:
+            yield from found
+            found.clear()
+    parser.Parse(b'', True)
+    yield from found
+
+
+def iter_element_text_etree(f, local_names, namespace=None, characters=None):
+    """ElementTree version of iter_element_text, parsing the whole stream first"""
+    root = ET.parse(f).getroot()
+
+    def collect(element, parts):
+        if element.text:
+            parts.append(element.text)
+        for child in element:
+            character = _character(child.tag, characters, namespace, child.attrib)
+            if character:
+                parts.append(character)
+            else:
+                collect(child, parts)
+            if child.tail:
+                parts.append(child.tail)
+
+    def walk(element):
+        if _matches(element.tag, local_names, namespace):
+            parts = []
+            collect(element, parts)
+            yield ''.join(parts)
+            return
+        for child in element:
+            yield from walk(child)
+
+    yield from walk(root)
+
+
+def _wordml_kind(name):
+    """Return (kind, character) of an expat 'uri}local' or ElementTree '{uri}local' name"""
+    uri, _, local = name.rpartition('}')
+    uri = uri.lstrip('{')
+    if uri == MC_NAMESPACE:
+        return (SKIP, None) if local == 'Fallback' else (None, None)
+    if uri not in WORDML_NAMESPACES:
+        return None, None
+    if local == 'p':
+        return PARAGRAPH, None
+    if local in WORDML_TEXT_TAGS:
+        return TEXT, None
+    return None, WORDML_CHARACTERS.get(local)
+
+
+def iter_wordml_paragraphs(f, block_size=BLOCK_SIZE):
+    """
+    Yield the text of each paragraph of a WordprocessingML part, including
+    paragraphs in tables; paragraphs of a text box become lines of the
+    paragraph anchoring it
+    """
+    parser = expat.ParserCreate(namespace_separator='}')
+    parser.buffer_text = True
+    parser.ordered_attributes = True
+
+    paragraph_depth = 0  # Paragraphs open, > 1 inside a text box
+    skip_depth = 0  # Elements open inside skipped content
+    in_text = False
+    parts = []
+    found = []
+    kinds = {}
+
+    def start_element(name, attributes):
+        nonlocal paragraph_depth, skip_depth, in_text
+        if skip_depth:
+            skip_depth += 1
+            return
+        kind = kinds.get(name)
+        if kind is None:
+            kind = kinds[name] = _wordml_kind(name)
+        kind, character = kind
+        if kind is PARAGRAPH:
+            if paragraph_depth:
+                parts.append('\n')
+            paragraph_depth += 1
+        elif kind is TEXT:
+            in_text = paragraph_depth > 0
+        elif kind is SKIP:
+            skip_depth = 1
+        elif character and paragraph_depth:
+            parts.append(character)
+
+    def end_element(name):
+        nonlocal paragraph_depth, skip_depth, in_text
+        if skip_depth:
+            skip_depth -= 1
+            return
+        kind = kinds[name][0]
+        if kind is TEXT:
+            in_text = False
+        elif kind is PARAGRAPH:
+            paragraph_depth -= 1
+            if paragraph_depth:
+                parts.append('\n')
+            else:
+                found.append(''.join(parts))
+                parts.clear()
+
+    def character_data(data):
+        if in_text:
+            parts.append(data)
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = character_data
+
+    for block in iter(lambda: f.read(block_size), b''):
+        parser.Parse(block, False)
+        if found:
+            yield from found
+            found.clear()
+    parser.Parse(b'', True)
+    yield from found
+
+
+def iter_wordml_paragraphs_etree(f):
+    """ElementTree version of iter_wordml_paragraphs, parsing the whole stream first"""
+    root = ET.parse(f).getroot()
+
+    def collect(element, parts):
+        for child in element:
+            kind, character = _wordml_kind(child.tag)
+            if kind is SKIP:
+                continue
+            if kind is TEXT:
+                parts.append(''.join(child.itertext()))
+            elif character:
+                parts.append(character)
+            elif kind is PARAGRAPH:
+                parts.append('\n')
+                collect(child, parts)
+                parts.append('\n')
+            else:
+                collect(child, parts)
+
+    def walk(element):
+        for child in element:
+            kind, _ = _wordml_kind(child.tag)
+            if kind is SKIP:
+                continue
+            if kind is PARAGRAPH:
+                parts = []
+                collect(child, parts)
+                yield ''.join(parts)
+            else:
+                yield from walk(child)
+
+    yield from walk(root)